@@ -0,0 +1,150 @@
+# analytics.py
+import pandas as pd
+import database
+
+ROLLUP_KEYS = ['Date', 'Hour', 'Menu Item Name', 'Size/Container']
+ROLLUP_VALUES = ['Items Sold', 'Revenue (₱)', 'COGS (₱)']
+ROLLUP_COLUMNS = ROLLUP_KEYS + ROLLUP_VALUES
+
+# --- Vectorized rollups (compaction and backfill) ---
+
+_unit_cogs_cache = {'source': None, 'cogs': None}
+
+def unit_cogs(df_menu=None):
+    """Returns the ingredient cost of one serving, indexed by (menu item, size).
+
+    This is the sum of 'Ingredient Cost (₱)' over the recipe rows in Menu_Costing.
+    """
+    if df_menu is None:
+        df_menu = database.load_sheet(database.SHEET_MENU, copy=False)
+    if _unit_cogs_cache['source'] is not df_menu:
+        if df_menu.empty or 'Menu Item Name' not in df_menu.columns:
+            cogs = pd.Series(dtype=float)
+        else:
+            cogs = df_menu.groupby(['Menu Item Name', 'Size/Container'])['Ingredient Cost (₱)'].sum()
+        _unit_cogs_cache.update(source=df_menu, cogs=cogs)
+    return _unit_cogs_cache['cogs']
+
+def rollup_items(items, df_menu=None):
+    """Aggregates sold items (one row per item, as in Sales_Items) into hourly rollups."""
+    if items.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    timestamps = pd.to_datetime(items['Date'])
+    keys = pd.MultiIndex.from_arrays([items['Menu Item Name'], items['Size/Container']])
+    frame = pd.DataFrame({
+        'Date': timestamps.dt.strftime('%Y-%m-%d'),
+        'Hour': timestamps.dt.hour,
+        'Menu Item Name': items['Menu Item Name'],
+        'Size/Container': items['Size/Container'],
+        'Items Sold': 1,
+        'Revenue (₱)': items['Price'].astype(float),
+        'COGS (₱)': unit_cogs(df_menu).reindex(keys).fillna(0).to_numpy(),
+    })
+    return frame.groupby(ROLLUP_KEYS, as_index=False, dropna=False)[ROLLUP_VALUES].sum()
+
+def merge_rollups(*rollups):
+    """Adds hourly rollup frames together."""
+    rollups = [rollup for rollup in rollups if not rollup.empty]
+    if not rollups:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    combined = pd.concat([rollup[ROLLUP_COLUMNS] for rollup in rollups], ignore_index=True)
+    return combined.groupby(ROLLUP_KEYS, as_index=False, dropna=False)[ROLLUP_VALUES].sum()
+
+def with_margins(rollup):
+    """Adds Gross Margin (₱) and Gross Margin (%) columns to a rollup frame."""
+    rollup = rollup.copy()
+    rollup['Gross Margin (₱)'] = rollup['Revenue (₱)'] - rollup['COGS (₱)']
+    revenue = rollup['Revenue (₱)'].where(rollup['Revenue (₱)'] != 0)
+    rollup['Gross Margin (%)'] = (rollup['Gross Margin (₱)'] / revenue * 100).round(2)
+    return rollup
+
+def backfill(ledger):
+    """Rebuilds the stored rollups from the full sales history in one vectorized pass."""
+    _, items = ledger.read_sales(include_items=True)
+    rollup = rollup_items(items)
+    database.save_dataframe(rollup, database.SHEET_ROLLUPS, mode='overwrite')
+    return rollup
+
+def period_report(ledger, start, end):
+    """Returns items sold, revenue, COGS and gross margin per item for sales dated in [start, end).
+
+    Only the sales of that period are loaded (see database.load_sheet_range).
+    """
+    _, items = ledger.read_sales(include_items=True, start=start, end=end)
+    rollup = rollup_items(items)
+    totals = rollup.groupby(['Menu Item Name', 'Size/Container'], as_index=False)[ROLLUP_VALUES].sum()
+    return with_margins(totals).sort_values('Revenue (₱)', ascending=False, ignore_index=True)
+
+# --- Live rollups ---
+
+class SalesAnalytics:
+    """Hourly and daily rollups that each new sale updates in place.
+
+    Starts from the stored Sales_Rollups sheet (kept in step with Sales_Items
+    by the ledger's compaction) plus the sales still in the journal, then
+    listens to the ledger so every appended sale adds to the totals.
+    Dashboards read these precomputed aggregates instead of rescanning sales.
+    """
+
+    def __init__(self, ledger):
+        self._hourly = {}
+        self._daily = {}
+
+        stored = database.load_sheet(database.SHEET_ROLLUPS, copy=False)
+        if not stored.empty:
+            for row in stored[ROLLUP_COLUMNS].itertuples(index=False, name=None):
+                self._add(row[:4], row[4:])
+        self.apply(ledger.pending_records())
+        ledger.listeners.append(self.apply)
+
+    def _add(self, key, values):
+        for table, table_key in ((self._hourly, key), (self._daily, (key[0],) + key[2:])):
+            totals = table.setdefault(table_key, [0, 0.0, 0.0])
+            totals[0] += values[0]
+            totals[1] += values[1]
+            totals[2] += values[2]
+
+    def apply(self, records):
+        """Adds journal records (see SalesLedger.build_record) to the rollups."""
+        cogs = unit_cogs()
+        for record in records:
+            date, time = record['Date'].split(' ') if ' ' in record['Date'] else (record['Date'], '00')
+            hour = int(time[:2])
+            for item in record['Items']:
+                key = (date, hour, item['Menu Item Name'], item['Size/Container'])
+                self._add(key, (1, item['Price'], float(cogs.get((item['Menu Item Name'], item['Size/Container']), 0))))
+
+    def hourly(self):
+        """Returns revenue, items sold, COGS and gross margin per item per hour."""
+        rows = [key + tuple(values) for key, values in self._hourly.items()]
+        return with_margins(pd.DataFrame(rows, columns=ROLLUP_COLUMNS)).sort_values(ROLLUP_KEYS, ignore_index=True)
+
+    def daily(self):
+        """Returns revenue, items sold, COGS and gross margin per item per day."""
+        columns = ['Date', 'Menu Item Name', 'Size/Container'] + ROLLUP_VALUES
+        rows = [key + tuple(values) for key, values in self._daily.items()]
+        return with_margins(pd.DataFrame(rows, columns=columns)).sort_values(columns[:3], ignore_index=True)
+
+if __name__ == "__main__":
+    import sys
+    import sales_ledger
+
+    ledger = sales_ledger.SalesLedger()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'daily'
+    if command == 'backfill':
+        rollup = backfill(ledger)
+        print(f"✅ Rebuilt {len(rollup)} hourly rollup row(s) from the sales history.")
+    elif command == 'week':
+        # The 7 days from the given date, or the last 7 days including today
+        start = pd.Timestamp(sys.argv[2]) if len(sys.argv) > 2 else pd.Timestamp.now().normalize() - pd.Timedelta(days=6)
+        end = start + pd.Timedelta(days=7)
+        report = period_report(ledger, start, end)
+        print(f"## 📅 Sales {start:%Y-%m-%d} to {end - pd.Timedelta(days=1):%Y-%m-%d} 📅")
+        print(report.to_string(index=False) if not report.empty else "No sales in this period.")
+    elif command in ('daily', 'hourly'):
+        analytics = SalesAnalytics(ledger)
+        report = analytics.daily() if command == 'daily' else analytics.hourly()
+        print(report.to_string(index=False) if not report.empty else "No sales recorded yet.")
+    else:
+        print("Usage: python analytics.py [daily | hourly | week [YYYY-MM-DD] | backfill]")
@@ -0,0 +1,85 @@
+# benchmarks/bench_save_dataframe.py
+"""Compares the old per-cell openpyxl writer with database.save_dataframe.
+
+Usage: python benchmarks/bench_save_dataframe.py [--sizes 10000,100000,1000000] [--legacy-max 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook, Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import database
+
+def make_sales(rows, seed=0):
+    """Builds a Daily_Sales-shaped frame with `rows` rows."""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, rows), unit='s')
+    return pd.DataFrame({
+        'SaleID': [f'sale-{i:08d}' for i in range(rows)],
+        'Date': dates.strftime('%Y-%m-%d %H:%M:%S'),
+        'Total Sale (₱)': rng.integers(50, 1500, rows) + 0.5,
+        'Customer/Table': rng.choice(['Table 1', 'Table 2', 'Take-out', 'Juan', 'Maria'], rows),
+        'Items Count': rng.integers(1, 6, rows),
+    })
+
+def legacy_save(df, sheet_name, path):
+    """The pre-streaming writer: load workbook, write cell by cell, size columns cell by cell."""
+    try:
+        book = load_workbook(path)
+    except Exception:
+        book = Workbook()
+    if sheet_name in book.sheetnames:
+        book.remove(book[sheet_name])
+    sheet = book.create_sheet(sheet_name)
+    for r, (idx, row) in enumerate(df.iterrows(), start=1):
+        for c, (col_name, value) in enumerate(row.items(), start=1):
+            if r == 1:
+                sheet.cell(row=r, column=c, value=col_name)
+            sheet.cell(row=r+1, column=c, value=value)
+    for col in sheet.columns:
+        max_length = 0
+        column = col[0].column_letter
+        for cell in col:
+            if len(str(cell.value)) > max_length:
+                max_length = len(str(cell.value))
+        sheet.column_dimensions[column].width = max_length + 3
+    book.save(path)
+
+def time_call(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--legacy-max', type=int, default=1000000,
+                        help='skip the legacy writer above this many rows')
+    args = parser.parse_args()
+
+    database.set_backend(database.ExcelBackend())
+    print(f"{'rows':>10} {'legacy (s)':>12} {'streaming (s)':>14} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in [int(size) for size in args.sizes.split(',')]:
+            df = make_sales(rows)
+
+            legacy_path = os.path.join(tmp, f'legacy_{rows}.xlsx')
+            legacy = None
+            if rows <= args.legacy_max:
+                legacy = time_call(lambda: legacy_save(df, database.SHEET_SALES, legacy_path))
+
+            database.DB_FILE = os.path.join(tmp, f'streaming_{rows}.xlsx')
+            database.invalidate_cache()
+            streaming = time_call(lambda: database.save_dataframe(df, database.SHEET_SALES, mode='overwrite'))
+
+            legacy_text = f'{legacy:12.2f}' if legacy is not None else f"{'skipped':>12}"
+            speedup = f'{legacy / streaming:7.1f}x' if legacy is not None else f"{'-':>8}"
+            print(f'{rows:>10} {legacy_text} {streaming:14.2f} {speedup}')
+
+if __name__ == "__main__":
+    main()
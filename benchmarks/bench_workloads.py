@@ -0,0 +1,190 @@
+# benchmarks/bench_workloads.py
+"""Replays scripted coffee-shop workloads against a synthetic database and reports JSON.
+
+Every operation is timed per call; the report has throughput, p50/p99 latency
+and the peak memory traced (tracemalloc) during a separate short pass.
+Interactive code paths (place/serve order, costing, restock) are driven by
+scripted answers instead of input() prompts.
+
+Usage: python benchmarks/bench_workloads.py [--ingredients 200] [--variants 300]
+       [--per-recipe 6] [--days 30] [--sales-per-day 100] [--orders 50]
+       [--backend excel|sqlite] [--output results.json]
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import costing_app
+import database
+import inventory_manager
+import pos_system
+import synthetic
+from sqlite_backend import SQLiteBackend
+
+TRACED_CALLS = 3  # Calls repeated under tracemalloc to measure peak memory
+
+@contextlib.contextmanager
+def scripted(answers):
+    """Feeds `answers` to input() and discards everything printed."""
+    answers = iter(answers)
+    original_input = builtins.input
+    builtins.input = lambda prompt='': next(answers)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input = original_input
+
+def measure(fn, calls):
+    """Calls fn(i) `calls` times. Returns per-call latencies (s) and the traced peak memory (bytes)."""
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    for i in range(calls, calls + min(calls, TRACED_CALLS)):
+        fn(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, peak
+
+def summarize(latencies, peak):
+    latencies = np.array(latencies)
+    total = latencies.sum()
+    return {
+        'calls': len(latencies),
+        'total_s': round(float(total), 4),
+        'throughput_per_s': round(len(latencies) / total, 2) if total > 0 else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 3),
+        'peak_memory_mb': round(peak / 2**20, 2),
+    }
+
+# --- Workloads ---
+
+def order_script(available_menu, rng, max_items=3):
+    """Answers for one POSSystem.place_order: customer, item numbers, 'done'."""
+    available = [i + 1 for i, item in enumerate(available_menu) if item['Available']]
+    picks = rng.choice(available, rng.integers(1, max_items + 1))
+    return [f'Table {rng.integers(1, 20)}'] + [str(pick) for pick in picks] + ['done']
+
+def run_workloads(args, rng):
+    results = {}
+    sheets = [database.SHEET_MENU, database.SHEET_INVENTORY, database.SHEET_SALES]
+    ingredient_names = database.load_sheet(database.SHEET_INVENTORY, copy=False)['Ingredient Name'].tolist()
+
+    def load_cold(i):
+        database.invalidate_cache()
+        getattr(database.get_backend(), '_frames', {}).clear()
+        database.load_sheet(sheets[i % len(sheets)])
+    results['load_sheet_cold'] = summarize(*measure(load_cold, args.calls))
+    results['load_sheet_warm'] = summarize(*measure(lambda i: database.load_sheet(sheets[i % len(sheets)]), args.calls))
+
+    new_sales = synthetic.make_sales(database.load_sheet(database.SHEET_MENU, copy=False), 1, 10, rng)[0]
+    results['save_dataframe_append'] = summarize(*measure(
+        lambda i: database.save_dataframe(new_sales, database.SHEET_SALES, mode='append'), args.calls))
+
+    results['update_inventory'] = summarize(*measure(
+        lambda i: database.update_inventory(ingredient_names[i % len(ingredient_names)], 1), args.calls))
+
+    pos = pos_system.POSSystem()
+    results['get_available_menu'] = summarize(*measure(lambda i: pos.get_available_menu(), args.calls))
+
+    def place(i):
+        # Like POSSystem.run: check availability, then take the order
+        available_menu = pos.get_available_menu()
+        with scripted(order_script(available_menu, rng)):
+            pos.place_order(available_menu)
+    results['place_order'] = summarize(*measure(place, args.orders))
+
+    def serve(i):
+        with scripted(['1']):
+            pos.serve_order()
+    # The orders placed during the traced pass are left pending
+    results['serve_order'] = summarize(*measure(serve, args.orders))
+
+    lookup = database.load_sheet(database.SHEET_INVENTORY, copy=False)['Ingredient Name']
+    def cost_recipe(i):
+        lines = []
+        for name in rng.choice(lookup, args.per_recipe, replace=False):
+            lines += [name, str(rng.integers(1, 200))]
+        with scripted(['50', f'Bench Item {i}', '16oz'] + lines + ['done', '5', 'quit']):
+            costing_app.CostingApp().run()
+    results['costing_run'] = summarize(*measure(cost_recipe, args.calls))
+
+    def restock(i):
+        name = ingredient_names[i % len(ingredient_names)]
+        with scripted([name, str(rng.integers(100, 2000)), '1000', '20', 'quit']):
+            inventory_manager.InventoryManager().restock()
+    results['restock'] = summarize(*measure(restock, args.calls))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ingredients', type=int, default=200)
+    parser.add_argument('--variants', type=int, default=300, help='menu item/size recipes')
+    parser.add_argument('--per-recipe', type=int, default=6, help='ingredients per recipe')
+    parser.add_argument('--days', type=int, default=30, help='days of sales history')
+    parser.add_argument('--sales-per-day', type=int, default=100)
+    parser.add_argument('--orders', type=int, default=50, help='scripted orders to place and serve')
+    parser.add_argument('--calls', type=int, default=20, help='calls per non-order operation')
+    parser.add_argument('--backend', choices=['excel', 'sqlite'], default='excel')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)  # The sales journal and order files are created in the working directory
+        try:
+            database.DB_FILE = os.path.join(tmp, 'bench.xlsx')
+            database.invalidate_cache()
+            if args.backend == 'sqlite':
+                database.set_backend(SQLiteBackend(os.path.join(tmp, 'bench.db')))
+            else:
+                database.set_backend(database.ExcelBackend())
+
+            start = time.perf_counter()
+            synthetic.make_workbook(args.ingredients, args.variants, args.per_recipe,
+                                    args.days, args.sales_per_day, args.seed)
+            setup_s = time.perf_counter() - start
+            results = run_workloads(args, rng)
+            # Fold the write-ahead log in before the directory is removed
+            database.checkpoint()
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'timestamp': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+        },
+        'setup_s': round(setup_s, 3),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+if __name__ == "__main__":
+    main()
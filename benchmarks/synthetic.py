@@ -0,0 +1,97 @@
+# benchmarks/synthetic.py
+"""Synthetic coffee-shop data for the benchmarks.
+
+Builds Inventory_Stock, Menu_Costing, Daily_Sales and Sales_Items frames in the
+same layout the apps write, sized by number of ingredients, menu variants,
+ingredients per recipe and days of sales history.
+"""
+import os
+import sys
+import uuid
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import costing_app
+import database
+
+SIZES = ['8oz', '12oz', '16oz', '22oz', '1pc']
+
+def make_inventory(ingredients, rng, stock=1e9):
+    """Inventory_Stock with `ingredients` rows and (by default) practically endless stock."""
+    bulk = rng.choice([500.0, 750.0, 1000.0, 5000.0], ingredients)
+    price = rng.integers(50, 2000, ingredients).astype(float)
+    fee = rng.choice([0.0, 20.0, 50.0], ingredients)
+    return pd.DataFrame({
+        'Ingredient Name': [f'Ingredient {i:05d}' for i in range(ingredients)],
+        'Last Whole Sale Price (₱)': price,
+        'Bulk Quantity (g/ml)': bulk,
+        'Unit (g/ml)': rng.choice(['g', 'ml', 'pc'], ingredients),
+        'Delivery Fee (₱)': fee,
+        'Total Cost (₱)': price + fee,
+        'Cost/Unit': (price + fee) / bulk,
+        'Current Stock (g/ml)': np.full(ingredients, stock),
+    })
+
+def make_menu(df_inventory, variants, per_recipe, rng):
+    """Menu_Costing with `variants` menu item/size recipes of `per_recipe` ingredients each."""
+    per_recipe = min(per_recipe, len(df_inventory))
+    picks = np.array([rng.choice(len(df_inventory), per_recipe, replace=False) for _ in range(variants)]).ravel()
+    item_ids = np.repeat(np.arange(variants), per_recipe)
+    lines = pd.DataFrame({
+        'Menu Item Name': [f'Menu Item {i // len(SIZES):04d}' for i in item_ids],
+        'Size/Container': [SIZES[i % len(SIZES)] for i in item_ids],
+        'Profit Target (%)': np.repeat(rng.choice([40.0, 50.0, 60.0], variants), per_recipe),
+        'Other Variable Costs (₱)': np.repeat(rng.choice([0.0, 5.0, 8.0], variants), per_recipe),
+        'Ingredient Name': df_inventory['Ingredient Name'].to_numpy()[picks],
+        'Unit (g/ml)': df_inventory['Unit (g/ml)'].to_numpy()[picks],
+        'Cost/Unit (₱)': df_inventory['Cost/Unit'].to_numpy()[picks],
+        'Needed Quantity (g/ml)': rng.integers(1, 250, len(picks)).astype(float),
+        'MenuIngredientID': [str(uuid.uuid4()) for _ in range(len(picks))],
+    })
+    lines = costing_app.cost_menu_lines(lines).reindex(columns=costing_app.MENU_COLUMNS)
+    return costing_app.with_separators(lines)
+
+def make_sales(df_menu, days, sales_per_day, rng, max_items=3):
+    """Daily_Sales and Sales_Items covering the last `days` days."""
+    menu = df_menu[df_menu['Menu Item Name'].notna()].drop_duplicates(['Menu Item Name', 'Size/Container'])
+    sales = days * sales_per_day
+    start = pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+    dates = start + pd.to_timedelta(np.sort(rng.integers(0, days * 24 * 3600, sales)), unit='s')
+    items_count = rng.integers(1, max_items + 1, sales)
+    sale_ids = np.array([str(uuid.uuid4()) for _ in range(sales)])
+
+    item_sale = np.repeat(np.arange(sales), items_count)
+    picks = rng.integers(0, len(menu), len(item_sale))
+    prices = menu['Suggested Selling Price (₱)'].to_numpy(dtype=float)[picks].round(2)
+    date_text = dates.strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+    df_items = pd.DataFrame({
+        'SaleID': sale_ids[item_sale],
+        'Date': date_text[item_sale],
+        'Menu Item Name': menu['Menu Item Name'].to_numpy()[picks],
+        'Size/Container': menu['Size/Container'].to_numpy()[picks],
+        'Price': prices,
+    })
+    df_sales = pd.DataFrame({
+        'SaleID': sale_ids,
+        'Date': date_text,
+        'Total Sale (₱)': np.bincount(item_sale, weights=prices, minlength=sales),
+        'Customer/Table': rng.choice(['Table 1', 'Table 2', 'Table 3', 'Take-out'], sales),
+        'Items Count': items_count,
+    })
+    return df_sales, df_items
+
+def make_workbook(ingredients=200, variants=300, per_recipe=6, days=30, sales_per_day=100, seed=0):
+    """Writes a synthetic database to the active backend and returns the frames by sheet."""
+    rng = np.random.default_rng(seed)
+    df_inventory = make_inventory(ingredients, rng)
+    df_menu = make_menu(df_inventory, variants, per_recipe, rng)
+    df_sales, df_items = make_sales(df_menu, days, sales_per_day, rng)
+    frames = {
+        database.SHEET_MENU: df_menu,
+        database.SHEET_INVENTORY: df_inventory,
+        database.SHEET_SALES: df_sales,
+        database.SHEET_SALES_ITEMS: df_items,
+    }
+    database.save_dataframes({name: (df, 'overwrite') for name, df in frames.items()})
+    return frames
@@ -0,0 +1,225 @@
+# cost_layers.py
+import os
+import numpy as np
+import pandas as pd
+import database
+
+POLICY_FIFO = 'fifo'
+POLICY_AVERAGE = 'average'
+LOT_COLUMNS = ['Ingredient Name', 'Received', 'Quantity (g/ml)', 'Unit Cost (₱)']
+EMPTY = 1e-9  # Remaining quantity below which a lot counts as used up
+OPENING = 'Opening stock'  # 'Received' of the lot holding stock from before lots were recorded
+
+def get_policy():
+    """Returns the costing policy from COFFEESHOP_COST_POLICY (fifo or average)."""
+    policy = os.environ.get('COFFEESHOP_COST_POLICY', POLICY_FIFO).lower()
+    return policy if policy in (POLICY_FIFO, POLICY_AVERAGE) else POLICY_FIFO
+
+class LotQueue:
+    """The lots of one ingredient, oldest first, in two growable arrays.
+
+    Consumption moves a head pointer past used-up lots, so each lot is
+    visited once: O(1) amortized per deduction. The arrays are compacted
+    (used-up lots dropped) or doubled only when the end is reached.
+    """
+
+    def __init__(self, capacity=4):
+        self.remaining = np.zeros(capacity)
+        self.unit_cost = np.zeros(capacity)
+        self.received = np.empty(capacity, dtype=object)  # The lots' 'Received' labels
+        self.head = 0
+        self.tail = 0
+
+    def push(self, qty, unit_cost, received=None):
+        if self.tail == len(self.remaining):
+            live = self.tail - self.head
+            capacity = len(self.remaining) * 2 if live * 2 > len(self.remaining) else len(self.remaining)
+            remaining, costs, labels = np.zeros(capacity), np.zeros(capacity), np.empty(capacity, dtype=object)
+            remaining[:live] = self.remaining[self.head:self.tail]
+            costs[:live] = self.unit_cost[self.head:self.tail]
+            labels[:live] = self.received[self.head:self.tail]
+            self.remaining, self.unit_cost, self.received = remaining, costs, labels
+            self.head, self.tail = 0, live
+        self.remaining[self.tail] = qty
+        self.unit_cost[self.tail] = unit_cost
+        self.received[self.tail] = received
+        self.tail += 1
+
+    def consume(self, qty):
+        """Takes `qty` from the oldest lots. Returns (cost, qty not covered by any lot)."""
+        cost = 0.0
+        while qty > EMPTY and self.head < self.tail:
+            take = min(qty, self.remaining[self.head])
+            cost += take * self.unit_cost[self.head]
+            self.remaining[self.head] -= take
+            qty -= take
+            if self.remaining[self.head] <= EMPTY:
+                self.head += 1
+        return cost, max(qty, 0.0)
+
+    def on_hand(self):
+        return float(self.remaining[self.head:self.tail].sum())
+
+    def value(self):
+        return float(self.remaining[self.head:self.tail] @ self.unit_cost[self.head:self.tail])
+
+    def last_cost(self):
+        return float(self.unit_cost[self.tail - 1]) if self.tail else 0.0
+
+    def open_lots(self):
+        """Returns [(received, remaining qty, unit cost), ...] of the lots not used up, oldest first."""
+        live = slice(self.head, self.tail)
+        return [
+            (received, float(qty), float(cost))
+            for received, qty, cost in zip(self.received[live], self.remaining[live], self.unit_cost[live])
+            if qty > EMPTY
+        ]
+
+class CostLayers:
+    """Inventory cost layers: every restock is a lot, every deduction consumes lots.
+
+    The Inventory_Lots sheet holds the open lots (ingredient, quantity, unit
+    cost including the delivery fee) as of the last restock, which rewrites
+    it with what is left of each lot (see lot_rows), so the sheet and load()
+    stay as small as the stock on hand. Deductions since then are not
+    stored: on load, everything in the lots beyond the current stock is
+    consumed again oldest first. The moving average is kept in the
+    inventory's 'Average Cost/Unit' column since it depends on when
+    restocks happened.
+
+    With the 'fifo' policy a deduction costs what its lots cost; with
+    'average' it costs the moving average at the time of the deduction.
+    """
+
+    def __init__(self, policy=None):
+        self.policy = policy or get_policy()
+        self.lots = {}       # ingredient -> LotQueue
+        self.average = {}    # ingredient -> moving average unit cost
+        self.opening = {}    # ingredient -> (qty, unit cost) of stock not in Inventory_Lots yet
+        self.source = None
+
+    @classmethod
+    def load(cls, policy=None):
+        """Rebuilds the lots from Inventory_Lots and Inventory_Stock."""
+        layers = cls(policy)
+        df_lots = database.load_sheet(database.SHEET_LOTS, copy=False)
+        df_inventory = database.load_sheet(database.SHEET_INVENTORY, copy=False)
+        layers.source = df_lots
+        if df_inventory.empty or 'Ingredient Name' not in df_inventory.columns:
+            return layers
+
+        received = pd.Series(dtype=float)
+        if not df_lots.empty:
+            received = df_lots.groupby('Ingredient Name')['Quantity (g/ml)'].sum()
+        inventory = df_inventory[df_inventory['Ingredient Name'].notna()]
+        stock = inventory['Current Stock (g/ml)'].fillna(0).to_numpy(dtype=float)
+        cost = inventory['Cost/Unit'].fillna(0).to_numpy(dtype=float)
+        average = cost
+        if 'Average Cost/Unit' in inventory.columns:
+            average = inventory['Average Cost/Unit'].fillna(inventory['Cost/Unit']).fillna(0).to_numpy(dtype=float)
+        # Stock from before lots were recorded becomes one opening lot at the current cost
+        opening = stock - received.reindex(inventory['Ingredient Name']).fillna(0).to_numpy()
+
+        for name, qty, unit_cost, avg in zip(inventory['Ingredient Name'], opening, cost, average):
+            layers.lots[name] = LotQueue()
+            layers.average[name] = avg
+            if qty > EMPTY:
+                layers.lots[name].push(qty, unit_cost, OPENING)
+                layers.opening[name] = (float(qty), float(unit_cost))
+        if not df_lots.empty:
+            for name, received, qty, unit_cost in zip(df_lots['Ingredient Name'], df_lots['Received'],
+                                                      df_lots['Quantity (g/ml)'], df_lots['Unit Cost (₱)']):
+                layers.lots.setdefault(name, LotQueue()).push(qty, unit_cost, received)
+
+        for name, on_hand in zip(inventory['Ingredient Name'], stock):
+            used = layers.lots[name].on_hand() - on_hand
+            if used > EMPTY:
+                layers.lots[name].consume(used)
+        return layers
+
+    @staticmethod
+    def _lot_row(name, received, qty, unit_cost):
+        return {'Ingredient Name': name, 'Received': received, 'Quantity (g/ml)': qty, 'Unit Cost (₱)': unit_cost}
+
+    def receive(self, name, qty, unit_cost):
+        """Adds a lot. Returns (lot rows for Inventory_Lots, new moving average cost).
+
+        The first restock of an ingredient also records its opening stock as a
+        lot at the old Cost/Unit, so it keeps that cost once Cost/Unit changes.
+        """
+        rows = []
+        if name in self.opening:
+            opening_qty, opening_cost = self.opening.pop(name)
+            rows.append(self._lot_row(name, OPENING, opening_qty, opening_cost))
+        queue = self.lots.setdefault(name, LotQueue())
+        on_hand = queue.on_hand()
+        previous = self.average.get(name, unit_cost)
+        total = on_hand + qty
+        self.average[name] = (on_hand * previous + qty * unit_cost) / total if total > 0 else unit_cost
+        received = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+        queue.push(qty, unit_cost, received)
+        rows.append(self._lot_row(name, received, qty, unit_cost))
+        return rows, self.average[name]
+
+    def lot_rows(self):
+        """Returns what is left of every lot as the Inventory_Lots sheet, dropping used-up lots."""
+        rows = [
+            self._lot_row(name, received, qty, unit_cost)
+            for name, queue in self.lots.items()
+            for received, qty, unit_cost in queue.open_lots()
+        ]
+        return pd.DataFrame(rows, columns=LOT_COLUMNS)
+
+    def consume(self, needs):
+        """Consumes {ingredient: qty} and returns {ingredient: cost of goods used}.
+
+        Quantities not covered by any lot are costed at the ingredient's last lot cost.
+        """
+        costs = {}
+        for name, qty in needs.items():
+            queue = self.lots.setdefault(name, LotQueue())
+            lot_cost, uncovered = queue.consume(qty)
+            if self.policy == POLICY_AVERAGE:
+                costs[name] = float(qty * self.average.get(name, queue.last_cost()))
+            else:
+                costs[name] = float(lot_cost + uncovered * queue.last_cost())
+        return costs
+
+    def valuation(self):
+        """Returns the stock on hand and its value under both policies, per ingredient."""
+        rows = []
+        for name, queue in self.lots.items():
+            on_hand = queue.on_hand()
+            rows.append({
+                'Ingredient Name': name,
+                'On Hand (g/ml)': on_hand,
+                'Open Lots': queue.tail - queue.head,
+                'FIFO Value (₱)': queue.value(),
+                'Average Cost/Unit': self.average.get(name, queue.last_cost()),
+                'Average Value (₱)': on_hand * self.average.get(name, queue.last_cost()),
+            })
+        return pd.DataFrame(rows)
+
+# --- Shared layers ---
+# Rebuilt when the lots sheet changes (a restock); deductions update them in memory.
+# A restock works on layers of its own (CostLayers.load()), so a restock that
+# fails to save leaves the shared layers as they were.
+_shared_layers = None
+
+def get_cost_layers():
+    global _shared_layers
+    df_lots = database.load_sheet(database.SHEET_LOTS, copy=False)
+    if _shared_layers is None or _shared_layers.source is not df_lots:
+        _shared_layers = CostLayers.load()
+    return _shared_layers
+
+if __name__ == "__main__":
+    layers = CostLayers.load()
+    df_value = layers.valuation()
+    if df_value.empty:
+        print("No inventory to value yet.")
+    else:
+        print(f"Inventory valuation ({layers.policy} policy for cost of goods):")
+        print(df_value.to_string(index=False))
+        print(f"Total: FIFO {database.CURRENCY}{df_value['FIFO Value (₱)'].sum():.2f} | "
+              f"Average {database.CURRENCY}{df_value['Average Value (₱)'].sum():.2f}")
@@ -1,11 +1,86 @@
 # costing_app.py
+import json
+import numpy as np
 import pandas as pd
 import database
+import ingredients
+import recipe_index
+import units
 import uuid # For generating unique IDs
 
+MENU_COLUMNS = [
+    'Menu Item Name', 'Size/Container', 'Profit Target (%)', 'Other Variable Costs (₱)',
+    'Total Prime Cost (₱)', 'Suggested Selling Price (₱)', 'Profit Amount (₱)',
+    'Ingredient Name', 'Unit (g/ml)', 'Cost/Unit (₱)', 'Needed Quantity (g/ml)',
+    'Ingredient Cost (₱)', 'MenuIngredientID'
+]
+# Columns a batch recipe file must provide (one row per ingredient for CSV)
+RECIPE_COLUMNS = ['Menu Item Name', 'Size/Container', 'Profit Target (%)', 'Ingredient Name', 'Needed Quantity (g/ml)']
+NEEDED_UNIT = 'Needed Unit'  # Optional recipe file column: unit of the needed quantity (default: the inventory unit)
+MENU_KEYS = ['Menu Item Name', 'Size/Container']
+# Columns that change when an ingredient's Cost/Unit changes
+COST_COLUMNS = ['Cost/Unit (₱)', 'Ingredient Cost (₱)', 'Total Prime Cost (₱)', 'Suggested Selling Price (₱)', 'Profit Amount (₱)']
+
+def suggested_price(prime_cost, profit_percent):
+    """Selling price at which `profit_percent` of the price is profit over the prime cost.
+
+    Works on numbers, Series and arrays alike.
+    """
+    return prime_cost / (1 - (profit_percent / 100))
+
+def cost_menu_lines(lines):
+    """Computes the cost and price columns of recipe lines (one row per ingredient) in one pass.
+
+    Uses each line's Cost/Unit, Needed Quantity, Profit Target and Other
+    Variable Costs; the totals are summed per menu item/size.
+    """
+    lines = lines.copy()
+    lines['Ingredient Cost (₱)'] = lines['Cost/Unit (₱)'] * lines['Needed Quantity (g/ml)']
+    ingredient_total = lines.groupby(MENU_KEYS, sort=False)['Ingredient Cost (₱)'].transform('sum')
+    lines['Total Prime Cost (₱)'] = ingredient_total + lines['Other Variable Costs (₱)']
+    lines['Suggested Selling Price (₱)'] = suggested_price(lines['Total Prime Cost (₱)'], lines['Profit Target (%)'])
+    lines['Profit Amount (₱)'] = lines['Suggested Selling Price (₱)'] - lines['Total Prime Cost (₱)']
+    return lines
+
+def with_separators(lines):
+    """Groups recipe lines per menu item/size with a blank row after each, as the menu sheet is laid out."""
+    if lines.empty:
+        return lines
+    codes = lines.groupby(MENU_KEYS, sort=False).ngroup().to_numpy()
+    blanks = pd.DataFrame(np.nan, index=range(codes.max() + 1), columns=lines.columns)
+    combined = pd.concat([lines, blanks], ignore_index=True)
+    order = np.concatenate([codes * 2, np.arange(len(blanks)) * 2 + 1])
+    return combined.iloc[np.argsort(order, kind='stable')].reset_index(drop=True)
+
+def read_recipe_file(path):
+    """Reads recipe definitions into one row per ingredient.
+
+    CSV files have one row per ingredient with the RECIPE_COLUMNS (and
+    optionally 'Other Variable Costs (₱)' and 'Needed Unit'). JSON files hold
+    a list of recipes, each with the menu columns and an 'Ingredients' list of
+    {'Ingredient Name', 'Needed Quantity (g/ml)'} (and optionally 'Needed Unit').
+    """
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            recipes = json.load(f)
+        meta = [col for col in ['Menu Item Name', 'Size/Container', 'Profit Target (%)', 'Other Variable Costs (₱)']
+                if any(col in recipe for recipe in recipes)]
+        return pd.json_normalize(recipes, record_path='Ingredients', meta=meta, errors='ignore')
+    return pd.read_csv(path)
+
 class CostingApp:
     def __init__(self):
         self.currency_symbol = database.CURRENCY
+        self._table = None
+
+    def ingredient_table(self, refresh=False):
+        """Returns the inventory's IngredientTable, built once per session."""
+        if self._table is None or refresh:
+            self._table = ingredients.IngredientTable.from_inventory(
+                database.load_sheet(database.SHEET_INVENTORY, copy=False))
+            for problem in self._table.problems:
+                print(f"  Warning: {problem}")
+        return self._table
 
     def get_profit_percent(self):
         """Prompts the user for the desired profit percentage."""
@@ -33,15 +108,11 @@ class CostingApp:
                 continue
             
             # --- Check Inventory for Unit Cost ---
-            df_inventory = database.load_sheet(database.SHEET_INVENTORY)
-            inv_match = df_inventory[df_inventory['Ingredient Name'].str.lower() == ingredient_name.lower()]
+            ingredient = self.ingredient_table().get(ingredient_name)
             
-            cost_per_unit = 0
-            unit = 'g' # Default
-            
-            if not inv_match.empty:
-                cost_per_unit = inv_match['Cost/Unit'].iloc[0]
-                unit = inv_match['Unit (g/ml)'].iloc[0]
+            if ingredient is not None:
+                # Store the inventory's spelling so POS deductions find the ingredient
+                ingredient_name, cost_per_unit, unit = ingredient.name, ingredient.cost_per_unit, ingredient.unit
                 print(f"  Found '{ingredient_name}' in Inventory. Cost/Unit: {self.currency_symbol}{cost_per_unit:.4f} / {unit}")
             else:
                 print(f"  Warning: '{ingredient_name}' not found in Inventory. Please add it via Inventory Restock.")
@@ -49,10 +120,13 @@ class CostingApp:
 
             while True:
                 try:
-                    needed_quantity = float(input(f"  Quantity of **{ingredient_name}** needed for the drink ({unit}): "))
+                    # e.g. '18' (in the inventory unit) or '1 tbsp'; stored in the inventory unit
+                    needed_quantity, needed_unit = units.parse_quantity(
+                        input(f"  Quantity of **{ingredient_name}** needed for the drink ({unit}): "), unit)
+                    needed_quantity = units.convert(needed_quantity, needed_unit, unit)
                     break
-                except ValueError:
-                    print("  Invalid input. Please enter a valid quantity.")
+                except ValueError as e:
+                    print(f"  Invalid input: {e} Please enter a valid quantity.")
             
             ingredient_cost = cost_per_unit * needed_quantity
             current_ingredient_cost_total += ingredient_cost
@@ -77,6 +151,7 @@ class CostingApp:
         print("## 💰 Menu Costing and Pricing 💰")
         profit_percent = self.get_profit_percent()
         menu_rows = []
+        new_recipes = []
 
         while True:
             print("\n" + "=" * 40)
@@ -103,14 +178,14 @@ class CostingApp:
                     print("Invalid input. Please enter a valid cost.")
             
             total_prime_cost = total_ingredient_cost + other_costs
-            suggested_price = total_prime_cost / (1 - (profit_percent / 100))
-            profit_amount = suggested_price - total_prime_cost
+            selling_price = suggested_price(total_prime_cost, profit_percent)
+            profit_amount = selling_price - total_prime_cost
 
             print("\n--- **Calculated Results** ---")
             print(f"**Total Ingredient Cost:** {self.currency_symbol}{total_ingredient_cost:.2f}")
             print(f"**Total Prime Cost (Ingredients + Other Costs):** {self.currency_symbol}{total_prime_cost:.2f}")
             print(f"**Target Profit ({profit_percent:.1f}%):** {self.currency_symbol}{profit_amount:.2f}")
-            print(f"**Suggested Selling Price:** **{self.currency_symbol}{suggested_price:.2f}**")
+            print(f"**Suggested Selling Price:** **{self.currency_symbol}{selling_price:.2f}**")
             print("-" * 28)
 
             # Store the data for saving to Excel
@@ -121,7 +196,7 @@ class CostingApp:
                     'Profit Target (%)': profit_percent,
                     'Other Variable Costs (₱)': other_costs,
                     'Total Prime Cost (₱)': total_prime_cost,
-                    'Suggested Selling Price (₱)': suggested_price,
+                    'Suggested Selling Price (₱)': selling_price,
                     'Profit Amount (₱)': profit_amount,
                     'Ingredient Name': ingredient['Ingredient Name'],
                     'Unit (g/ml)': ingredient['Unit (g/ml)'],
@@ -134,19 +209,172 @@ class CostingApp:
             
             # Add blank row for readability in the sheet
             menu_rows.append({}) 
+            new_recipes.append((menu_name, cup_size, selling_price, [
+                (ingredient['Ingredient Name'], ingredient['Needed Quantity (g/ml)']) for ingredient in ingredients
+            ]))
 
-        # Load existing data and append new menu rows
-        df_existing = database.load_sheet(database.SHEET_MENU)
+        # Append the new menu rows to the existing menu sheet
         df_new = pd.DataFrame(menu_rows)
-        
-        if not df_existing.empty:
-            df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-        else:
-            df_combined = df_new
+        database.save_dataframe(df_new, database.SHEET_MENU, mode='append')
 
-        database.save_dataframe(df_combined, database.SHEET_MENU)
+        # Extend the shared recipe index in place instead of rebuilding it
+        index = recipe_index.get_recipe_index(rebuild=False)
+        for menu_name, cup_size, selling_price, lines in new_recipes:
+            index.add_recipe(menu_name, cup_size, selling_price, lines)
+        index.source = database.load_sheet(database.SHEET_MENU, copy=False)
         print("\n✅ Menu costing data saved to the database.")
 
+    # --- Batch mode ---
+
+    def import_recipes(self, path):
+        """Costs every recipe in a CSV/JSON file and writes them to Menu_Costing in one save.
+
+        Recipes that already exist (same menu item and size) are replaced.
+        A recipe with an ingredient that is not in the inventory is skipped.
+        """
+        print(f"## 💰 Importing recipes from {path} 💰")
+        try:
+            lines = read_recipe_file(path)
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            return None
+        missing_cols = [col for col in RECIPE_COLUMNS if col not in lines.columns]
+        if missing_cols:
+            print(f"Error: {path} is missing column(s): {', '.join(missing_cols)}")
+            return None
+        if 'Other Variable Costs (₱)' not in lines.columns:
+            lines['Other Variable Costs (₱)'] = 0.0
+
+        lines = lines[lines['Menu Item Name'].notna()].copy()
+        for col in ['Profit Target (%)', 'Other Variable Costs (₱)', 'Needed Quantity (g/ml)']:
+            lines[col] = pd.to_numeric(lines[col], errors='coerce')
+        lines['Other Variable Costs (₱)'] = lines['Other Variable Costs (₱)'].fillna(0)
+
+        # Resolve every ingredient against the inventory in one lookup
+        table = self.ingredient_table(refresh=True)
+        ids = table.ids_for(lines['Ingredient Name'])
+        found = ids >= 0
+        lines.loc[found, 'Ingredient Name'] = table.take(np.array(table.names, dtype=object), ids, None)[found]
+        lines['Unit (g/ml)'] = table.take(table.units, ids, None)
+        lines['Cost/Unit (₱)'] = table.take(table.cost_per_unit, ids).astype(float)
+
+        # Needed quantities in another unit (e.g. tbsp of an ingredient stocked in ml) are stored in the inventory unit
+        convertible = np.ones(len(lines), dtype=bool)
+        if NEEDED_UNIT in lines.columns:
+            given = lines[NEEDED_UNIT].notna().to_numpy()
+            factors = units.conversion_factors(lines[NEEDED_UNIT].where(given, lines['Unit (g/ml)']), lines['Unit (g/ml)'])
+            convertible = ~found | ~given | ~np.isnan(factors)
+            lines['Needed Quantity (g/ml)'] = lines['Needed Quantity (g/ml)'] * np.where(given, factors, 1.0)
+
+        incomplete = (lines['Needed Quantity (g/ml)'].isna() | lines['Profit Target (%)'].isna()).to_numpy()
+        skipped = ~found | incomplete | ~convertible
+        for menu_name, size, ingredient_name, is_found, is_convertible in zip(
+            lines['Menu Item Name'][skipped], lines['Size/Container'][skipped],
+            lines['Ingredient Name'][skipped], found[skipped], convertible[skipped]
+        ):
+            if not is_found:
+                problem = "not found in Inventory"
+            elif not is_convertible:
+                problem = "has a Needed Unit that cannot be converted to its inventory unit"
+            else:
+                problem = "has no quantity or profit target"
+            print(f"  Warning: skipping {menu_name} ({size}): '{ingredient_name}' {problem}.")
+        keys = pd.MultiIndex.from_frame(lines[MENU_KEYS])
+        lines = lines[~keys.isin(keys[skipped])]
+        if lines.empty:
+            print("No recipes to import.")
+            return None
+
+        costed = cost_menu_lines(lines)
+        costed['MenuIngredientID'] = [str(uuid.uuid4()) for _ in range(len(costed))]
+        costed = costed.reindex(columns=MENU_COLUMNS)
+
+        # Keep the other recipes and replace the imported ones, then save once
+        df_menu = database.load_sheet(database.SHEET_MENU, copy=False)
+        if not df_menu.empty and 'Menu Item Name' in df_menu.columns:
+            existing = df_menu[df_menu['Menu Item Name'].notna()]
+            replaced = pd.MultiIndex.from_frame(existing[MENU_KEYS]).isin(pd.MultiIndex.from_frame(costed[MENU_KEYS]))
+            costed = pd.concat([existing[~replaced], costed], ignore_index=True)
+        database.save_dataframe(with_separators(costed), database.SHEET_MENU, mode='overwrite')
+
+        summary = costed.drop_duplicates(MENU_KEYS)
+        print(f"✅ Imported {lines.groupby(MENU_KEYS).ngroups} recipe(s); the menu now has {len(summary)} item(s).")
+        return costed
+
+    def recost_all(self):
+        """Reprices every menu item from the inventory's current Cost/Unit and saves the menu once.
+
+        Returns a DataFrame of the items whose suggested price changed.
+        """
+        print("## 💰 Re-costing the whole menu 💰")
+        df_menu = database.load_sheet(database.SHEET_MENU)
+        if df_menu.empty or 'Menu Item Name' not in df_menu.columns:
+            print("No menu items to re-cost.")
+            return None
+
+        is_line = df_menu['Menu Item Name'].notna()
+        lines = df_menu[is_line]
+        table = self.ingredient_table(refresh=True)
+        ids = table.ids_for(lines['Ingredient Name'])
+        found = ids >= 0
+        for ingredient_name in lines.loc[~found, 'Ingredient Name'].dropna().unique():
+            print(f"  Warning: '{ingredient_name}' not found in Inventory; keeping its last Cost/Unit.")
+        new_cost = np.where(found, table.take(table.cost_per_unit, ids), lines['Cost/Unit (₱)'].to_numpy(dtype=float))
+
+        costed = cost_menu_lines(lines.assign(**{'Cost/Unit (₱)': new_cost}))
+        df_menu.loc[is_line, COST_COLUMNS] = costed[COST_COLUMNS]
+        database.save_dataframe(df_menu, database.SHEET_MENU, mode='overwrite')
+
+        changes = self._report_price_changes(lines, costed)
+        print(f"✅ Re-costed {lines.groupby(MENU_KEYS).ngroups} menu item(s); {len(changes)} price(s) changed.")
+        return changes
+
+    def reprice(self, cost_per_unit):
+        """Reprices only the menu items that use the given ingredients.
+
+        `cost_per_unit` is {ingredient name: new Cost/Unit}, e.g. from a
+        restock. The RecipeIndex maps each ingredient to the Menu_Costing rows
+        of the recipes using it; just those rows are recomputed with their
+        stored profit target and written back. Returns the price changes.
+        """
+        index = recipe_index.get_recipe_index()
+        affected = index.dependent_items(cost_per_unit)
+        if not affected:
+            return pd.DataFrame(columns=MENU_KEYS + ['Old Price (₱)', 'New Price (₱)'])
+
+        rows = np.concatenate(list(affected.values()))
+        lines = database.load_sheet(database.SHEET_MENU, copy=False).loc[rows]
+        new_costs = pd.Series({str(name).strip().casefold(): cost for name, cost in cost_per_unit.items()}, dtype=float)
+        new_cost = ingredients.fold(lines['Ingredient Name']).map(new_costs)
+        costed = cost_menu_lines(lines.assign(**{'Cost/Unit (₱)': new_cost.fillna(lines['Cost/Unit (₱)'])}))
+        database.update_rows(costed[COST_COLUMNS], database.SHEET_MENU)
+
+        # Keep the shared index in step instead of rebuilding it
+        new_prices = costed.groupby(MENU_KEYS, sort=False)['Suggested Selling Price (₱)'].first()
+        index.update_prices(new_prices.to_dict(), database.load_sheet(database.SHEET_MENU, copy=False))
+
+        print(f"## 💰 Repriced {len(affected)} menu item(s) using {', '.join(map(str, cost_per_unit))} 💰")
+        return self._report_price_changes(lines, costed)
+
+    def _report_price_changes(self, old_lines, new_lines):
+        """Prints and returns the menu items whose suggested selling price changed."""
+        old_prices = old_lines.groupby(MENU_KEYS, sort=False)['Suggested Selling Price (₱)'].first()
+        new_prices = new_lines.groupby(MENU_KEYS, sort=False)['Suggested Selling Price (₱)'].first()
+        changes = pd.DataFrame({'Old Price (₱)': old_prices, 'New Price (₱)': new_prices})
+        changes = changes[~np.isclose(changes['Old Price (₱)'], changes['New Price (₱)'])].reset_index()
+        for row in changes.itertuples(index=False):
+            print(f"  {row[0]} ({row[1]}): {self.currency_symbol}{row[2]:.2f} -> {self.currency_symbol}{row[3]:.2f}")
+        return changes
+
 if __name__ == "__main__":
+    import sys
+
     app = CostingApp()
-    app.run()
\ No newline at end of file
+    if len(sys.argv) > 2 and sys.argv[1] == 'import':
+        app.import_recipes(sys.argv[2])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'recost':
+        app.recost_all()
+    elif len(sys.argv) > 1:
+        print("Usage: python costing_app.py [import recipes.csv|recipes.json | recost]")
+    else:
+        app.run()
\ No newline at end of file
@@ -1,101 +1,603 @@
 
+import atexit
+import contextlib
+import numpy as np
 import pandas as pd
 import os
-from openpyxl import load_workbook, Workbook
+import threading
+import file_lock
+import metrics
+import snapshot
+import wal
+import xlsx_writer
 
 DB_FILE = "coffeeshop_database.xlsx"
 SHEET_MENU = "Menu_Costing"
 SHEET_INVENTORY = "Inventory_Stock"
+SHEET_SALES = "Daily_Sales"
+SHEET_SALES_ITEMS = "Sales_Items"
+SHEET_ROLLUPS = "Sales_Rollups"
+SHEET_LOTS = "Inventory_Lots"
+SHEET_VARIANCE = "Stock_Variance"
 CURRENCY = "₱"
 
-def load_sheet(sheet_name):
-    """Loads a specific sheet from the Excel file into a DataFrame."""
-    if not os.path.exists(DB_FILE):
-        return pd.DataFrame()
+# --- Process-wide sheet cache ---
+# The whole workbook is parsed once and every sheet is kept in memory, keyed by
+# sheet name, with the write-ahead log replayed on top. The cache is dropped
+# when the workbook or its log changes on disk (another process), and updated
+# in place by this process's own writes.
+_cache_lock = threading.RLock()
+_sheet_cache = {}
+_cache_signature = None
+_cache_log_offset = 0  # Bytes of the live log already replayed into the cache
+_cache_stats = {'hits': 0, 'misses': 0}
+
+# --- Write-ahead log ---
+# Writes are appended to DB_FILE + WAL_SUFFIX and acknowledged once fsync'd.
+# A background checkpoint rewrites the workbook (temp file + atomic rename)
+# every CHECKPOINT_INTERVAL seconds or once the log passes CHECKPOINT_BYTES.
+# Changes of more than WAL_MAX_ROWS rows are checkpointed right away instead.
+# Terminals and the server can share one workbook: every process takes the
+# log lock (DB_FILE + LOCK_SUFFIX) to re-read the sheets, work out and append
+# a write, or rotate the log, and the checkpoint lock for a whole checkpoint.
+# Locks are taken in that order (checkpoint, log, then _cache_lock), and the
+# log lock is not held while the workbook is written, so orders keep being
+# logged during a checkpoint.
+WAL_SUFFIX = ".wal"
+LOCK_SUFFIX = ".lock"
+CHECKPOINT_LOCK_SUFFIX = ".checkpoint.lock"
+CHECKPOINT_INTERVAL = 30.0
+CHECKPOINT_BYTES = 4 * 2**20
+WAL_MAX_ROWS = 5000
+_checkpoint_wanted = threading.Event()
+_checkpointer = None
+
+# --- Columnar snapshot ---
+# Each time the workbook is written (or re-parsed) its sheets are also saved as
+# memory-mapped column files in DB_FILE + SNAPSHOT_SUFFIX, which load much
+# faster than the xlsx. DATED_SHEETS are partitioned by month of their date
+# column, so load_sheet_range() only reads the months it needs.
+SNAPSHOT_SUFFIX = ".snapshot"
+DATED_SHEETS = {SHEET_SALES: 'Date', SHEET_SALES_ITEMS: 'Date', SHEET_ROLLUPS: 'Date', SHEET_VARIANCE: 'Date'}
+
+def _snapshot_lock():
+    """Lock (across processes) for writing the snapshot; taken last, with nothing inside it."""
+    return file_lock.lock_for(_snapshot_dir() + LOCK_SUFFIX)
+
+def _wal():
+    return wal.WriteAheadLog(DB_FILE + WAL_SUFFIX)
+
+def _log_lock():
+    """Lock (across processes) for appending to and rotating DB_FILE's log."""
+    return file_lock.lock_for(DB_FILE + LOCK_SUFFIX)
+
+def _checkpoint_lock():
+    """Lock (across processes) for writing DB_FILE."""
+    return file_lock.lock_for(DB_FILE + CHECKPOINT_LOCK_SUFFIX)
+
+def _file_signature():
+    """Returns (path, workbook, rotated log, live log) with each file's mtime/size; missing files are None."""
     try:
-        df = pd.read_excel(DB_FILE, sheet_name=sheet_name)
-        return df
-    except ValueError:
-        # Sheet does not exist, return empty DataFrame
-        return pd.DataFrame()
+        stat = os.stat(DB_FILE)
+        workbook = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        workbook = None
+    log = _wal()
+    return (os.path.abspath(DB_FILE), workbook, log.checkpoint_signature(), log.signature())
+
+def invalidate_cache():
+    """Drops every cached sheet so the next load re-parses the workbook."""
+    global _cache_signature
+    with _cache_lock:
+        _sheet_cache.clear()
+        _cache_signature = None
+
+def cache_stats():
+    """Returns the cache hit/miss counters and the sheets currently cached."""
+    with _cache_lock:
+        return {
+            'hits': _cache_stats['hits'],
+            'misses': _cache_stats['misses'],
+            'sheets': list(_sheet_cache.keys()),
+        }
+
+def reset_cache_stats():
+    """Resets the hit/miss counters to zero."""
+    with _cache_lock:
+        _cache_stats['hits'] = 0
+        _cache_stats['misses'] = 0
+
+def _cached_workbook():
+    """Returns the dict of cached sheets, re-reading what changed on disk.
+
+    If only the live log grew (appends by this or another process), just the
+    new records are replayed. Otherwise the workbook comes from its snapshot
+    when that matches, else from the xlsx (and the snapshot is rewritten),
+    and the whole log is replayed on top, which is also how the changes made
+    before a crash are recovered. Needs no file lock: a checkpoint that
+    replaces the workbook or moves the log aside mid-read makes it read again.
+    """
+    global _cache_signature, _cache_log_offset
+    signature = _file_signature()
+    if signature == _cache_signature:
+        _cache_stats['hits'] += 1
+        return _sheet_cache
+
+    log = _wal()
+    if _cache_signature is not None and signature[:3] == _cache_signature[:3] and \
+            signature[3] is not None and signature[3][1] >= _cache_log_offset:
+        _cache_stats['hits'] += 1
+        records, _cache_log_offset = log.read_from(_cache_log_offset)
+        for record in records:
+            wal.apply(_sheet_cache, record)
+        _cache_signature = signature
+        return _sheet_cache
+
+    _cache_stats['misses'] += 1
+    while True:
+        frames = {}
+        if signature[1] is not None:
+            frames = _load_snapshot(signature[1])
+            if frames is None:
+                with metrics.timer('excel.parse', DB_FILE) as timed:
+                    frames = pd.read_excel(DB_FILE, sheet_name=None)
+                    timed.rows = sum(len(df) for df in frames.values())
+                if _file_signature()[1] == signature[1]:
+                    _save_snapshot(frames, signature[1])
+        records = log.rotating_records()
+        live_records, offset = log.read_from(0)
+        records += live_records
+        current = _file_signature()
+        if current[:3] == signature[:3]:
+            break
+        # A checkpoint replaced the workbook or moved the log aside while we read
+        signature = current
+    for record in records:
+        wal.apply(frames, record)
+    _sheet_cache.clear()
+    _sheet_cache.update(frames)
+    _cache_signature = signature
+    _cache_log_offset = offset
+    if records:
+        _request_checkpoint()
+    return _sheet_cache
+
+def _log_changes(records, frames):
+    """Appends records to the log and makes `frames` the cached workbook.
+
+    Called with the log lock held, right after `frames` was read from the
+    up-to-date cache, so the log holds exactly the cache plus these records.
+    """
+    global _cache_signature, _cache_log_offset
+    with metrics.timer('excel.wal_append', DB_FILE + WAL_SUFFIX) as timed:
+        log = _wal()
+        log.append(records)
+        timed.rows = sum(len(record['rows']) for record in records)
+    _sheet_cache.clear()
+    _sheet_cache.update(frames)
+    _cache_log_offset = log.size()
+    if _cache_signature is not None:
+        _cache_signature = _cache_signature[:3] + (log.signature(),)
+    _start_checkpointer()
+    if log.size() >= CHECKPOINT_BYTES:
+        _request_checkpoint()
+
+def checkpoint():
+    """Writes the cached workbook (log included) to DB_FILE and empties the log.
+
+    The workbook goes to a temp file that is renamed over DB_FILE, so an
+    interrupted checkpoint leaves the old workbook and the log intact. Only
+    one process checkpoints at a time, and the workbook is written outside
+    the log and cache locks; orders keep being logged meanwhile, by this and
+    other processes. Returns True if anything was written.
+    """
+    global _cache_signature, _cache_log_offset
+    if not _wal().has_records():
+        return False
+    with _checkpoint_lock():
+        with _log_lock(), _cache_lock:
+            log = _wal()
+            if not log.has_records():
+                return False
+            frames = _rotate_log(log, _cached_workbook())
+            frames = dict(frames)
+            _cache_signature = _file_signature()
+            _cache_log_offset = 0
+
+        _write_workbook(frames)
+
+        with _cache_lock:
+            log.finish()
+            # The cache already holds the new workbook; records logged since
+            # are replayed from the live log as usual
+            if _cache_signature is not None:
+                workbook = _file_signature()[1]
+                _cache_signature = (_cache_signature[0], workbook, None, _cache_signature[3])
+        return True
+
+def _rotate_log(log, frames):
+    """Moves the log aside for a checkpoint and returns `frames` with all of it applied.
+
+    Replaying the whole rotated log is a no-op for our own records, and picks
+    up records another process logged since we last read the log.
+    """
+    log.rotate()
+    for record in log.rotating_records():
+        wal.apply(frames, record)
+    return frames
+
+def _write_workbook(frames):
+    with metrics.timer('excel.write', DB_FILE) as timed:
+        xlsx_writer.write_workbook(frames, DB_FILE)
+        timed.rows = sum(len(df) for df in frames.values())
+    _save_snapshot(frames, _file_signature()[1])
+
+def _snapshot_dir():
+    return DB_FILE + SNAPSHOT_SUFFIX
+
+def _load_snapshot(workbook):
+    """Returns the sheets of the snapshot if it matches `workbook` (mtime, size), else None."""
+    with metrics.timer('excel.snapshot_read') as timed:
+        frames = snapshot.load(_snapshot_dir(), workbook)
+        timed.rows = sum(len(df) for df in frames.values()) if frames else 0
+    return frames
+
+def _save_snapshot(frames, workbook):
+    """Saves `frames` as the snapshot of `workbook`; if that fails the xlsx is simply parsed next time."""
+    try:
+        with _snapshot_lock(), metrics.timer('excel.snapshot_write') as timed:
+            snapshot.write(_snapshot_dir(), frames, workbook, DATED_SHEETS)
+            timed.rows = sum(len(df) for df in frames.values())
     except Exception as e:
-        print(f"Error loading {sheet_name}: {e}")
-        return pd.DataFrame()
+        print(f"Error saving the snapshot of {DB_FILE}: {e}")
 
-def save_dataframe(df, sheet_name, mode='append'):
-    """Saves/appends a DataFrame to a specific sheet in the Excel file and auto-adjusts columns."""
+def _start_checkpointer():
+    """Starts the background checkpoint thread (and the checkpoint on exit) once."""
+    global _checkpointer
+    if _checkpointer is None:
+        _checkpointer = threading.Thread(target=_checkpoint_loop, name='workbook-checkpoint', daemon=True)
+        _checkpointer.start()
+        atexit.register(_checkpoint_on_exit)
 
-    if mode == 'append':
-        existing_df = load_sheet(sheet_name)
-        if not existing_df.empty:
-            df = pd.concat([existing_df, df], ignore_index=True)
+def _request_checkpoint():
+    """Asks the background thread for a checkpoint now."""
+    _start_checkpointer()
+    _checkpoint_wanted.set()
+
+def _checkpoint_loop():
+    while True:
+        _checkpoint_wanted.wait(CHECKPOINT_INTERVAL)
+        _checkpoint_wanted.clear()
+        try:
+            checkpoint()
+        except Exception as e:
+            # The log still holds every change; the next checkpoint retries
+            print(f"Error checkpointing {DB_FILE}: {e}")
 
+def _checkpoint_on_exit():
     try:
-        # Try to load the file
-        book = load_workbook(DB_FILE)
-    except Exception:
-        # File is corrupted or doesn't exist, create new
-        book = Workbook()
-
-    # Remove all sheets except the current one and SHEET_MENU
-    for sheet in list(book.sheetnames):
-        if sheet != sheet_name and sheet != SHEET_MENU:
-            book.remove(book[sheet])
-
-    # Remove the sheet if it exists (in case it's the current one)
-    if sheet_name in book.sheetnames:
-        book.remove(book[sheet_name])
-
-    # Create a new sheet with the data
-    sheet = book.create_sheet(sheet_name)
-    # Write the DataFrame to the sheet
-    for r, (idx, row) in enumerate(df.iterrows(), start=1):
-        for c, (col_name, value) in enumerate(row.items(), start=1):
-            if r == 1:  # Write headers
-                sheet.cell(row=r, column=c, value=col_name)
-            sheet.cell(row=r+1, column=c, value=value)
-
-    # Auto-adjust column widths
-    for col in sheet.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
+        checkpoint()
+    except Exception as e:
+        print(f"Error checkpointing {DB_FILE} on exit (changes are kept in {DB_FILE + WAL_SUFFIX}): {e}")
+
+class ExcelBackend:
+    """Storage backend that keeps every sheet in the xlsx workbook (DB_FILE).
+
+    Writes go to the write-ahead log and the in-memory sheets; the workbook
+    itself is rewritten by checkpoint().
+    """
+
+    name = 'excel'
+
+    def load_sheet(self, sheet_name):
+        """Returns the cached frame for a sheet (shared, do not modify)."""
+        with _cache_lock:
             try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 3)
-        sheet.column_dimensions[column].width = adjusted_width
+                frames = _cached_workbook()
+            except Exception as e:
+                invalidate_cache()
+                print(f"Error loading {sheet_name}: {e}")
+                return pd.DataFrame()
+
+            if frames is None or sheet_name not in frames:
+                # File or sheet does not exist, return empty DataFrame
+                return pd.DataFrame()
+            return frames[sheet_name]
+
+    def load_range(self, sheet_name, start=None, end=None):
+        """Returns the rows of a dated sheet whose date is in [start, end).
+
+        While the workbook is not cached yet (e.g. a one-off report) and the
+        log holds no changes to the sheet, only the snapshot partitions of
+        those dates are read.
+        """
+        with _cache_lock:
+            signature = _file_signature()
+            if signature != _cache_signature and signature[1] is not None and \
+                    not any(record['sheet'] == sheet_name for record in _wal().records()):
+                df = snapshot.load_range(_snapshot_dir(), signature[1], sheet_name, start, end)
+                if df is not None:
+                    return df
+            df = self.load_sheet(sheet_name)
+        return snapshot.filter_dates(df, DATED_SHEETS.get(sheet_name, 'Date'), start, end)
+
+    def sheet_names(self):
+        with _cache_lock:
+            frames = _cached_workbook()
+            return list(frames.keys()) if frames else []
+
+    def save_sheet(self, df, sheet_name):
+        """Replaces a whole sheet in the workbook with the DataFrame."""
+        self.save_many({sheet_name: (df, 'overwrite')})
+        return df
+
+    def append_rows(self, df, sheet_name):
+        """Appends rows to a sheet."""
+        return self.save_many({sheet_name: (df, 'append')})[sheet_name]
+
+    def _current_frames(self):
+        """Returns a copy of the cached sheets dict for a write.
+
+        A workbook that cannot be read is never replaced by an empty one.
+        """
+        try:
+            return dict(_cached_workbook() or {})
+        except Exception as e:
+            raise RuntimeError(
+                f"{DB_FILE} cannot be read ({e}); not writing over it. "
+                f"Restore it or move it aside to start a new workbook."
+            ) from e
+
+    def save_many(self, changes):
+        """Applies {sheet_name: (df, 'append' or 'overwrite')} as one logged write.
+
+        The write is durable once the log is fsync'd. Changes of more than
+        WAL_MAX_ROWS rows are written to the workbook straight away instead.
+        Returns the resulting frame of every changed sheet.
+        """
+        write_through = sum(len(df) for df, _ in changes.values()) > WAL_MAX_ROWS
+        with _checkpoint_lock() if write_through else contextlib.nullcontext(), _log_lock(), _cache_lock:
+            # Read under the log lock, so appended rows go after every other process's
+            frames = self._current_frames()
+            if write_through:
+                frames = _rotate_log(_wal(), frames)
+
+            records = []
+            for sheet_name, (df, mode) in changes.items():
+                df = df.reset_index(drop=True)
+                existing_df = frames.get(sheet_name)
+                appending = mode == 'append' and existing_df is not None and not existing_df.empty
+                if not write_through:
+                    records.append(wal.append_record(sheet_name, df, len(existing_df)) if appending
+                                   else wal.overwrite_record(sheet_name, df))
+                frames[sheet_name] = pd.concat([existing_df, df], ignore_index=True) if appending else df
+
+            if write_through:
+                _write_workbook(frames)
+                _wal().finish()
+                _remember_workbook(frames)
+            else:
+                _log_changes(records, frames)
+            return {sheet_name: frames[sheet_name] for sheet_name in changes}
+
+    def update_rows(self, updates, sheet_name):
+        """Sets the given cells of a sheet; `updates` is indexed by row position."""
+        with _log_lock(), _cache_lock:
+            frames = self._current_frames()
+            record = wal.update_record(sheet_name, updates)
+            wal.apply(frames, record)
+            _log_changes([record], frames)
+            return frames[sheet_name]
+
+    def deduct_stock(self, needs):
+        """Deducts {ingredient: qty} from Current Stock, flooring at 0.
+
+        An ingredient listed on several rows is deducted from its first row
+        only, and only the changed stock cells are logged. Returns
+        (shortfalls, missing): the quantity each ingredient was short by and
+        the names that are not in the inventory at all.
+        """
+        with _log_lock(), _cache_lock:
+            df_inventory = load_sheet(SHEET_INVENTORY, copy=False)
+
+            if df_inventory.empty:
+                print("Inventory is empty. Cannot deduct stock.")
+                return {}, list(needs)
+
+            names = df_inventory['Ingredient Name']
+            needed = names.map(needs).fillna(0).where(~names.duplicated(keep='first'), 0)
+            remaining = df_inventory['Current Stock (g/ml)'].fillna(0) - needed
+
+            short_mask = (remaining < 0) & (needed > 0)
+            shortfalls = dict(zip(names[short_mask], (-remaining[short_mask]).tolist()))
+
+            known = set(names)
+            missing = [name for name in needs if name not in known]
+            changed = needed != 0
+            if changed.any():
+                updates = remaining.clip(lower=0)[changed].to_frame('Current Stock (g/ml)')
+                self.update_rows(updates.set_axis(np.flatnonzero(changed.to_numpy())), SHEET_INVENTORY)
+            return shortfalls, missing
+
+def _remember_workbook(frames):
+    """Makes `frames` the cached copy of the workbook on disk (log included)."""
+    global _cache_signature, _cache_log_offset
+    frames = dict(frames)
+    _sheet_cache.clear()
+    _sheet_cache.update(frames)
+    _cache_signature = _file_signature()
+    _cache_log_offset = _wal().size()
+
+# --- Backend selection ---
+# COFFEESHOP_BACKEND=sqlite switches the app to the SQLite store (SQLITE_FILE).
+# The xlsx can still be produced for the owner with `python database.py export`.
+SQLITE_FILE = "coffeeshop_database.db"
+_backend = None
+
+def get_backend():
+    """Returns the active storage backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        kind = os.environ.get('COFFEESHOP_BACKEND', 'excel').lower()
+        if kind == 'sqlite':
+            from sqlite_backend import SQLiteBackend
+            _backend = SQLiteBackend(SQLITE_FILE)
+        elif kind == 'excel':
+            _backend = ExcelBackend()
+        else:
+            raise ValueError(f"Unknown storage backend '{kind}' (expected 'excel' or 'sqlite').")
+    return _backend
+
+def set_backend(backend):
+    """Replaces the active storage backend (e.g. ExcelBackend() or SQLiteBackend(path))."""
+    global _backend
+    _backend = backend
+
+def storage_path():
+    """Returns the file the active backend stores its data in."""
+    return getattr(get_backend(), 'path', DB_FILE)
+
+# --- Inventory lock ---
+# Stock is changed by read-modify-write: deductions, restocks and stock
+# counts read the current stock and write it back. Every process (registers,
+# the server, the inventory manager) takes this lock across the read and the
+# write, so none of them writes back a stock another has changed meanwhile.
+INVENTORY_LOCK_SUFFIX = ".inventory.lock"
+
+def inventory_lock():
+    """Returns the lock (across processes) for changing the active backend's stock.
 
-    # Remove default sheet if it's empty and not needed
-    if 'Sheet' in book.sheetnames and len(book['Sheet']) == 0:
-        book.remove(book['Sheet'])
+    Take it before the storage's own locks, and after an order queue
+    transaction (see order_queue.py).
+    """
+    return file_lock.lock_for(storage_path() + INVENTORY_LOCK_SUFFIX)
 
-    book.save(DB_FILE)
-    return df
+@metrics.instrument('database.load_sheet', rows=metrics.result_rows)
+def load_sheet(sheet_name, copy=True):
+    """Loads a specific sheet from the active storage backend into a DataFrame.
 
+    Pass copy=False to get the backend's shared frame for read-only use (it
+    must not be modified).
+    """
+    df = get_backend().load_sheet(sheet_name)
+    return df.copy() if copy else df
+
+@metrics.instrument('database.load_sheet_range', rows=metrics.result_rows)
+def load_sheet_range(sheet_name, start=None, end=None):
+    """Loads the rows of a dated sheet (Daily_Sales, Sales_Items, Sales_Rollups, Stock_Variance) in [start, end).
+
+    `start` and `end` are dates or timestamps; either may be None. Only the
+    rows of that period are read where the backend can avoid the rest (the
+    snapshot's monthly partitions, SQLite's Date index). Returns a new frame.
+    """
+    return get_backend().load_range(sheet_name, start, end)
+
+@metrics.instrument('database.save_dataframe', rows=metrics.first_arg_rows, path=storage_path)
+def save_dataframe(df, sheet_name, mode='append'):
+    """Saves/appends a DataFrame to a specific sheet in the active storage backend."""
+    backend = get_backend()
+    if mode == 'append':
+        return backend.append_rows(df, sheet_name)
+    return backend.save_sheet(df, sheet_name)
+
+@metrics.instrument('database.save_dataframes', rows=lambda result, changes: sum(len(df) for df, _ in changes.values()),
+                    path=storage_path)
+def save_dataframes(changes):
+    """Saves several sheets together: {sheet_name: (df, 'append' or 'overwrite')}.
+
+    The Excel backend writes the workbook once; SQLite uses one transaction.
+    """
+    return get_backend().save_many(changes)
+
+@metrics.instrument('database.update_rows', rows=metrics.first_arg_rows, path=storage_path)
+def update_rows(updates, sheet_name):
+    """Updates only some rows of a sheet.
+
+    `updates` holds the new values of the columns to change, indexed by the
+    row positions of load_sheet(). SQLite updates just those rows; the Excel
+    backend appends one update record with those cells to its write-ahead
+    log, and the workbook is rewritten later by a checkpoint.
+    """
+    return get_backend().update_rows(updates, sheet_name)
+
+@metrics.instrument('database.update_inventory', rows=1, path=storage_path)
 def update_inventory(ingredient_name, quantity_deducted):
     """Deducts a quantity from the inventory stock for a specific ingredient."""
-    df_inventory = load_sheet(SHEET_INVENTORY)
-    
-    if df_inventory.empty:
-        print("Inventory is empty. Cannot deduct stock.")
+    with inventory_lock():
+        shortfalls, missing = get_backend().deduct_stock({ingredient_name: quantity_deducted})
+    if missing:
+        print(f"Ingredient '{ingredient_name}' not found in inventory.")
         return False
-        
-    # Find the ingredient row
-    row_index = df_inventory[df_inventory['Ingredient Name'] == ingredient_name].index
-    
-    if not row_index.empty:
-        current_stock = df_inventory.loc[row_index[0], 'Current Stock (g/ml)']
-        new_stock = current_stock - quantity_deducted
-        
-        # Ensure stock doesn't go negative (though it could for a backorder situation)
-        df_inventory.loc[row_index[0], 'Current Stock (g/ml)'] = max(0, new_stock)
-        
-        # Save the updated DataFrame back to the Excel file
-        save_dataframe(df_inventory, SHEET_INVENTORY, mode='overwrite')
-        return True
+    return True
+
+@metrics.instrument('database.deduct_inventory_bulk', rows=metrics.first_arg_rows, path=storage_path)
+def deduct_inventory_bulk(needs):
+    """Deducts the quantities of many ingredients at once and saves a single time.
+
+    `needs` maps ingredient name -> total quantity to deduct. Stock is still
+    floored at 0, but anything that could not be covered is returned as a
+    shortfall dict {ingredient: missing quantity}. Ingredients that are not in
+    the inventory at all are reported with their full quantity.
+    """
+    needs = {name: qty for name, qty in needs.items() if qty}
+    if not needs:
+        return {}
+
+    with inventory_lock():
+        shortfalls, missing = get_backend().deduct_stock(needs)
+    for name in missing:
+        print(f"Ingredient '{name}' not found in inventory.")
+        shortfalls[name] = needs[name]
+    return shortfalls
+
+def export_to_excel(path=None):
+    """Writes every sheet of the active backend to an xlsx file for the owner.
+
+    The Excel backend's own workbook (DB_FILE) is brought up to date by a
+    checkpoint instead. Another backend's export to DB_FILE is written under
+    the checkpoint and log locks and drops DB_FILE's write-ahead log, whose
+    records would otherwise be replayed on top of the exported sheets.
+    """
+    path = path or DB_FILE
+    backend = get_backend()
+    if os.path.abspath(path) != os.path.abspath(DB_FILE):
+        frames = {sheet_name: backend.load_sheet(sheet_name) for sheet_name in backend.sheet_names()}
+        xlsx_writer.write_workbook(frames, path)
+        return path
+    if isinstance(backend, ExcelBackend):
+        checkpoint()
+        if os.path.exists(DB_FILE):
+            return path
+    with _checkpoint_lock(), _log_lock(), _cache_lock:
+        frames = {sheet_name: backend.load_sheet(sheet_name) for sheet_name in backend.sheet_names()}
+        log = _wal()
+        log.rotate()
+        _write_workbook(frames)
+        log.finish()
+        invalidate_cache()
+    return path
+
+def import_from_excel(path=None):
+    """Copies every sheet of an xlsx workbook into the active backend."""
+    path = path or DB_FILE
+    frames = pd.read_excel(path, sheet_name=None)
+    backend = get_backend()
+    for sheet_name, df in frames.items():
+        backend.save_sheet(df, sheet_name)
+    return list(frames.keys())
+
+if __name__ == "__main__":
+    import sys
+
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    if command == 'export':
+        print(f"✅ Database exported to {export_to_excel(target)}.")
+    elif command == 'checkpoint':
+        written = checkpoint()
+        print(f"✅ Write-ahead log folded into {DB_FILE}." if written else "Nothing to checkpoint.")
+    elif command == 'import':
+        sheets = import_from_excel(target)
+        print(f"✅ Imported {len(sheets)} sheet(s) into the {get_backend().name} backend: {', '.join(sheets)}")
     else:
-        print(f"Ingredient '{ingredient_name}' not found in inventory.")
-        return False
\ No newline at end of file
+        print("Usage: python database.py export [file.xlsx] | import [file.xlsx] | checkpoint")
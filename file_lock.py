@@ -0,0 +1,96 @@
+# file_lock.py
+"""Exclusive locks that hold across processes (several terminals, the server).
+
+A lock is an OS lock on a small lock file: fcntl.flock on POSIX,
+msvcrt.locking on Windows. It is also a re-entrant lock between the threads
+of a process, so one lock object serves both. Use lock_for() rather than
+FileLock() directly: POSIX file locks belong to the open file, so two lock
+objects on the same path in one process would block each other.
+"""
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+RETRY_DELAY = 0.05  # Seconds between attempts where the OS lock cannot block (Windows)
+
+def _lock_file(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        return
+    handle.seek(0)
+    while True:
+        try:
+            # LK_LOCK itself gives up after ~10 seconds
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            time.sleep(RETRY_DELAY)
+
+def _unlock_file(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+class FileLock:
+    """Exclusive lock on `path`, for the threads of this process and other processes.
+
+    Re-entrant like threading.RLock: the OS lock is taken by the outermost
+    acquire and dropped by the matching release.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._handle = open(self.path, 'a+b')
+                _lock_file(self._handle)
+            except BaseException:
+                if self._handle is not None:
+                    self._handle.close()
+                    self._handle = None
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock_file(self._handle)
+            finally:
+                self._handle.close()
+                self._handle = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+def lock_for(path):
+    """Returns the process's FileLock for `path` (one per absolute path)."""
+    path = os.path.abspath(path)
+    with _locks_lock:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = FileLock(path)
+        return lock
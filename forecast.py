@@ -0,0 +1,165 @@
+# forecast.py
+"""Demand forecasts, reorder points and restock suggestions per ingredient.
+
+Sold items are expanded through the RecipeIndex matrix into one daily usage
+series per ingredient (a days x ingredients matrix). Every ingredient is then
+fitted at once: day-of-week factors from the history, and exponential
+smoothing of the usage with those factors taken out. One pass over the days
+updates all ingredients together, so a year of history for hundreds of
+ingredients takes milliseconds.
+
+    Reorder point     = forecast usage over LEAD_TIME_DAYS + safety stock
+    Suggested restock = usage over LEAD_TIME_DAYS + COVER_DAYS + safety stock - current stock
+                        (only once the stock is at or below the reorder point)
+
+Usage: python forecast.py
+"""
+import numpy as np
+import pandas as pd
+import database
+import recipe_index
+import sales_ledger
+
+HISTORY_DAYS = 365   # Days of sales the forecast is fitted on
+ALPHA = 0.3          # Weight of the latest day in the smoothed level
+LEAD_TIME_DAYS = 2   # Days from placing a restock order to its delivery
+COVER_DAYS = 7       # Days of usage a restock should last after it arrives
+SERVICE_Z = 1.65     # Safety stock in standard deviations of the daily error (~95% of lead times covered)
+
+PLAN_COLUMNS = [
+    'Ingredient Name', 'Current Stock (g/ml)', 'Forecast Daily Usage (g/ml)', 'Days of Stock Left',
+    'Reorder Point (g/ml)', 'Suggested Restock (g/ml)', 'Reorder Now',
+]
+
+# --- Consumption history ---
+
+def daily_consumption(items, index, end=None):
+    """Returns (days, usage) for sold items (one row per item, as in Sales_Items).
+
+    `days` runs from the first sale to `end` (default yesterday, as today is
+    not over yet) with no gaps; `usage` is a days x index.ingredients matrix
+    of the quantity used per day. Sales after `end` are left out.
+    """
+    end = pd.Timestamp(end or pd.Timestamp.now() - pd.Timedelta(days=1)).normalize()
+    if items.empty:
+        return pd.DatetimeIndex([end]), np.zeros((1, len(index.ingredients)))
+
+    # Parse each distinct day once instead of every timestamp
+    day_codes, day_names = pd.factorize(items['Date'].astype(str).str[:10])
+    day_values = pd.to_datetime(pd.Series(day_names), errors='coerce')
+    first = min(day_values.min(), end) if day_values.notna().any() else end
+    days = pd.date_range(first, end, freq='D')
+    offsets = (day_values - first).dt.days.fillna(-1).to_numpy(dtype=int)
+    rows = np.where(day_codes >= 0, offsets[day_codes], -1)
+
+    keys = pd.MultiIndex.from_arrays([items['Menu Item Name'], items['Size/Container']])
+    item_rows = pd.Index(index.items).get_indexer(keys) if index.items else np.full(len(items), -1)
+    valid = (item_rows >= 0) & (rows >= 0) & (rows < len(days))
+
+    counts = np.zeros((len(days), len(index.items)))
+    np.add.at(counts, (rows[valid].astype(int), item_rows[valid]), 1)
+    return days, counts @ index.needed
+
+# --- Model ---
+
+def fit(days, usage, alpha=ALPHA):
+    """Fits day-of-week seasonal exponential smoothing to every usage column at once.
+
+    Returns (level, seasonal, sigma): the deseasonalized daily level after the
+    last day, a 7 x ingredients matrix of day-of-week factors (Monday first),
+    and the standard deviation of the one-day-ahead forecast errors.
+    """
+    weekdays = days.dayofweek.to_numpy()
+    sums = np.zeros((7, usage.shape[1]))
+    np.add.at(sums, weekdays, usage)
+    seen = np.bincount(weekdays, minlength=7)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weekday_mean = np.where(seen > 0, sums / np.maximum(seen, 1), np.nan)
+        seasonal = weekday_mean / np.nanmean(weekday_mean, axis=0)
+    # Weekdays not in the history yet, and ingredients never used, get a factor of 1
+    seasonal = np.where(np.isfinite(seasonal), seasonal, 1.0)
+
+    factors = seasonal[weekdays]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deseasonalized = np.where(factors > 0, usage / factors, 0.0)
+
+    warmup = min(7, len(days))
+    level = deseasonalized[:warmup].mean(axis=0)
+    squared_error = np.zeros(usage.shape[1])
+    for t in range(len(days)):
+        if t >= warmup:
+            squared_error += (usage[t] - level * factors[t]) ** 2
+        level = alpha * deseasonalized[t] + (1 - alpha) * level
+
+    scored = len(days) - warmup
+    sigma = np.sqrt(squared_error / scored) if scored > 0 else usage.std(axis=0)
+    return level, seasonal, sigma
+
+def forecast(level, seasonal, start, horizon):
+    """Returns the horizon x ingredients usage forecast for the days from `start`."""
+    weekdays = pd.date_range(start, periods=horizon, freq='D').dayofweek.to_numpy()
+    return level * seasonal[weekdays]
+
+# --- Reorder plan ---
+
+def reorder_plan(df_inventory, items, index, today=None,
+                 lead_time=LEAD_TIME_DAYS, cover=COVER_DAYS, z=SERVICE_Z):
+    """Returns reorder points and suggested restock quantities for every inventory ingredient.
+
+    `items` are the sold items (as in Sales_Items) the forecast is fitted on,
+    up to the day before `today`: a partial day would pull the forecast
+    towards zero. Ingredients that no recipe uses get a usage of 0. Rows to reorder come
+    first, then the fewest days of stock left.
+    """
+    if df_inventory.empty or 'Ingredient Name' not in df_inventory.columns:
+        return pd.DataFrame(columns=PLAN_COLUMNS)
+
+    today = pd.Timestamp(today or pd.Timestamp.now()).normalize()
+    days, usage = daily_consumption(items, index, end=today - pd.Timedelta(days=1))
+    level, seasonal, sigma = fit(days, usage)
+    ahead = forecast(level, seasonal, today + pd.Timedelta(days=1), lead_time + cover)
+
+    lead_usage = ahead[:lead_time].sum(axis=0)
+    safety = z * sigma * np.sqrt(lead_time)
+    reorder_point = lead_usage + safety
+    order_up_to = ahead.sum(axis=0) + safety
+
+    columns = pd.Index(index.ingredients).get_indexer(df_inventory['Ingredient Name'])
+    known = columns >= 0
+
+    def per_row(values):
+        return np.where(known, values[np.maximum(columns, 0)] if len(values) else 0.0, 0.0)
+
+    stock = df_inventory['Current Stock (g/ml)'].fillna(0).to_numpy(dtype=float)
+    daily = per_row(ahead.mean(axis=0))
+    point = per_row(reorder_point)
+    reorder = (daily > 0) & (stock <= point)
+    with np.errstate(divide='ignore'):
+        days_left = np.where(daily > 0, np.maximum(stock, 0) / daily, np.inf)
+
+    plan = pd.DataFrame({
+        'Ingredient Name': df_inventory['Ingredient Name'].to_numpy(),
+        'Current Stock (g/ml)': stock,
+        'Forecast Daily Usage (g/ml)': daily.round(2),
+        'Days of Stock Left': days_left.round(1),
+        'Reorder Point (g/ml)': point.round(2),
+        'Suggested Restock (g/ml)': np.where(reorder, np.maximum(per_row(order_up_to) - stock, 0), 0.0).round(2),
+        'Reorder Now': reorder,
+    })
+    return plan.sort_values(['Reorder Now', 'Days of Stock Left'], ascending=[False, True], ignore_index=True)
+
+def current_plan(ledger=None, history_days=HISTORY_DAYS):
+    """Builds the reorder plan from stored inventory, recipes and the last `history_days` full days of sales.
+
+    Only those days are read (see SalesLedger.read_sales).
+    """
+    ledger = ledger or sales_ledger.SalesLedger()
+    today = pd.Timestamp.now().normalize()
+    _, items = ledger.read_sales(include_items=True, start=today - pd.Timedelta(days=history_days), end=today)
+    df_inventory = database.load_sheet(database.SHEET_INVENTORY, copy=False)
+    return reorder_plan(df_inventory, items, recipe_index.get_recipe_index())
+
+if __name__ == "__main__":
+    plan = current_plan()
+    print("## 📈 Reorder Plan 📈")
+    print(plan.to_string(index=False) if not plan.empty else "Inventory is empty.")
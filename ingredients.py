@@ -0,0 +1,116 @@
+# ingredients.py
+"""Typed, array-backed view of the Inventory_Stock sheet.
+
+The sheet is validated once when the table is built: names are interned to
+integer ids (case-folded, so 'milk ' and 'Milk' are the same ingredient)
+and units are checked against units.UNITS. Lookups then go through the id
+map and plain arrays instead of filtering the DataFrame by name.
+"""
+import numpy as np
+import pandas as pd
+import units
+
+class Ingredient:
+    """One inventory ingredient; `unit` is the unit its stock and Cost/Unit are counted in."""
+
+    __slots__ = ('id', 'name', 'unit', 'cost_per_unit', 'stock')
+
+    def __init__(self, id, name, unit, cost_per_unit, stock):
+        self.id = id
+        self.name = name
+        self.unit = unit
+        self.cost_per_unit = cost_per_unit
+        self.stock = stock
+
+    def __repr__(self):
+        return f"Ingredient({self.id}, {self.name!r}, {self.cost_per_unit:g}/{self.unit}, stock {self.stock:g})"
+
+def fold(names):
+    """Case-folds ingredient names (a Series) for matching."""
+    return names.astype(str).str.strip().str.casefold()
+
+class IngredientTable:
+    """The inventory as parallel arrays indexed by ingredient id.
+
+    `rows` holds each ingredient's row label in the source frame. Rows with
+    a unit that is not in units.UNITS keep it as written and are listed in
+    `problems`.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}  # case-folded name -> id
+        self.units = np.array([], dtype=object)
+        self.cost_per_unit = np.zeros(0)
+        self.stock = np.zeros(0)
+        self.rows = np.zeros(0, dtype=int)
+        self.problems = []
+        self._folded = pd.Index([])
+
+    @classmethod
+    def from_inventory(cls, df_inventory):
+        table = cls()
+        if df_inventory.empty or 'Ingredient Name' not in df_inventory.columns:
+            return table
+
+        inventory = df_inventory[df_inventory['Ingredient Name'].notna()]
+        folded = fold(inventory['Ingredient Name'])
+        first = ~folded.duplicated().to_numpy()
+        inventory, folded = inventory[first], folded[first]
+        table.names = list(inventory['Ingredient Name'])
+        table._folded = pd.Index(folded)
+        table.ids = {name: i for i, name in enumerate(folded)}
+        table.rows = inventory.index.to_numpy()
+
+        def column(name):
+            if name not in inventory.columns:
+                return np.full(len(inventory), np.nan)
+            return pd.to_numeric(inventory[name], errors='coerce').to_numpy(dtype=float)
+
+        table.cost_per_unit = np.nan_to_num(column('Cost/Unit'))
+        table.stock = np.nan_to_num(column('Current Stock (g/ml)'))
+        raw_units = inventory['Unit (g/ml)'] if 'Unit (g/ml)' in inventory.columns else pd.Series('g', index=inventory.index)
+        table.units = np.empty(len(inventory), dtype=object)
+        for i, (name, unit) in enumerate(zip(table.names, raw_units)):
+            try:
+                table.units[i] = units.normalize_unit(unit if pd.notna(unit) else 'g')
+            except ValueError as e:
+                table.units[i] = unit
+                table.problems.append(f"'{name}': {e}")
+        return table
+
+    def __len__(self):
+        return len(self.names)
+
+    def id_of(self, name):
+        """Returns the id of an ingredient name, or None if it is not in the inventory."""
+        return self.ids.get(str(name).strip().casefold())
+
+    def get(self, name):
+        """Returns the Ingredient record for a name, or None."""
+        i = self.id_of(name)
+        if i is None:
+            return None
+        return Ingredient(i, self.names[i], self.units[i], float(self.cost_per_unit[i]), float(self.stock[i]))
+
+    def add(self, name, unit, cost_per_unit, stock, row):
+        """Adds a new ingredient (e.g. from a restock) and returns its id."""
+        i = len(self.names)
+        self.names.append(name)
+        self.ids[str(name).strip().casefold()] = i
+        self._folded = self._folded.append(pd.Index([str(name).strip().casefold()]))
+        self.units = np.append(self.units, np.array([unit], dtype=object))
+        self.cost_per_unit = np.append(self.cost_per_unit, cost_per_unit)
+        self.stock = np.append(self.stock, stock)
+        self.rows = np.append(self.rows, row)
+        return i
+
+    def ids_for(self, names):
+        """Vectorized id_of() for a Series of names; -1 where a name is not in the inventory."""
+        return self._folded.get_indexer(fold(names)) if len(self.names) else np.full(len(names), -1)
+
+    def take(self, values, ids, fill=np.nan):
+        """Returns values[ids] (one of the table's arrays) with `fill` where an id is -1."""
+        if not len(values):
+            return np.full(len(ids), fill, dtype=object)
+        return np.where(ids >= 0, np.asarray(values)[np.maximum(ids, 0)], fill)
@@ -1,105 +1,263 @@
 # inventory_manager.py
+import numpy as np
 import pandas as pd
+import cost_layers
+import costing_app
 import database
+import forecast
+import ingredients
+import units
+
+REQUIRED_COLUMNS = [
+    'Ingredient Name', 'Last Whole Sale Price (₱)', 'Bulk Quantity (g/ml)',
+    'Unit (g/ml)', 'Delivery Fee (₱)', 'Total Cost (₱)',
+    'Cost/Unit', 'Current Stock (g/ml)', 'Average Cost/Unit'
+]
 
 class InventoryManager:
     def __init__(self):
         self.currency_symbol = database.CURRENCY
 
-    def restock(self):
-        """Prompts for restock details, calculates unit cost, and updates inventory."""
-        print("## 📦 Inventory Restock 📦")
+    @staticmethod
+    def _load_inventory():
         df_inventory = database.load_sheet(database.SHEET_INVENTORY)
-
-        required_cols = [
-            'Ingredient Name', 'Last Whole Sale Price (₱)', 'Bulk Quantity (g/ml)',
-            'Unit (g/ml)', 'Delivery Fee (₱)', 'Total Cost (₱)',
-            'Cost/Unit', 'Current Stock (g/ml)'
-        ]
-
         if df_inventory.empty or 'Ingredient Name' not in df_inventory.columns:
             print("Creating new Inventory sheet structure...")
-            df_inventory = pd.DataFrame(columns=required_cols)
+            df_inventory = pd.DataFrame(columns=REQUIRED_COLUMNS)
+        return df_inventory
+
+    def restock(self):
+        """Prompts for restock details, calculates unit cost, and updates inventory.
 
-        changes_made = False
+        Typing 'plan' at the ingredient prompt lists the reorder suggestions.
+        The deliveries are applied to the stock once the user quits (see
+        _restock_entries), so the registers can keep selling meanwhile.
+        """
+        print("## 📦 Inventory Restock 📦")
+        table = self._ingredient_table(self._load_inventory())
+        entries = []
 
         while True:
             print("\n" + "=" * 40)
-            item_name = input("Enter **Ingredient Name** to restock (or type **'quit'**): ").strip()
+            item_name = input("Enter **Ingredient Name** to restock (or type **'plan'** for reorder suggestions, **'quit'**): ").strip()
             if item_name.lower() == 'quit':
                 break
+            if item_name.lower() == 'plan':
+                self.show_reorder_plan()
+                continue
             if not item_name: continue
 
             # Check if item exists to get existing stock/unit
-            is_new_item = item_name not in df_inventory['Ingredient Name'].values
+            ingredient = table.get(item_name)
 
             while True:
                 try:
                     wholesale_price = float(input(f"  Whole sale **Price** of bulk item: {self.currency_symbol}"))
-                    bulk_quantity = float(input("  Bulk **Quantity** (grams/ml/units): "))
-                    if is_new_item:
-                        unit = input("  Unit (**g**/**ml**/**pc**): ").strip().lower()
+                    bulk_quantity, unit = units.parse_quantity(input("  Bulk **Quantity** (e.g. 1000 or 1 kg): "))
+                    if ingredient is None:
+                        if unit is None:
+                            unit = input("  Unit (**g**/**ml**/**pc**): ")
                     else:
-                        # Use existing unit if item already exists
-                        unit = df_inventory[df_inventory['Ingredient Name'] == item_name]['Unit (g/ml)'].iloc[0]
-                        print(f"  Using existing unit: {unit}")
+                        # Stock is kept in the existing unit
+                        print(f"  Using existing unit: {ingredient.unit}")
+                    bulk_quantity, unit = self._stock_quantity(table, item_name, bulk_quantity, unit)
                     delivery_fee = float(input(f"  **Delivery Fee** for this item: {self.currency_symbol}"))
                     break
-                except ValueError:
-                    print("Invalid input. Please enter a valid number.")
+                except ValueError as e:
+                    print(f"Invalid input: {e} Please try again.")
 
-            # Calculate total cost of the item including proportional delivery fee
-            total_bulk_cost = wholesale_price + delivery_fee
+            if ingredient is None:
+                # A second delivery of the new ingredient is counted in the same unit
+                table.add(item_name, unit, np.nan, 0.0, -1)
+            entries.append((item_name, wholesale_price, bulk_quantity, unit, delivery_fee))
+            print(f"  Noted: {bulk_quantity:g} {unit} of {item_name}.")
 
-            # Calculate the cost per unit (g/ml/pc)
-            cost_per_unit = total_bulk_cost / bulk_quantity if bulk_quantity > 0 else 0
+        if entries:
+            self._restock_entries(entries)
+        else:
+            print("\nNo changes made. Inventory not updated.")
 
-            # --- Handle Inventory Update ---
-            if not is_new_item:
-                # Update existing item
-                row_index = df_inventory[df_inventory['Ingredient Name'] == item_name].index[0]
+    @staticmethod
+    def _ingredient_table(df_inventory):
+        table = ingredients.IngredientTable.from_inventory(df_inventory)
+        for problem in table.problems:
+            print(f"  Warning: {problem}")
+        return table
 
-                # Update stock
-                current_stock = df_inventory.loc[row_index, 'Current Stock (g/ml)']
-                new_stock = current_stock + bulk_quantity
-                df_inventory.loc[row_index, 'Current Stock (g/ml)'] = new_stock
+    @staticmethod
+    def _stock_quantity(table, item_name, quantity, unit):
+        """Returns (quantity, unit) in the unit the ingredient's stock is counted in.
 
-                # Update cost fields (Important: Cost/Unit must be updated for costing app)
-                df_inventory.loc[row_index, 'Last Whole Sale Price (₱)'] = wholesale_price
-                df_inventory.loc[row_index, 'Delivery Fee (₱)'] = delivery_fee
-                df_inventory.loc[row_index, 'Total Cost (₱)'] = total_bulk_cost
-                df_inventory.loc[row_index, 'Cost/Unit'] = cost_per_unit
+        New ingredients are counted in the base unit (g, ml or pc) of `unit`.
+        Raises ValueError for unknown units or a unit of another dimension
+        (e.g. ml of an ingredient counted in g).
+        """
+        ingredient = table.get(item_name)
+        if ingredient is None:
+            unit = units.normalize_unit(unit or 'g')
+            return units.convert(quantity, unit, units.base_unit(unit)), units.base_unit(unit)
+        return units.convert(quantity, unit or ingredient.unit, ingredient.unit), ingredient.unit
 
-                changes_made = True
-                print(f"✅ Stock updated. New total stock: {new_stock} {unit}.")
-            else:
-                # Add new item
-                new_row = {
-                    'Ingredient Name': item_name,
-                    'Last Whole Sale Price (₱)': wholesale_price,
-                    'Bulk Quantity (g/ml)': bulk_quantity,
-                    'Unit (g/ml)': unit,
-                    'Delivery Fee (₱)': delivery_fee,
-                    'Total Cost (₱)': total_bulk_cost,
-                    'Cost/Unit': cost_per_unit,
-                    'Current Stock (g/ml)': bulk_quantity # Initial stock is the restock quantity
-                }
-                if df_inventory.empty:
-                    df_inventory = pd.DataFrame([new_row])
-                else:
-                    df_inventory = pd.concat([df_inventory, pd.DataFrame([new_row])], ignore_index=True)
-                changes_made = True
-                print(f"✅ New ingredient added to inventory.")
-
-        if changes_made:
-            database.save_dataframe(df_inventory, database.SHEET_INVENTORY, mode='overwrite') # This will now replace the inventory file
-            print("\nInventory restock complete and saved to the database.")
+    def restock_batch(self, batch):
+        """Restocks several ingredients without prompting and saves once.
+
+        `batch` is a list of dicts with 'Ingredient Name',
+        'Last Whole Sale Price (₱)', 'Bulk Quantity (g/ml)', 'Delivery Fee (₱)'
+        and optionally 'Unit (g/ml)', the unit of the bulk quantity (default:
+        the ingredient's unit, or g for new ingredients). Returns the menu
+        price changes caused by new Cost/Unit values.
+        """
+        table = self._ingredient_table(self._load_inventory())
+        entries = []
+        for entry in batch:
+            if not isinstance(entry, dict):
+                raise ValueError(f"Restock entries must be objects with an 'Ingredient Name', not {entry!r}.")
+            name = str(entry.get('Ingredient Name') or '').strip()
+            if not name:
+                raise ValueError("Every restock entry needs an 'Ingredient Name'.")
+            try:
+                wholesale_price = float(entry['Last Whole Sale Price (₱)'])
+                bulk_quantity = float(entry['Bulk Quantity (g/ml)'])
+                delivery_fee = float(entry.get('Delivery Fee (₱)', 0))
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"Restock entry for '{name}' needs a numeric price, quantity and delivery fee.")
+            try:
+                bulk_quantity, unit = self._stock_quantity(table, name, bulk_quantity, entry.get('Unit (g/ml)'))
+            except ValueError as e:
+                raise ValueError(f"Restock entry for '{name}': {e}")
+            entries.append((name, wholesale_price, bulk_quantity, unit, delivery_fee))
+        if not entries:
+            raise ValueError("Nothing to restock.")
+        return self._restock_entries(entries)
+
+    def _restock_entries(self, entries):
+        """Applies [(name, price, quantity, unit, delivery fee), ...] to the stored inventory and saves once.
+
+        Quantities are in the stock unit (see _stock_quantity). The inventory
+        is re-read and saved under database.inventory_lock(), so stock other
+        processes deducted meanwhile is kept. Returns the menu price changes.
+        """
+        with database.inventory_lock():
+            df_inventory = self._load_inventory()
+            table = ingredients.IngredientTable.from_inventory(df_inventory)  # Problems were shown already
+            # Loaded from the stored lots, not the shared layers, which only change once this is saved
+            layers = cost_layers.CostLayers.load()
+            cost_changes = {}  # Ingredient -> new Cost/Unit, to reprice the menu items using it
+            new_lots = []  # Each restock is a cost lot, including its delivery fee
+            for name, wholesale_price, bulk_quantity, unit, delivery_fee in entries:
+                df_inventory = self._apply_restock(df_inventory, table, name, wholesale_price, bulk_quantity, unit,
+                                                   delivery_fee, layers, new_lots, cost_changes)
+            return self._save_restock(df_inventory, layers.lot_rows() if new_lots else None, cost_changes)
+
+    def _apply_restock(self, df_inventory, table, item_name, wholesale_price, bulk_quantity, unit, delivery_fee,
+                       layers, new_lots, cost_changes):
+        """Adds one delivery to the inventory frame and returns the frame.
+
+        `table` is the IngredientTable of the frame and is kept in step. The
+        quantity is in the ingredient's stock unit (see _stock_quantity);
+        `unit` is only used for new ingredients. The delivery's cost lot is
+        added to `new_lots` and a changed Cost/Unit to `cost_changes`.
+        """
+        ingredient_id = table.id_of(item_name)
+        is_new_item = ingredient_id is None
+        if not is_new_item:
+            item_name = table.names[ingredient_id]  # The inventory's spelling
+
+        # Calculate total cost of the item including proportional delivery fee
+        total_bulk_cost = wholesale_price + delivery_fee
+
+        # Calculate the cost per unit (g/ml/pc)
+        cost_per_unit = total_bulk_cost / bulk_quantity if bulk_quantity > 0 else 0
+        average_cost = cost_per_unit
+        if bulk_quantity > 0:
+            lots, average_cost = layers.receive(item_name, bulk_quantity, cost_per_unit)
+            new_lots.extend(lots)
+
+        # --- Handle Inventory Update ---
+        if not is_new_item:
+            # Update existing item
+            row_index = table.rows[ingredient_id]
+            unit = table.units[ingredient_id]
+
+            # Update stock
+            current_stock = df_inventory.loc[row_index, 'Current Stock (g/ml)']
+            new_stock = current_stock + bulk_quantity
+            df_inventory.loc[row_index, 'Current Stock (g/ml)'] = new_stock
+
+            # Update cost fields (Important: Cost/Unit must be updated for costing app)
+            df_inventory.loc[row_index, 'Last Whole Sale Price (₱)'] = wholesale_price
+            df_inventory.loc[row_index, 'Delivery Fee (₱)'] = delivery_fee
+            df_inventory.loc[row_index, 'Total Cost (₱)'] = total_bulk_cost
+            if not np.isclose(df_inventory.loc[row_index, 'Cost/Unit'], cost_per_unit):
+                cost_changes[item_name] = cost_per_unit
+            df_inventory.loc[row_index, 'Cost/Unit'] = cost_per_unit
+            df_inventory.loc[row_index, 'Average Cost/Unit'] = average_cost
+
+            print(f"✅ Stock updated. New total stock: {new_stock} {unit}.")
         else:
-            print("\nNo changes made. Inventory not updated.")
+            # Add new item
+            new_row = {
+                'Ingredient Name': item_name,
+                'Last Whole Sale Price (₱)': wholesale_price,
+                'Bulk Quantity (g/ml)': bulk_quantity,
+                'Unit (g/ml)': unit or 'g',
+                'Delivery Fee (₱)': delivery_fee,
+                'Total Cost (₱)': total_bulk_cost,
+                'Cost/Unit': cost_per_unit,
+                'Current Stock (g/ml)': bulk_quantity, # Initial stock is the restock quantity
+                'Average Cost/Unit': average_cost
+            }
+            if df_inventory.empty:
+                df_inventory = pd.DataFrame([new_row])
+            else:
+                df_inventory = pd.concat([df_inventory, pd.DataFrame([new_row])], ignore_index=True)
+            table.add(item_name, new_row['Unit (g/ml)'], cost_per_unit, bulk_quantity, df_inventory.index[-1])
+            cost_changes[item_name] = cost_per_unit
+            print(f"✅ New ingredient added to inventory.")
+        return df_inventory
+
+    def _save_restock(self, df_inventory, df_lots, cost_changes):
+        """Saves the inventory with its open lots and reprices the affected menu items."""
+        # Inventory and its lots are saved together; the open lots replace the
+        # sheet, so used-up lots are dropped instead of piling up
+        changes = {database.SHEET_INVENTORY: (df_inventory, 'overwrite')}
+        if df_lots is not None:
+            changes[database.SHEET_LOTS] = (df_lots, 'overwrite')
+        database.save_dataframes(changes)
+        print("\nInventory restock complete and saved to the database.")
+        if cost_changes:
+            return costing_app.CostingApp().reprice(cost_changes)
+        return None
+
+    def show_reorder_plan(self, all_items=False):
+        """Prints the ingredients due for a restock with the suggested quantities (see forecast.py).
+
+        With all_items=True every ingredient is listed with its reorder point.
+        """
+        plan = forecast.current_plan()
+        if not all_items:
+            plan = plan[plan['Reorder Now']]
+        print("\n--- Reorder Suggestions ---")
+        if plan.empty:
+            print("No ingredient needs restocking yet.")
+            return plan
+        for item in plan.to_dict(orient='records'):
+            line = (f"  - {item['Ingredient Name']}: {item['Current Stock (g/ml)']:.2f} left "
+                    f"(~{item['Days of Stock Left']} days at {item['Forecast Daily Usage (g/ml)']:.2f}/day), "
+                    f"reorder point {item['Reorder Point (g/ml)']:.2f}")
+            if item['Reorder Now']:
+                line += f" -> restock {item['Suggested Restock (g/ml)']:.2f} ⚠️"
+            print(line)
+        return plan
 
     def run(self):
         self.restock()
 
 if __name__ == "__main__":
+    import sys
+
     app = InventoryManager()
-    app.run()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == 'reorder':
+        app.show_reorder_plan(all_items=True)
+    else:
+        app.run()
\ No newline at end of file
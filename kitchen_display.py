@@ -0,0 +1,363 @@
+# kitchen_display.py
+"""Kitchen display: an incrementally maintained board of open orders.
+
+OrderBoard holds the open orders indexed by id, and one queue per station
+(bar, kitchen) with the orders that have items for it. Every change (an
+order placed, moved to PREPARING or READY, served or cancelled) touches only
+that order's entries and returns one delta, so a screen applies the deltas
+instead of regrouping and redrawing every order. The last DELTA_LOG deltas
+are kept for screens polling with updates_since().
+
+Serving an order records its ticket time (placed -> served) and how long it
+waited in each state; ticket_stats() summarizes the last TICKET_WINDOW
+served orders, which shows whether the bar, the kitchen or the pickup
+counter holds up the line during a rush.
+
+The menu has no category column, so an item's station is derived from its
+name: items matching KITCHEN_ITEMS go to the kitchen, everything else to
+the bar.
+
+Usage: python kitchen_display.py [--station bar|kitchen]
+"""
+import collections
+import itertools
+import os
+import re
+import threading
+import time
+import numpy as np
+import metrics
+import order_queue
+
+KITCHEN_ITEMS = os.environ.get(  # Menu item names (regex) prepared in the kitchen instead of at the bar
+    'COFFEESHOP_KITCHEN_ITEMS',
+    r'sandwich|toast|panini|bagel|croissant|muffin|cake|cookie|brownie|pastry|waffle|pancake|pasta|salad|rice|burger|fries',
+)
+DEFAULT_STATION = 'bar'  # Station of every item that does not match KITCHEN_ITEMS
+STATIONS = ('bar', 'kitchen')
+DELTA_LOG = 1000     # Deltas kept for updates_since()
+TICKET_WINDOW = 50   # Served orders ticket_stats() is computed over
+
+_kitchen_pattern = re.compile(KITCHEN_ITEMS, re.IGNORECASE)
+_stations = {}  # menu item name -> station
+
+def station_of(menu_name):
+    """Returns the station ('bar' or 'kitchen') that prepares a menu item."""
+    station = _stations.get(menu_name)
+    if station is None:
+        station = 'kitchen' if _kitchen_pattern.search(str(menu_name)) else DEFAULT_STATION
+        _stations[menu_name] = station
+    return station
+
+def _clock(seconds):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds))
+
+def format_minutes(seconds):
+    """Formats a wait in seconds as e.g. '3m05s'."""
+    return f"{int(seconds // 60)}m{int(seconds % 60):02d}s"
+
+class Ticket:
+    """One open order on the board; `waited` is the seconds spent in each earlier state."""
+
+    __slots__ = ('order_id', 'customer', 'terminal', 'state', 'placed_at', 'changed_at', 'items', 'stations', 'waited')
+
+    def __init__(self, order_id, customer, terminal, state, placed_at, items):
+        self.order_id = order_id
+        self.customer = customer
+        self.terminal = terminal
+        self.state = state
+        self.placed_at = placed_at
+        self.changed_at = placed_at
+        self.items = [
+            {
+                'Menu Item Name': item['Menu Item Name'],
+                'Size/Container': item['Size/Container'],
+                'Price': float(item.get('Price') or 0.0),
+                'Station': station_of(item['Menu Item Name']),
+            }
+            for item in items
+        ]
+        self.stations = sorted({item['Station'] for item in self.items})
+        self.waited = {}
+
+    def total(self):
+        return sum(item['Price'] for item in self.items)
+
+    def to_dict(self, now=None):
+        return {
+            'OrderID': self.order_id,
+            'Customer/Table': self.customer,
+            'Terminal': self.terminal,
+            'State': self.state,
+            'Placed At': _clock(self.placed_at),
+            'Waiting (s)': round((now or time.time()) - self.placed_at, 1),
+            'Stations': self.stations,
+            'Items': self.items,
+        }
+
+class OrderBoard:
+    """Open orders by id, per-station queues and the ticket times of served orders.
+
+    Fed either directly (place(), advance(), cancel() from a single register)
+    or from a shared order_queue.OrderQueue with sync()/apply(). Applying a
+    change twice, or a state an order is already past, is a no-op, so events
+    can be replayed safely. Not thread-safe; callers hold their own lock.
+    """
+
+    def __init__(self):
+        self.orders = {}  # order id -> Ticket, oldest first
+        self.queues = {station: {} for station in STATIONS}  # station -> {order id: Ticket}, oldest first
+        self.version = 0  # Number of deltas so far
+        self.seq = None   # Last OrderQueue event applied; None until loaded
+        self.served = 0
+        self._deltas = collections.deque(maxlen=DELTA_LOG)
+        self._ticket_times = collections.deque(maxlen=TICKET_WINDOW)  # (ticket seconds, {state: seconds})
+
+    # --- Changes ---
+
+    def _emit(self, op, ticket, **extra):
+        self.version += 1
+        delta = {
+            'Version': self.version,
+            'Op': op,
+            'OrderID': ticket.order_id,
+            'State': ticket.state,
+            'Stations': ticket.stations,
+            **extra,
+        }
+        self._deltas.append(delta)
+        return delta
+
+    def place(self, order_id, customer, items, terminal=None, at=None, state='PENDING'):
+        """Adds an order; returns the 'add' delta, or None if it is already on the board."""
+        if order_id in self.orders:
+            return None
+        at = at or time.time()
+        ticket = Ticket(order_id, customer, terminal, state, at, items)
+        self.orders[order_id] = ticket
+        for station in ticket.stations:
+            self.queues.setdefault(station, {})[order_id] = ticket
+        return self._emit('add', ticket, Ticket=ticket.to_dict(at))
+
+    def advance(self, order_id, state, at=None):
+        """Moves an order forward to `state`; returns the delta, or None if nothing changed.
+
+        SERVED takes the order off the board and records its ticket time.
+        Raises ValueError for an unknown state.
+        """
+        if state not in order_queue.ORDER_STATES:
+            raise ValueError(f"'{state}' is not one of {', '.join(order_queue.ORDER_STATES)}.")
+        ticket = self.orders.get(order_id)
+        if ticket is None or order_queue.ORDER_STATES.index(state) <= order_queue.ORDER_STATES.index(ticket.state):
+            return None
+        at = at or time.time()
+        ticket.waited[ticket.state] = ticket.waited.get(ticket.state, 0.0) + max(at - ticket.changed_at, 0.0)
+        ticket.state, ticket.changed_at = state, at
+        if state != 'SERVED':
+            return self._emit('update', ticket)
+
+        ticket_time = max(at - ticket.placed_at, 0.0)
+        self._remove(ticket)
+        self.served += 1
+        self._ticket_times.append((ticket_time, ticket.waited))
+        if metrics.is_enabled():
+            metrics.record('kitchen.ticket_time', ticket_time)
+        return self._emit('remove', ticket, **{'Ticket Time (s)': round(ticket_time, 1)})
+
+    def cancel(self, order_id):
+        """Takes a cancelled order off the board; returns the delta, or None."""
+        ticket = self.orders.get(order_id)
+        if ticket is None:
+            return None
+        ticket.state = 'CANCELLED'
+        self._remove(ticket)
+        return self._emit('remove', ticket)
+
+    def _remove(self, ticket):
+        del self.orders[ticket.order_id]
+        for station in ticket.stations:
+            self.queues[station].pop(ticket.order_id, None)
+
+    # --- Following an OrderQueue ---
+
+    def apply(self, event):
+        """Applies one OrderQueue event; returns its delta, or None."""
+        if event.get('seq') is not None:
+            self.seq = max(self.seq or 0, event['seq'])
+        payload = event['payload'] or {}
+        if event['kind'] == 'PLACED':
+            return self.place(event['OrderID'], payload.get('customer'), payload.get('items', []),
+                              payload.get('terminal'), event['created_at'])
+        if event['kind'] == 'CANCELLED':
+            return self.cancel(event['OrderID'])
+        if event['kind'] in order_queue.ORDER_STATES:
+            return self.advance(event['OrderID'], event['kind'], event['created_at'])
+        return None
+
+    def sync(self, queue):
+        """Catches up with a shared OrderQueue and returns the new deltas.
+
+        The first call loads the open orders; later calls only read the
+        events committed since the last one.
+        """
+        if self.seq is None:
+            # Read the position first: events racing the load are replayed, which is harmless
+            seq = queue.last_event_seq()
+            for order in queue.open_orders():
+                self.place(order['OrderID'], order['Customer/Table'], order['Items'],
+                           order['Terminal'], order['Placed At'], order['Status'])
+            self.seq = seq
+        deltas = (self.apply(event) for event in queue.events_since(self.seq))
+        return [delta for delta in deltas if delta]
+
+    # --- Reading ---
+
+    def tickets(self, station=None):
+        """Returns the open tickets (of one station), oldest first."""
+        return list((self.queues.get(station, {}) if station else self.orders).values())
+
+    def find(self, prefix):
+        """Returns the open ticket whose order id starts with `prefix`, or None if none or several do."""
+        matches = [ticket for order_id, ticket in self.orders.items() if order_id.startswith(prefix)]
+        return matches[0] if len(matches) == 1 else None
+
+    def snapshot(self, station=None):
+        """Returns the whole board (or one station's queue) with the ticket time stats."""
+        now = time.time()
+        stations = [station] if station else list(self.queues)
+        return {
+            'Version': self.version,
+            'Stations': {name: [ticket.to_dict(now) for ticket in self.queues.get(name, {}).values()] for name in stations},
+            'Ticket Times': self.ticket_stats(now),
+        }
+
+    def updates_since(self, version, station=None):
+        """Returns the deltas after `version` (of one station).
+
+        If they are no longer kept (or `version` is from an earlier board),
+        'Reset' is True and 'Board' holds the full snapshot instead.
+        """
+        first = self._deltas[0]['Version'] if self._deltas else self.version + 1
+        if version > self.version or version < first - 1:
+            return {'Version': self.version, 'Reset': True, 'Board': self.snapshot(station)}
+        deltas = itertools.islice(self._deltas, version - first + 1, None)
+        return {
+            'Version': self.version,
+            'Reset': False,
+            'Deltas': [delta for delta in deltas if station is None or station in delta['Stations']],
+        }
+
+    def ticket_stats(self, now=None):
+        """Summarizes the ticket times of the last TICKET_WINDOW served orders, in seconds.
+
+        'Mean in <state>' is how long those orders waited in each state;
+        'Oldest Open' is how long the oldest open order has been waiting.
+        """
+        now = now or time.time()
+        stats = {
+            'Served': self.served,
+            'Open': len(self.orders),
+            'Open per Station': {station: len(queue) for station, queue in self.queues.items()},
+            'Oldest Open (s)': round(now - next(iter(self.orders.values())).placed_at, 1) if self.orders else None,
+        }
+        if not self._ticket_times:
+            return stats
+        times = np.array([ticket_time for ticket_time, _ in self._ticket_times])
+        stats.update({
+            'Last (s)': round(float(times[-1]), 1),
+            'Mean (s)': round(float(times.mean()), 1),
+            'P90 (s)': round(float(np.percentile(times, 90)), 1),
+            'Max (s)': round(float(times.max()), 1),
+        })
+        for state in order_queue.OPEN_STATES:
+            waited = [waits.get(state, 0.0) for _, waits in self._ticket_times]
+            stats[f'Mean in {state} (s)'] = round(float(np.mean(waited)), 1)
+        return stats
+
+# --- Terminal display ---
+
+def _show_ticket(ticket, station=None):
+    items = [item for item in ticket.items if station is None or item['Station'] == station]
+    print(f"  [{ticket.state}] {ticket.order_id[:8]} {ticket.customer} ({format_minutes(time.time() - ticket.placed_at)})")
+    for item in items:
+        print(f"      - {item['Menu Item Name']} ({item['Size/Container']})")
+
+def _show_stats(board):
+    stats = board.ticket_stats()
+    if 'Mean (s)' not in stats:
+        print(f"⏱️ {stats['Open']} open, none served yet.")
+        return
+    slowest = max(order_queue.OPEN_STATES, key=lambda state: stats[f'Mean in {state} (s)'])
+    print(f"⏱️ Ticket time: last {format_minutes(stats['Last (s)'])} | mean {format_minutes(stats['Mean (s)'])} | "
+          f"p90 {format_minutes(stats['P90 (s)'])} over {min(stats['Served'], TICKET_WINDOW)} served | "
+          f"longest wait in {slowest} | {stats['Open']} open")
+
+def run_display(queue, station=None):
+    """Follows a shared OrderQueue and prints each change as it happens (Ctrl+C to exit).
+
+    Type 'p <ticket>' to start preparing an order, 'r <ticket>' when it is
+    ready for pickup, 't' for ticket times and 'q' to quit; <ticket> is the
+    start of the order id.
+    """
+    board = OrderBoard()
+    lock = threading.Lock()
+    board.sync(queue)
+    title = f" ({station})" if station else ""
+    print(f"## 👩‍🍳 Kitchen Display{title} 👩‍🍳")
+    print("Commands: p <ticket> = preparing, r <ticket> = ready, t = ticket times, q = quit")
+    for ticket in board.tickets(station):
+        _show_ticket(ticket, station)
+
+    def follow():
+        for event in queue.subscribe(after_seq=board.seq):
+            with lock:
+                delta = board.apply(event)
+                if delta is None or (station and station not in delta['Stations']):
+                    continue
+                if delta['Op'] == 'add':
+                    payload = event['payload'] or {}
+                    print(f"\n🔔 New order (from {payload.get('terminal')}):")
+                    _show_ticket(board.orders[delta['OrderID']], station)
+                elif delta['Op'] == 'update':
+                    print(f"\n{delta['State']}: order {delta['OrderID'][:8]}")
+                elif 'Ticket Time (s)' in delta:
+                    print(f"\n✅ SERVED: order {delta['OrderID'][:8]} in {format_minutes(delta['Ticket Time (s)'])}")
+                    _show_stats(board)
+                else:
+                    print(f"\nCANCELLED: order {delta['OrderID'][:8]}")
+
+    threading.Thread(target=follow, name='kitchen-display', daemon=True).start()
+    # Commands use their own connection; the display thread owns `queue`
+    commands = order_queue.OrderQueue(queue.path, terminal=queue.terminal)
+    try:
+        while True:
+            command = input().strip().split()
+            if not command:
+                continue
+            if command[0] == 'q':
+                break
+            if command[0] == 't':
+                with lock:
+                    _show_stats(board)
+                continue
+            if command[0] not in ('p', 'r') or len(command) != 2:
+                print("Commands: p <ticket>, r <ticket>, t, q")
+                continue
+            with lock:
+                ticket = board.find(command[1])
+            if ticket is None:
+                print(f"No single open order starts with '{command[1]}'.")
+            elif not commands.advance_order(ticket.order_id, 'PREPARING' if command[0] == 'p' else 'READY'):
+                print(f"Order {ticket.order_id[:8]} is already past that.")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    commands.close()
+    print("\nExiting Kitchen Display.")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Kitchen display following the shared order queue")
+    parser.add_argument('--station', choices=STATIONS, help="only show the orders (and items) of one station")
+    args = parser.parse_args()
+    run_display(order_queue.OrderQueue(terminal='kitchen'), args.station)
@@ -0,0 +1,236 @@
+# metrics.py
+"""In-process metrics for the hot paths of the storage layer and the POS.
+
+Instrumented calls record their call count, wall time, rows read/written and
+the size of the storage file into one process-wide registry. Recording is off
+unless COFFEESHOP_METRICS=1 (or enable() is called); while it is off an
+instrumented call costs one flag check.
+
+    COFFEESHOP_METRICS=1 python pos_system.py
+    COFFEESHOP_METRICS=1 COFFEESHOP_METRICS_FILE=metrics.json python pos_system.py
+
+report() prints the registry, dump() writes it as JSON and start_dumping()
+keeps rewriting the JSON file in the background. profile() runs a block under
+cProfile and tracemalloc.
+"""
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import pandas as pd
+
+METRICS_FILE = os.environ.get('COFFEESHOP_METRICS_FILE')
+DUMP_EVERY = float(os.environ.get('COFFEESHOP_METRICS_EVERY', 60))  # Seconds between background dumps
+PROFILE_TOP = 25  # Functions shown in a profile report
+
+COLUMNS = ['Operation', 'Calls', 'Errors', 'Total (ms)', 'Mean (ms)', 'Max (ms)', 'Rows', 'Disk Bytes']
+
+_enabled = os.environ.get('COFFEESHOP_METRICS', '') not in ('', '0')
+_lock = threading.Lock()
+_registry = {}  # operation name -> [calls, errors, total s, max s, rows, disk bytes]
+
+def enable(on=True):
+    """Turns recording on (or off with on=False)."""
+    global _enabled
+    _enabled = on
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """Clears every recorded metric."""
+    with _lock:
+        _registry.clear()
+
+def record(name, elapsed, rows=None, path=None, failed=False):
+    """Adds one call of `name` taking `elapsed` seconds to the registry.
+
+    `path` is the storage file the call read or wrote; its current size is kept.
+    """
+    disk_bytes = None
+    if path:
+        try:
+            disk_bytes = os.path.getsize(path)
+        except OSError:
+            pass
+    with _lock:
+        entry = _registry.setdefault(name, [0, 0, 0.0, 0.0, 0, None])
+        entry[0] += 1
+        entry[1] += bool(failed)
+        entry[2] += elapsed
+        entry[3] = max(entry[3], elapsed)
+        if rows:
+            entry[4] += int(rows)
+        if disk_bytes is not None:
+            entry[5] = disk_bytes
+
+# --- Row counters for instrument() ---
+
+def result_rows(result, *args, **kwargs):
+    """Rows read: the length of the returned frame."""
+    return len(result) if hasattr(result, '__len__') else None
+
+def first_arg_rows(result, data, *args, **kwargs):
+    """Rows written: the length of the frame (or dict) passed first."""
+    return len(data) if hasattr(data, '__len__') else None
+
+# --- Recording ---
+
+class _Timer:
+    """Context manager returned by timer(); set `rows` inside the block."""
+
+    __slots__ = ('name', 'rows', 'path', 'start')
+
+    def __init__(self, name, path=None):
+        self.name = name
+        self.rows = None
+        self.path = path
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.start, self.rows, self.path, failed=exc_type is not None)
+        return False
+
+class _NullTimer:
+    """Stand-in for _Timer while recording is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def timer(name, path=None):
+    """Times a block: `with metrics.timer('excel.parse') as t: ...; t.rows = n`."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name, path)
+
+def instrument(name, rows=None, path=None):
+    """Decorator that records every call of the function under `name`.
+
+    `rows` is a number or a callable (result, *args, **kwargs) -> rows, such as
+    result_rows or first_arg_rows. `path` is a callable returning the storage
+    file whose size is recorded after the call.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            result = None
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                count = None
+                if not failed:
+                    count = rows(result, *args, **kwargs) if callable(rows) else rows
+                record(name, elapsed, count, path() if path else None, failed=failed)
+        return wrapper
+    return decorate
+
+# --- Reporting ---
+
+def snapshot():
+    """Returns the registry as a DataFrame with one row per operation."""
+    with _lock:
+        entries = [(name, list(entry)) for name, entry in _registry.items()]
+    rows = [
+        [name, calls, errors, total * 1000, total * 1000 / calls if calls else 0.0, longest * 1000, row_count, disk_bytes]
+        for name, (calls, errors, total, longest, row_count, disk_bytes) in entries
+    ]
+    df = pd.DataFrame(rows, columns=COLUMNS).astype({'Disk Bytes': 'Int64'})
+    return df.sort_values('Total (ms)', ascending=False, ignore_index=True)
+
+def report():
+    """Prints the registry, slowest operations first."""
+    df = snapshot()
+    if df.empty:
+        print("No metrics recorded.")
+        return df
+    print("## ⏱️ Metrics ⏱️")
+    print(df.to_string(index=False, float_format=lambda value: f"{value:.2f}"))
+    return df
+
+def dump(path=None):
+    """Writes the registry to a JSON file (METRICS_FILE by default)."""
+    path = path or METRICS_FILE or 'coffeeshop_metrics.json'
+    data = {
+        'timestamp': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'operations': snapshot().astype(object).where(lambda df: df.notna(), None).to_dict(orient='records'),
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+def start_dumping(path=None, interval=None):
+    """Dumps the registry every `interval` seconds from a daemon thread.
+
+    Returns a threading.Event; set it to stop the thread (a last dump is
+    written). Call dump() on exit as well, since the thread is a daemon.
+    """
+    interval = interval or DUMP_EVERY
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            dump(path)
+        dump(path)
+
+    threading.Thread(target=run, name='metrics-dump', daemon=True).start()
+    return stop
+
+# --- Profiling ---
+
+@contextlib.contextmanager
+def profile(label, path=None):
+    """Runs the block under cProfile and tracemalloc and prints what it cost.
+
+    Shows the PROFILE_TOP functions by cumulative time and the peak traced
+    memory; with `path` the raw cProfile stats are saved for snakeviz/pstats.
+    """
+    profiler = cProfile.Profile()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        print(f"\n## 🔬 Profile: {label} (peak memory {peak / 2**20:.2f} MB) 🔬")
+        print(out.getvalue())
+        if path:
+            profiler.dump_stats(path)
+            print(f"Profile saved to {path}.")
@@ -0,0 +1,252 @@
+# order_pipeline.py
+import asyncio
+import threading
+import time
+import pandas as pd
+import cost_layers
+import database
+import recipe_index
+
+QUEUE_SIZE = 100        # Orders each stage may hold before the previous one waits
+FLUSH_SIZE = 20         # Flush a batch once it holds this many orders...
+FLUSH_INTERVAL = 1.0    # ...or once its oldest order has waited this many seconds
+
+_DRAIN = object()  # Passed down the stages on close() to flush and stop them
+
+def _add_needs(total, needs):
+    for name, qty in needs.items():
+        total[name] = total.get(name, 0) + qty
+
+class OrderPipeline:
+    """Asyncio pipeline that takes persistence off the cashier's critical path.
+
+    Served orders go through three stages connected by bounded queues:
+
+        capture -> inventory deduction -> ledger write
+
+    Capture works out each order's ingredient needs from the RecipeIndex. The
+    deduction and ledger stages are background writers that coalesce orders
+    until FLUSH_SIZE orders or FLUSH_INTERVAL seconds, then do one
+    deduct_inventory_bulk save and one journal append for the whole batch.
+    The blocking writes run in a worker thread so the loop keeps accepting
+    orders. An order whose needs cannot be worked out, and a batch whose
+    deduction or journal write fails, is kept and retried later. When a
+    queue is full, submit() waits (backpressure), and close() drains every
+    stage so no sale is lost.
+    """
+
+    def __init__(self, ledger, queue_size=QUEUE_SIZE, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.ledger = ledger
+        self.queue_size = queue_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.stats = {'submitted': 0, 'deducted': 0, 'recorded': 0, 'deduction_flushes': 0, 'ledger_flushes': 0, 'cost_of_goods': 0.0}
+        self._loop = None
+        self._thread = None
+        self._tasks = []
+        self._queued = {}  # (item, size) -> servings submitted but not deducted from the stock yet
+        self._queued_lock = threading.Lock()
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Starts the event loop and the three stages in a background thread."""
+        if self._thread is not None:
+            return self
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(self._loop)
+            self._capture_queue = asyncio.Queue(self.queue_size)
+            self._deduct_queue = asyncio.Queue(self.queue_size)
+            self._ledger_queue = asyncio.Queue(self.queue_size)
+            self._tasks = [
+                self._loop.create_task(self._capture_stage()),
+                self._loop.create_task(self._deduction_stage()),
+                self._loop.create_task(self._ledger_stage()),
+            ]
+            started.set()
+            self._loop.run_until_complete(asyncio.gather(*self._tasks))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run_loop, name='order-pipeline', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def submit(self, order_id, customer, items):
+        """Hands a served order to the pipeline and returns once it is queued.
+
+        `items` is a list of dicts with 'Menu Item Name', 'Size/Container' and
+        'Price'. Blocks only while the capture queue is full.
+        """
+        counts = {}
+        for item in items:
+            key = (item['Menu Item Name'], item['Size/Container'])
+            counts[key] = counts.get(key, 0) + 1
+        order = {
+            'OrderID': order_id,
+            'Customer/Table': customer,
+            'Date': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'Items': list(items),
+            'Counts': counts,
+        }
+        self._track(counts, 1)
+        asyncio.run_coroutine_threadsafe(self._capture_queue.put(order), self._loop).result()
+        self.stats['submitted'] += 1
+
+    def queued_counts(self):
+        """Returns {(item, size): servings} of the orders whose stock is not deducted yet."""
+        with self._queued_lock:
+            return dict(self._queued)
+
+    def _track(self, counts, sign):
+        with self._queued_lock:
+            for key, count in counts.items():
+                total = self._queued.get(key, 0) + sign * count
+                if total:
+                    self._queued[key] = total
+                else:
+                    self._queued.pop(key, None)
+
+    def close(self):
+        """Flushes every queued order through all stages and stops the loop."""
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._capture_queue.put(_DRAIN), self._loop).result()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Stages ---
+
+    async def _capture_stage(self):
+        uncaptured = []  # Orders whose needs could not be worked out yet, oldest first
+        draining = False
+        while not draining:
+            try:
+                # While orders wait for a retry, retry them every FLUSH_INTERVAL
+                order = await asyncio.wait_for(self._capture_queue.get(), self.flush_interval if uncaptured else None)
+            except asyncio.TimeoutError:
+                order = None
+            draining = order is _DRAIN
+            if order is not None and not draining:
+                uncaptured.append(order)
+            while uncaptured:
+                order = uncaptured[0]
+                try:
+                    order['Needs'] = recipe_index.get_recipe_index().needs_for(order['Counts'])
+                except Exception as e:
+                    if not draining:
+                        # Keep the order (and those after it, in order) and retry it later
+                        print(f"Error working out the ingredients of order {order['OrderID']}: {e}")
+                        break
+                    # Last resort on exit: the sale is still recorded, its stock is not deducted
+                    print(f"Error working out the ingredients of order {order['OrderID']}, not deducted: {e}")
+                    order['Needs'] = {}
+                await self._deduct_queue.put(uncaptured.pop(0))
+        await self._deduct_queue.put(_DRAIN)
+
+    async def _next_batch(self, queue):
+        """Collects orders until the batch is full, FLUSH_INTERVAL passes, or the pipeline drains.
+
+        Returns (batch, draining).
+        """
+        first = await queue.get()
+        if first is _DRAIN:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                order = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if order is _DRAIN:
+                return batch, True
+            batch.append(order)
+        return batch, False
+
+    async def _deduction_stage(self):
+        waiting = []      # Orders whose needs are not taken off the stock yet
+        undeducted = {}   # Their needs, kept until a deduction succeeds
+        unconsumed = {}   # Needs not yet taken from the cost lots
+        draining = False
+        while not draining:
+            batch, draining = await self._next_batch(self._deduct_queue)
+            for order in batch:
+                _add_needs(undeducted, order['Needs'])
+                _add_needs(unconsumed, order['Needs'])
+            waiting.extend(batch)
+            if undeducted or unconsumed:
+                try:
+                    await self._loop.run_in_executor(None, self._deduct, waiting, undeducted, unconsumed)
+                    self.stats['deduction_flushes'] += 1
+                except Exception as e:
+                    # Keep the needs and retry them with the next batch
+                    print(f"Error deducting inventory for {len(batch)} order(s): {e}")
+            for order in batch:
+                await self._ledger_queue.put(order)
+        if undeducted or unconsumed:
+            # Last resort on exit: one more try, then show what could not be deducted
+            try:
+                self._deduct(waiting, undeducted, unconsumed)
+            except Exception as e:
+                print(f"Error deducting inventory, not deducted: {undeducted or unconsumed} ({e})")
+        await self._ledger_queue.put(_DRAIN)
+
+    def _deduct(self, orders, undeducted, unconsumed):
+        """Deducts needs from inventory, then consumes their cost lots (runs in a worker thread).
+
+        `orders` and each dict are emptied once their write succeeded, so a
+        retry after an error never deducts the same needs twice.
+        """
+        if undeducted:
+            shortfalls = database.deduct_inventory_bulk(undeducted)
+            undeducted.clear()
+            for order in orders:
+                self._track(order['Counts'], -1)
+            self.stats['deducted'] += len(orders)
+            orders.clear()
+            for ing_name, qty_short in shortfalls.items():
+                print(f"⚠️ Not enough {ing_name} in stock: short by {qty_short:g}.")
+        if unconsumed:
+            layers = cost_layers.get_cost_layers()
+            self.stats['cost_of_goods'] += sum(layers.consume(unconsumed).values())
+            unconsumed.clear()
+
+    async def _ledger_stage(self):
+        unwritten = []
+        draining = False
+        while not draining:
+            batch, draining = await self._next_batch(self._ledger_queue)
+            unwritten.extend(
+                self.ledger.build_record(order['OrderID'], order['Date'], order['Customer/Table'], order['Items'])
+                for order in batch
+            )
+            if not unwritten:
+                continue
+            try:
+                await self._loop.run_in_executor(None, self.ledger.append_records, unwritten)
+                self.stats['ledger_flushes'] += 1
+                self.stats['recorded'] += len(unwritten)
+                unwritten = []
+            except Exception as e:
+                # Keep the records and retry them with the next batch
+                print(f"Error writing {len(unwritten)} sale(s) to the ledger: {e}")
+        if unwritten:
+            # Last resort on exit: one more try, then show what could not be saved
+            try:
+                self.ledger.append_records(unwritten)
+                self.stats['recorded'] += len(unwritten)
+            except Exception as e:
+                print(f"Error writing sales to the ledger, not saved: {[r['SaleID'] for r in unwritten]} ({e})")
@@ -0,0 +1,309 @@
+# order_queue.py
+import json
+import sqlite3
+import time
+import uuid
+import numpy as np
+import database
+import recipe_index
+
+ORDER_QUEUE_FILE = "coffeeshop_orders.db"
+ORDER_STATES = ('PENDING', 'PREPARING', 'READY', 'SERVED')  # Kitchen flow of an order, in order
+OPEN_STATES = ORDER_STATES[:-1]      # Not served yet; the stock stays reserved
+KITCHEN_STATES = ORDER_STATES[1:-1]  # States the kitchen moves an order to
+_OPEN = f"({', '.join(repr(state) for state in OPEN_STATES)})"  # SQL list of OPEN_STATES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    customer TEXT,
+    terminal TEXT,
+    status TEXT NOT NULL,
+    placed_at REAL NOT NULL,
+    served_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
+CREATE TABLE IF NOT EXISTS order_items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    menu_name TEXT NOT NULL,
+    size TEXT,
+    price REAL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id);
+CREATE TABLE IF NOT EXISTS reservations (
+    order_id TEXT NOT NULL,
+    ingredient TEXT NOT NULL,
+    qty REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reservations_order ON reservations (order_id);
+CREATE INDEX IF NOT EXISTS idx_reservations_ingredient ON reservations (ingredient);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT,
+    created_at REAL NOT NULL
+);
+"""
+
+class OrderQueue:
+    """Order queue shared by several POS and kitchen processes through SQLite.
+
+    Placing an order reserves its ingredients inside one write transaction
+    (BEGIN IMMEDIATE), checked against inventory stock minus everything other
+    terminals already reserved, so two cashiers cannot both sell the last
+    shot of espresso. The kitchen moves an order through PREPARING and
+    READY; serving it turns its reservation into an inventory deduction.
+    Both hold database.inventory_lock(), like restocks and stock counts, so
+    no other process rewrites the stock in between.
+    Every change is also written to an event log that kitchen terminals
+    follow with subscribe().
+    """
+
+    def __init__(self, path=None, terminal='register'):
+        self.path = path or ORDER_QUEUE_FILE
+        self.terminal = terminal
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self):
+        """Starts a write transaction that locks out other terminals until COMMIT."""
+        self.conn.execute('BEGIN IMMEDIATE')
+
+    def _add_event(self, order_id, kind, payload=None):
+        self.conn.execute(
+            'INSERT INTO events (order_id, kind, payload, created_at) VALUES (?, ?, ?, ?)',
+            (order_id, kind, json.dumps(payload, ensure_ascii=False) if payload is not None else None, time.time())
+        )
+
+    # --- Stock reservations ---
+
+    def reserved(self):
+        """Returns {ingredient: qty} reserved by orders that are not served yet."""
+        return dict(self.conn.execute('SELECT ingredient, SUM(qty) FROM reservations GROUP BY ingredient'))
+
+    def reserved_vector(self, ingredients):
+        """Returns the reserved quantities aligned to a list of ingredient names."""
+        reserved = self.reserved()
+        return np.array([reserved.get(name, 0.0) for name in ingredients], dtype=float)
+
+    def _shortages(self, needs):
+        """Returns {ingredient: missing qty} if stock minus reservations cannot cover `needs`."""
+        df_inventory = database.load_sheet(database.SHEET_INVENTORY, copy=False)
+        stock = {}
+        if not df_inventory.empty and 'Ingredient Name' in df_inventory.columns:
+            stock = dict(zip(df_inventory['Ingredient Name'], df_inventory['Current Stock (g/ml)']))
+        reserved = self.reserved()
+
+        shortages = {}
+        for name, qty in needs.items():
+            free = stock.get(name, 0) - reserved.get(name, 0)
+            if name not in stock or free < qty:
+                shortages[name] = qty - max(free, 0)
+        return shortages
+
+    # --- Orders ---
+
+    def place_order(self, customer, items):
+        """Reserves stock for an order and queues it.
+
+        `items` is a list of dicts with 'Menu Item Name', 'Size/Container' and
+        'Price'. Returns (order_id, shortages); order_id is None and nothing is
+        queued if the stock cannot cover the whole order.
+        """
+        counts = {}
+        for item in items:
+            key = (item['Menu Item Name'], item['Size/Container'])
+            counts[key] = counts.get(key, 0) + 1
+        needs = recipe_index.get_recipe_index().needs_for(counts)
+
+        order_id = str(uuid.uuid4())
+        self._transaction()
+        try:
+            # Held until COMMIT, so no stock count lowers the stock between the check and the reservation
+            with database.inventory_lock():
+                shortages = self._shortages(needs)
+                if shortages:
+                    self.conn.execute('ROLLBACK')
+                    return None, shortages
+
+                self.conn.execute(
+                    'INSERT INTO orders (order_id, customer, terminal, status, placed_at) VALUES (?, ?, ?, ?, ?)',
+                    (order_id, customer, self.terminal, 'PENDING', time.time())
+                )
+                self.conn.executemany(
+                    'INSERT INTO order_items (order_id, menu_name, size, price, status) VALUES (?, ?, ?, ?, ?)',
+                    [(order_id, item['Menu Item Name'], item['Size/Container'], float(item['Price']), 'PENDING') for item in items]
+                )
+                self.conn.executemany(
+                    'INSERT INTO reservations (order_id, ingredient, qty) VALUES (?, ?, ?)',
+                    [(order_id, name, qty) for name, qty in needs.items()]
+                )
+                self._add_event(order_id, 'PLACED', {
+                    'customer': customer,
+                    'terminal': self.terminal,
+                    'items': [
+                        {'Menu Item Name': item['Menu Item Name'], 'Size/Container': item['Size/Container'], 'Price': float(item['Price'])}
+                        for item in items
+                    ],
+                })
+                self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return order_id, {}
+
+    def pending_orders(self):
+        """Returns the open (not served) order items of every terminal, in POSSystem.pending_orders format."""
+        rows = self.conn.execute(
+            'SELECT o.order_id, o.customer, i.menu_name, i.size, i.price, i.status '
+            'FROM orders o JOIN order_items i ON i.order_id = o.order_id '
+            f"WHERE o.status IN {_OPEN} ORDER BY o.placed_at, i.item_id"
+        ).fetchall()
+        return [
+            {
+                'OrderID': order_id,
+                'Customer/Table': customer,
+                'Menu Item Name': menu_name,
+                'Size/Container': size,
+                'Price': price,
+                'Status': status,
+            }
+            for order_id, customer, menu_name, size, price, status in rows
+        ]
+
+    def open_orders(self):
+        """Returns the open orders of every terminal, oldest first, each with its 'Items'."""
+        orders = {}
+        for order_id, customer, terminal, status, placed_at, menu_name, size, price in self.conn.execute(
+            'SELECT o.order_id, o.customer, o.terminal, o.status, o.placed_at, i.menu_name, i.size, i.price '
+            'FROM orders o JOIN order_items i ON i.order_id = o.order_id '
+            f"WHERE o.status IN {_OPEN} ORDER BY o.placed_at, i.item_id"
+        ):
+            order = orders.setdefault(order_id, {
+                'OrderID': order_id,
+                'Customer/Table': customer,
+                'Terminal': terminal,
+                'Status': status,
+                'Placed At': placed_at,
+                'Items': [],
+            })
+            order['Items'].append({'Menu Item Name': menu_name, 'Size/Container': size, 'Price': price})
+        return list(orders.values())
+
+    def advance_order(self, order_id, state):
+        """Moves an open order forward to PREPARING or READY.
+
+        Returns False if the order is not open or already at or past `state`.
+        Raises ValueError for any other state (orders are served with serve_order()).
+        """
+        if state not in KITCHEN_STATES:
+            raise ValueError(f"'{state}' is not one of {', '.join(KITCHEN_STATES)}.")
+        earlier = ORDER_STATES[:ORDER_STATES.index(state)]
+        self._transaction()
+        try:
+            updated = self.conn.execute(
+                f"UPDATE orders SET status = ? WHERE order_id = ? AND status IN ({', '.join('?' * len(earlier))})",
+                (state, order_id, *earlier)
+            ).rowcount
+            if updated:
+                self.conn.execute('UPDATE order_items SET status = ? WHERE order_id = ?', (state, order_id))
+                self._add_event(order_id, state, {'terminal': self.terminal})
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return bool(updated)
+
+    def serve_order(self, order_id):
+        """Marks an order served and deducts its reserved stock from inventory.
+
+        Returns (shortfalls, needs): the inventory shortfalls and the
+        {ingredient: qty} deducted, which is what was reserved when the order
+        was placed even if a recipe changed since. Returns None if the order
+        is not open (e.g. another terminal already served it).
+        """
+        self._transaction()
+        try:
+            row = self.conn.execute('SELECT status FROM orders WHERE order_id = ?', (order_id,)).fetchone()
+            if row is None or row[0] not in OPEN_STATES:
+                self.conn.execute('ROLLBACK')
+                return None
+
+            needs = {}
+            for name, qty in self.conn.execute('SELECT ingredient, qty FROM reservations WHERE order_id = ?', (order_id,)):
+                needs[name] = needs.get(name, 0) + qty
+            # deduct_inventory_bulk takes the inventory lock, which restocks and
+            # stock counts of any process hold while they rewrite the stock
+            shortfalls = database.deduct_inventory_bulk(needs)
+
+            self.conn.execute('DELETE FROM reservations WHERE order_id = ?', (order_id,))
+            self.conn.execute("UPDATE order_items SET status = 'SERVED' WHERE order_id = ?", (order_id,))
+            self.conn.execute("UPDATE orders SET status = 'SERVED', served_at = ? WHERE order_id = ?", (time.time(), order_id))
+            self._add_event(order_id, 'SERVED', {'terminal': self.terminal})
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return shortfalls, needs
+
+    def cancel_order(self, order_id):
+        """Cancels an open order and releases its reservation."""
+        self._transaction()
+        try:
+            updated = self.conn.execute(
+                f"UPDATE orders SET status = 'CANCELLED' WHERE order_id = ? AND status IN {_OPEN}", (order_id,)
+            ).rowcount
+            if updated:
+                self.conn.execute('DELETE FROM reservations WHERE order_id = ?', (order_id,))
+                self.conn.execute("UPDATE order_items SET status = 'CANCELLED' WHERE order_id = ?", (order_id,))
+                self._add_event(order_id, 'CANCELLED', {'terminal': self.terminal})
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return bool(updated)
+
+    # --- Kitchen subscription ---
+
+    def last_event_seq(self):
+        return self.conn.execute('SELECT COALESCE(MAX(seq), 0) FROM events').fetchone()[0]
+
+    def events_since(self, seq):
+        """Returns the events after `seq` as dicts, oldest first."""
+        return [
+            {
+                'seq': event_seq,
+                'OrderID': order_id,
+                'kind': kind,
+                'payload': json.loads(payload) if payload else None,
+                'created_at': created_at,
+            }
+            for event_seq, order_id, kind, payload, created_at in self.conn.execute(
+                'SELECT seq, order_id, kind, payload, created_at FROM events WHERE seq > ? ORDER BY seq', (seq,)
+            )
+        ]
+
+    def subscribe(self, after_seq=None, poll_interval=0.2):
+        """Yields new events as other terminals commit them.
+
+        Only SQLite's data_version counter is checked between commits, so an
+        idle kitchen screen does not re-read the order tables or the workbook.
+        """
+        seq = self.last_event_seq() if after_seq is None else after_seq
+        data_version = None
+        while True:
+            current_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+            if current_version != data_version:
+                data_version = current_version
+                for event in self.events_since(seq):
+                    seq = event['seq']
+                    yield event
+            else:
+                time.sleep(poll_interval)
@@ -0,0 +1,287 @@
+# pos_server.py
+"""Headless POS service with a local HTTP/JSON front.
+
+POSService wraps POSSystem and InventoryManager without any input() prompts,
+so tablets, kitchen screens and load tests can drive the shop through one
+long-lived process. The sheet cache, RecipeIndex and cost layers stay warm
+in memory between requests instead of being reloaded per interaction.
+
+    GET  /menu                      menu availability
+    GET  /orders                    pending order items
+    POST /orders                    {"Customer/Table": "T1", "Items": [{"Menu Item Name": ..., "Size/Container": ...}]}
+    POST /orders/<order id>/serve   serve an order (deducts stock, records the sale)
+    POST /orders/<order id>/preparing, /ready   move an order along the kitchen flow
+    GET  /kitchen[?station=bar]     open orders per station and ticket times (see kitchen_display.py)
+    GET  /kitchen/updates?since=N   only the board changes after version N
+    POST /inventory/restock         {"Items": [{"Ingredient Name": ..., "Last Whole Sale Price (₱)": ...,
+                                                "Bulk Quantity (g/ml)": ..., "Delivery Fee (₱)": ..., "Unit (g/ml)": ...}]}
+    GET  /inventory/reorder         reorder points and suggested restocks (see forecast.py)
+    GET  /metrics                   the metrics registry (see metrics.py)
+
+Usage: python pos_server.py [--host 127.0.0.1] [--port 8765] [--terminal NAME] [--async]
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import numpy as np
+import pandas as pd
+import database
+import forecast
+import inventory_manager
+import metrics
+import pos_system
+import recipe_index
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+class POSService:
+    """Programmatic POS operations, safe to call from several threads.
+
+    Every call holds one lock, so orders from all terminals are checked and
+    written one at a time. Without a shared order queue, a new order is
+    checked against the stock minus what the pending orders, and served
+    orders the background pipeline has not deducted yet, will use.
+    """
+
+    def __init__(self, queue=None, pipeline=False):
+        self.pos = pos_system.POSSystem(queue=queue, pipeline=pipeline)
+        self.inventory = inventory_manager.InventoryManager()
+        self.lock = threading.RLock()
+
+    def close(self):
+        """Flushes the background pipeline and folds the sales journal into storage."""
+        with self.lock:
+            if self.pos.pipeline:
+                self.pos.pipeline.close()
+            self.pos.ledger.compact()
+
+    @metrics.instrument('service.menu_availability')
+    def menu_availability(self):
+        with self.lock:
+            return self.pos.get_available_menu()
+
+    def pending_orders(self):
+        with self.lock:
+            if self.pos.queue:
+                self.pos.pending_orders = self.pos.queue.pending_orders()
+            return list(self.pos.pending_orders)
+
+    def _shortages(self, items):
+        """Returns {ingredient: missing qty} if the stock cannot cover `items` on top of the pending orders.
+
+        With the background pipeline, served orders it has not deducted from
+        the stock yet count as pending too.
+        """
+        counts = self.pos.pipeline.queued_counts() if self.pos.pipeline else {}
+        for item in self.pos.pending_orders + items:
+            key = (item['Menu Item Name'], item['Size/Container'])
+            counts[key] = counts.get(key, 0) + 1
+        index = recipe_index.get_recipe_index()
+        needs = index.needs_for(counts)
+        df_inventory = database.load_sheet(database.SHEET_INVENTORY, copy=False)
+        stock = dict(zip(index.ingredients, np.nan_to_num(index.stock_vector(df_inventory))))
+        return {name: qty - max(stock.get(name, 0.0), 0.0) for name, qty in needs.items() if stock.get(name, 0.0) < qty}
+
+    @metrics.instrument('service.place_order')
+    def place_order(self, customer, items):
+        """Places an order for [{'Menu Item Name', 'Size/Container'}, ...].
+
+        Prices are taken from the menu. Returns {'OrderID', 'Customer/Table',
+        'Items', 'Total', 'Shortages'}; OrderID is None and nothing is queued
+        if the stock cannot cover the order. Raises ValueError for unknown
+        menu items, an empty order or items that are not dicts.
+        """
+        if not isinstance(items, list):
+            raise ValueError("The order's Items must be a list.")
+        if not items:
+            raise ValueError("The order has no items.")
+        if not all(isinstance(item, dict) for item in items):
+            raise ValueError("Order items must be objects with 'Menu Item Name' and 'Size/Container'.")
+        with self.lock:
+            index = recipe_index.get_recipe_index()
+            order_items = []
+            for item in items:
+                key = (item.get('Menu Item Name'), item.get('Size/Container'))
+                if key not in index.item_ids:
+                    raise ValueError(f"'{key[0]}' ({key[1]}) is not on the menu.")
+                order_items.append({
+                    'Menu Item Name': key[0],
+                    'Size/Container': key[1],
+                    'Price': float(index.prices[index.item_ids[key]]),
+                })
+
+            shortages = {} if self.pos.queue else self._shortages(order_items)
+            order_id = None
+            if not shortages:
+                order_id, shortages = self.pos.submit_order(customer, order_items)
+            return {
+                'OrderID': order_id,
+                'Customer/Table': customer,
+                'Items': order_items,
+                'Total': sum(item['Price'] for item in order_items),
+                'Shortages': shortages,
+            }
+
+    @metrics.instrument('service.serve')
+    def serve(self, order_id):
+        """Serves a pending order. Returns POSSystem.serve's result, or None if it is not pending."""
+        with self.lock:
+            return self.pos.serve(order_id)
+
+    @metrics.instrument('service.advance')
+    def advance(self, order_id, state):
+        """Moves an open order to PREPARING or READY. Returns False if it is not open or already past it."""
+        with self.lock:
+            return self.pos.advance(order_id, state)
+
+    def kitchen_board(self, station=None):
+        """Returns the open orders per station with the ticket time stats."""
+        with self.lock:
+            self.pos.sync_board()
+            return self.pos.board.snapshot(station)
+
+    def kitchen_updates(self, since, station=None):
+        """Returns the order board changes after version `since` (see OrderBoard.updates_since)."""
+        with self.lock:
+            self.pos.sync_board()
+            return self.pos.board.updates_since(since, station)
+
+    @metrics.instrument('service.reorder_plan')
+    def reorder_plan(self):
+        """Returns the forecast reorder point and suggested restock of every ingredient."""
+        with self.lock:
+            plan = forecast.current_plan(self.pos.ledger)
+        # Days of Stock Left is inf for unused ingredients, which JSON cannot hold
+        return plan.replace([np.inf], np.nan).astype(object).where(lambda df: df.notna(), None)
+
+    @metrics.instrument('service.restock')
+    def restock(self, batch):
+        """Restocks [{'Ingredient Name', 'Last Whole Sale Price (₱)', ...}, ...] and saves once.
+
+        Returns the menu items repriced by the new costs.
+        """
+        with self.lock:
+            changes = self.inventory.restock_batch(batch)
+            return [] if changes is None else changes.to_dict(orient='records')
+
+# --- HTTP front ---
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict(orient='records')
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None  # Set by make_server()
+
+    def _reply(self, status, data):
+        body = json.dumps(data, default=_json_default, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _route(self, method):
+        path, _, query = self.path.partition('?')
+        parts = [part for part in path.split('/') if part]
+        params = {name: values[-1] for name, values in parse_qs(query).items()}
+        service = self.service
+        if method == 'GET' and parts == ['menu']:
+            return 200, service.menu_availability()
+        if method == 'GET' and parts == ['orders']:
+            return 200, service.pending_orders()
+        if method == 'GET' and parts == ['inventory', 'reorder']:
+            return 200, service.reorder_plan()
+        if method == 'GET' and parts == ['kitchen']:
+            return 200, service.kitchen_board(params.get('station'))
+        if method == 'GET' and parts == ['kitchen', 'updates']:
+            return 200, service.kitchen_updates(int(params.get('since', 0)), params.get('station'))
+        if method == 'GET' and parts == ['metrics']:
+            return 200, metrics.snapshot()
+        if method == 'POST' and parts == ['orders']:
+            body = self._body()
+            if not isinstance(body, dict):
+                raise ValueError("The order must be a JSON object with 'Customer/Table' and 'Items'.")
+            result = service.place_order(body.get('Customer/Table', ''), body.get('Items') or [])
+            return (201 if result['OrderID'] else 409), result
+        if method == 'POST' and len(parts) == 3 and parts[0] == 'orders' and parts[2] == 'serve':
+            result = service.serve(parts[1])
+            return (200, result) if result else (404, {'error': f"Order {parts[1]} is not pending."})
+        if method == 'POST' and len(parts) == 3 and parts[0] == 'orders' and parts[2] in ('preparing', 'ready'):
+            if service.advance(parts[1], parts[2].upper()):
+                return 200, {'OrderID': parts[1], 'State': parts[2].upper()}
+            return 409, {'error': f"Order {parts[1]} is not open or is already {parts[2]}."}
+        if method == 'POST' and parts == ['inventory', 'restock']:
+            body = self._body()
+            batch = body if isinstance(body, list) else body.get('Items') if isinstance(body, dict) else None
+            if not isinstance(batch, list):
+                raise ValueError("The restock must be a list of entries, or an object with an 'Items' list.")
+            return 200, {'Repriced': service.restock(batch)}
+        return 404, {'error': f"No route for {method} {self.path}"}
+
+    def _handle(self, method):
+        try:
+            status, data = self._route(method)
+        except ValueError as e:  # Includes bad JSON
+            status, data = 400, {'error': str(e)}
+        except Exception as e:
+            status, data = 500, {'error': f"{type(e).__name__}: {e}"}
+        self._reply(status, data)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def log_message(self, format, *args):
+        print(f"[{self.log_date_time_string()}] {self.address_string()} {format % args}")
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Returns a ThreadingHTTPServer answering for `service` (call serve_forever())."""
+    handler = type('POSHandler', (_Handler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Headless coffee shop POS service")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--terminal', help="share the order queue with CLI terminals under this name")
+    parser.add_argument('--async', dest='use_pipeline', action='store_true', help="save served orders in the background")
+    args = parser.parse_args()
+    if args.use_pipeline and args.terminal:
+        parser.error("--async cannot be combined with --terminal")
+
+    queue = None
+    if args.terminal:
+        import order_queue
+        queue = order_queue.OrderQueue(terminal=args.terminal)
+    service = POSService(queue=queue, pipeline=args.use_pipeline)
+    # Warm the sheet cache, recipe index and menu before the first request
+    service.menu_availability()
+
+    server = make_server(service, args.host, args.port)
+    print(f"☕ POS service listening on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        print("POS service stopped.")
@@ -1,67 +1,70 @@
 # pos_system.py
+import contextlib
+import numpy as np
 import pandas as pd
+import cost_layers
 import database
+import kitchen_display
+import metrics
+import order_pipeline
+import order_queue
+import recipe_index
+import sales_ledger
+import time
 import uuid
 
+PROFILE_FILE = "coffeeshop_order.prof"
+
 class POSSystem:
-    def __init__(self):
+    def __init__(self, queue=None, pipeline=False, profile=False):
         self.currency_symbol = database.CURRENCY
         self.pending_orders = []
+        # Shared order_queue.OrderQueue when running as one of several terminals
+        self.queue = queue
+        # Open orders by id and station, kept up to date instead of regrouped on every view
+        self.board = kitchen_display.OrderBoard()
+        if queue:
+            self.sync_board()  # Start following the queue now, so orders placed from here on get ticket times
+        self.ledger = sales_ledger.SalesLedger()
+        # With pipeline=True, served orders are persisted in the background
+        self.pipeline = order_pipeline.OrderPipeline(self.ledger).start() if pipeline else None
+        # With profile=True, the first order cycle (place through serve) runs under cProfile/tracemalloc
+        self.profile_pending = profile
+        self._profiling = contextlib.ExitStack()
 
+    @metrics.instrument('pos.get_available_menu')
     def get_available_menu(self):
-        """Checks menu against inventory to determine availability."""
-        df_menu = database.load_sheet(database.SHEET_MENU)
-        df_inventory = database.load_sheet(database.SHEET_INVENTORY)
+        """Checks menu against inventory to determine availability.
+
+        Uses the shared RecipeIndex: the stock vector is compared against the
+        whole menu x ingredient matrix at once, giving each menu item/size the
+        number of servings still possible and the ingredient limiting it.
+        """
+        index = recipe_index.get_recipe_index()
+        df_inventory = database.load_sheet(database.SHEET_INVENTORY, copy=False)
         
+        stock = index.stock_vector(df_inventory)
+        if self.queue:
+            # Stock held by other terminals' open orders is not available here
+            stock = stock - self.queue.reserved_vector(index.ingredients)
+        servings, limiting, first_short = index.availability(stock)
+
         available_menu = []
-        
-        # Get unique menu items and their pricing details
-        unique_menus = df_menu.drop_duplicates(subset=['Menu Item Name', 'Size/Container'])
-        
-        for index, menu_row in unique_menus.iterrows():
-            menu_name = menu_row['Menu Item Name']
-            size = menu_row['Size/Container']
-            is_available = True
-            
-            # Filter all ingredient rows for the current menu item/size
-            item_ingredients = df_menu[
-                (df_menu['Menu Item Name'] == menu_name) & 
-                (df_menu['Size/Container'] == size)
-            ]
-            missing_ingredient = None
-            
-            # Check stock for each ingredient required
-            for _, ing_row in item_ingredients.iterrows():
-                ing_name = ing_row['Ingredient Name']
-                qty_needed = ing_row['Needed Quantity (g/ml)']
-                
-                inv_match = df_inventory[df_inventory['Ingredient Name'] == ing_name]
-                
-                if inv_match.empty:
-                    # Ingredient doesn't exist in inventory
-                    is_available = False
-                    missing_ingredient = ing_name
-                    break
-                
-                current_stock = inv_match['Current Stock (g/ml)'].iloc[0]
-                
-                if current_stock < qty_needed:
-                    is_available = False
-                    missing_ingredient = ing_name
-                    break
-            
+        for row, (menu_name, size) in enumerate(index.items):
             # Append menu item with availability status
-            menu_data = {
+            available_menu.append({
                 'Menu Item Name': menu_name,
                 'Size/Container': size,
-                'Selling Price': menu_row['Suggested Selling Price (₱)'],
-                'Available': is_available,
-                'MissingIngredient': missing_ingredient
-            }
-            available_menu.append(menu_data)
+                'Selling Price': float(index.prices[row]),
+                'Available': bool(first_short[row] < 0),
+                'MissingIngredient': index.ingredients[first_short[row]] if first_short[row] >= 0 else None,
+                'ServingsRemaining': None if np.isinf(servings[row]) else int(servings[row]),
+                'LimitingIngredient': index.ingredients[limiting[row]] if limiting[row] >= 0 else None,
+            })
 
         return available_menu
 
+    @metrics.instrument('pos.place_order')
     def place_order(self, available_menu):
         """Prompts for order details."""
         print("## 📝 Place New Order 📝")
@@ -75,6 +78,8 @@ class POSSystem:
             for i, item in enumerate(available_menu):
                 if item['Available']:
                     status = "✅"
+                    if item['ServingsRemaining'] is not None:
+                        status += f" ({item['ServingsRemaining']} left)"
                     print(f"  {i+1}. {item['Menu Item Name']} ({item['Size/Container']}) - {self.currency_symbol}{item['Selling Price']:.2f} {status}")
                 else:
                     print(f"  {i+1}. {item['Menu Item Name']} ({item['Size/Container']}) - {self.currency_symbol}{item['Selling Price']:.2f} ❌ (LOW STOCK: {item['MissingIngredient']})")
@@ -107,29 +112,74 @@ class POSSystem:
                 print("Invalid input.")
 
         if order_items:
-            self.pending_orders.extend(order_items)
+            order_id, shortages = self.submit_order(name_or_table, order_items, order_id)
+            if order_id is None:
+                print("🚫 Order not placed: another terminal took the last of:")
+                for ing_name, qty_short in shortages.items():
+                    print(f"  - {ing_name} (short by {qty_short:g})")
+                return
             print(f"\nOrder for {name_or_table} placed with {len(order_items)} items.")
 
+    @metrics.instrument('pos.submit_order')
+    def submit_order(self, customer, items, order_id=None):
+        """Queues an order without prompting.
+
+        `items` is a list of dicts with 'Menu Item Name', 'Size/Container' and
+        'Price'. Returns (order_id, shortages); with a shared queue the stock
+        is reserved first, and order_id is None if it could not cover the order.
+        """
+        if self.queue:
+            return self.queue.place_order(customer, items)
+        order_id = order_id or str(uuid.uuid4())
+        self.pending_orders.extend(
+            {**item, 'OrderID': order_id, 'Customer/Table': customer, 'Status': 'PENDING'} for item in items
+        )
+        self.board.place(order_id, customer, items, terminal='register')
+        return order_id, {}
+
+    def sync_board(self):
+        """Brings the order board up to date with the shared queue; returns the new deltas."""
+        return self.board.sync(self.queue) if self.queue else []
+
+    def advance(self, order_id, state):
+        """Moves an open order to PREPARING or READY.
+
+        Returns False if it is not open or already at or past `state`. Raises
+        ValueError for other states; orders are served with serve().
+        """
+        if self.queue:
+            return self.queue.advance_order(order_id, state)
+        if state not in order_queue.KITCHEN_STATES:
+            raise ValueError(f"'{state}' is not one of {', '.join(order_queue.KITCHEN_STATES)}.")
+        if not self.board.advance(order_id, state):
+            return False
+        for item in self.pending_orders:
+            if item['OrderID'] == order_id:
+                item['Status'] = state
+        return True
+
     def view_pending_orders(self):
-        """Displays currently pending orders."""
+        """Displays currently open orders from the order board."""
         print("\n## 🔔 Pending Orders 🔔")
-        if not self.pending_orders:
+        self.sync_board()
+        tickets = self.board.tickets()
+        if not tickets:
             print("No pending orders.")
             return
 
-        df_pending = pd.DataFrame(self.pending_orders)
-        
-        # Group by OrderID to show orders neatly
-        for order_id, group in df_pending.groupby('OrderID'):
-            table = group['Customer/Table'].iloc[0]
-            total = group['Price'].sum()
-            print(f"\nOrder ID: {order_id} | Customer/Table: {table} | Total: {self.currency_symbol}{total:.2f}")
-            for _, item in group.iterrows():
-                print(f"  - {item['Menu Item Name']} ({item['Size/Container']}) [Status: {item['Status']}]")
+        for ticket in tickets:
+            waiting = kitchen_display.format_minutes(time.time() - ticket.placed_at)
+            print(f"\nOrder ID: {ticket.order_id} | Customer/Table: {ticket.customer} | "
+                  f"Total: {self.currency_symbol}{ticket.total():.2f} | {ticket.state} ({waiting})")
+            for item in ticket.items:
+                print(f"  - {item['Menu Item Name']} ({item['Size/Container']}) [Station: {item['Station']}]")
 
+    @metrics.instrument('pos.serve_order')
     def serve_order(self):
         """Marks an order as served and deducts inventory."""
         print("\n## ✅ Mark Order as Served ✅")
+        if self.queue:
+            self.pending_orders = self.queue.pending_orders()
         if not self.pending_orders:
             print("No pending orders to serve.")
             return
@@ -148,68 +198,98 @@ class POSSystem:
         try:
             index = int(choice) - 1
             selected_id = unique_orders.iloc[index]['OrderID']
-            
-            # --- Deduction Logic ---
-            df_menu = database.load_sheet(database.SHEET_MENU)
-            
-            items_served = [item for item in self.pending_orders if item['OrderID'] == selected_id and item['Status'] == 'PENDING']
-            
+        except (ValueError, IndexError):
+            print("Invalid order number.")
+            return
+        self.serve(selected_id)
+
+    @metrics.instrument('pos.serve')
+    def serve(self, order_id):
+        """Serves a pending order without prompting.
+
+        Deducts its inventory, costs the goods used and records the sale.
+        Returns {'OrderID', 'Shortfalls', 'Cost of Goods', 'Sale'} ('Cost of
+        Goods' and 'Sale' are None when the pipeline saves them in the
+        background), or None if the order is not pending.
+        """
+        if self.queue:
+            self.pending_orders = self.queue.pending_orders()
+        # --- Deduction Logic ---
+        items_served = [item for item in self.pending_orders
+                        if item['OrderID'] == order_id and item['Status'] in order_queue.OPEN_STATES]
+        if not items_served:
+            print("This order was already served or cancelled.")
+            return None
+
+        if self.pipeline:
             for item in items_served:
                 item['Status'] = 'SERVED' # Update status in memory
+            self.board.advance(order_id, 'SERVED')
+            # Inventory deduction and the sale are written by the background pipeline
+            self.pipeline.submit(order_id, items_served[0]['Customer/Table'], items_served)
+            print(f"✅ Order {order_id[:8]}... marked as **SERVED**; inventory and sales are saved in the background.")
+            self.pending_orders = [item for item in self.pending_orders if item['Status'] in order_queue.OPEN_STATES]
+            return {'OrderID': order_id, 'Shortfalls': {}, 'Cost of Goods': None, 'Sale': None}
+
+        # Loaded before deducting, since the lots are rebuilt from the current stock
+        layers = cost_layers.get_cost_layers()
+
+        if self.queue:
+            # The queue deducts exactly what was reserved when the order was placed,
+            # and the lots are consumed for those same quantities
+            served = self.queue.serve_order(order_id)
+            if served is None:
+                print("This order was already served or cancelled by another terminal.")
+                return None
+            shortfalls, needs = served
+        else:
+            # Count servings per menu item/size so the whole order is one matrix-vector product
+            counts = {}
+            for item in items_served:
+                key = (item['Menu Item Name'], item['Size/Container'])
+                counts[key] = counts.get(key, 0) + 1
+            needs = recipe_index.get_recipe_index().needs_for(counts)
+            # Deduct stock for every ingredient in one save
+            shortfalls = database.deduct_inventory_bulk(needs)
+        for item in items_served:
+            item['Status'] = 'SERVED' # Update status in memory
+        if self.queue:
+            self.sync_board()
+        else:
+            self.board.advance(order_id, 'SERVED')
+        for ing_name, qty_short in shortfalls.items():
+            print(f"⚠️ Not enough {ing_name} in stock: short by {qty_short:g}.")
+
+        # The deducted stock comes out of the oldest lots (or at the moving average)
+        cost_of_goods = sum(layers.consume(needs).values())
+        print(f"   Cost of goods used: {self.currency_symbol}{cost_of_goods:.2f} ({layers.policy.upper()})")
                 
-                # Get the required ingredients for the item
-                item_ingredients = df_menu[
-                    (df_menu['Menu Item Name'] == item['Menu Item Name']) & 
-                    (df_menu['Size/Container'] == item['Size/Container'])
-                ]
-                
-                # Deduct stock for each ingredient
-                for _, ing_row in item_ingredients.iterrows():
-                    ing_name = ing_row['Ingredient Name']
-                    qty_needed = ing_row['Needed Quantity (g/ml)']
-                    database.update_inventory(ing_name, qty_needed)
-                    
-            print(f"✅ Order {selected_id[:8]}... marked as **SERVED** and inventory deducted.")
-            
-            # --- Cash Flow Accounting ---
-            self.account_cash_flow(selected_id)
+        print(f"✅ Order {order_id[:8]}... marked as **SERVED** and inventory deducted.")
+        
+        # --- Cash Flow Accounting ---
+        sale = self.account_cash_flow(order_id)
 
-            # Remove served items from pending list
-            self.pending_orders = [item for item in self.pending_orders if item['Status'] == 'PENDING']
-            
-        except (ValueError, IndexError):
-            print("Invalid order number.")
+        # Remove served items from pending list
+        self.pending_orders = [item for item in self.pending_orders if item['Status'] in order_queue.OPEN_STATES]
+        return {'OrderID': order_id, 'Shortfalls': shortfalls, 'Cost of Goods': cost_of_goods, 'Sale': sale}
 
+    @metrics.instrument('pos.account_cash_flow', rows=1)
     def account_cash_flow(self, order_id):
         """Records the served order for daily sales/cash flow."""
-        df_pending = pd.DataFrame(self.pending_orders)
-        served_order = df_pending[df_pending['OrderID'] == order_id] # Assuming we check based on the initial ID
+        served_order = [item for item in self.pending_orders if item['OrderID'] == order_id]
         
-        if served_order.empty: return
+        if not served_order: return
 
-        # Load existing sales/cash flow data (assuming this is a separate sheet or aggregated later)
-        # For simplicity, we'll append to a 'Daily_Sales' sheet
-        df_sales = database.load_sheet(database.SHEET_SALES)
-        
-        total_sale = served_order['Price'].sum()
-        
-        sales_data = {
-            'SaleID': order_id,
-            'Date': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'Total Sale (₱)': total_sale,
-            'Customer/Table': served_order['Customer/Table'].iloc[0],
-            'Items Count': len(served_order)
-        }
-        
-        df_new_sale = pd.DataFrame([sales_data])
-        
-        if not df_sales.empty:
-            df_sales_combined = pd.concat([df_sales, df_new_sale], ignore_index=True)
-        else:
-            df_sales_combined = df_new_sale
-            
-        database.save_dataframe(df_sales_combined, database.SHEET_SALES)
-        print(f"💰 Cash Flow recorded: Sale of {self.currency_symbol}{total_sale:.2f}.")
+        # Append the sale to the sales journal; it is folded into the
+        # 'Daily_Sales' sheet by the ledger's periodic compaction
+        sale = self.ledger.record_sale(
+            sale_id=order_id,
+            date=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+            customer=served_order[0]['Customer/Table'],
+            items=served_order,
+        )
+        print(f"💰 Cash Flow recorded: Sale of {self.currency_symbol}{sale['Total Sale (₱)']:.2f}.")
+        return sale
 
     def run(self):
         while True:
@@ -225,17 +305,53 @@ class POSSystem:
             choice = input("Enter choice (1-4): ").strip()
 
             if choice == '1':
+                if self.profile_pending:
+                    self.profile_pending = False
+                    self._profiling.enter_context(metrics.profile("order cycle", PROFILE_FILE))
                 self.place_order(menu)
             elif choice == '2':
                 self.view_pending_orders()
             elif choice == '3':
                 self.serve_order()
+                self._profiling.close()
             elif choice == '4':
+                self._profiling.close()
+                if self.pipeline:
+                    self.pipeline.close()
+                self.ledger.compact()
+                if metrics.is_enabled():
+                    metrics.report()
                 print("Exiting POS System.")
                 break
             else:
                 print("Invalid choice. Please try again.")
 
+def run_kitchen_display(queue, station=None):
+    """Shows the open orders and follows the shared queue as they change (see kitchen_display.py)."""
+    kitchen_display.run_display(queue, station)
+
 if __name__ == "__main__":
-    app = POSSystem()
-    app.run()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Coffee shop POS")
+    parser.add_argument('--terminal', help="run as a named terminal sharing the order queue with other terminals")
+    parser.add_argument('--kitchen', action='store_true', help="run as a kitchen display following the shared order queue")
+    parser.add_argument('--station', choices=kitchen_display.STATIONS, help="with --kitchen, only show one station's orders")
+    parser.add_argument('--async', dest='use_pipeline', action='store_true', help="save served orders in the background (single register only)")
+    parser.add_argument('--profile', action='store_true', help=f"profile the first order cycle (place through serve) and save it to {PROFILE_FILE}")
+    args = parser.parse_args()
+    if args.use_pipeline and (args.terminal or args.kitchen):
+        parser.error("--async cannot be combined with --terminal or --kitchen")
+    if metrics.is_enabled() and metrics.METRICS_FILE:
+        metrics.start_dumping()
+
+    if args.kitchen:
+        run_kitchen_display(order_queue.OrderQueue(terminal='kitchen'), args.station)
+    elif args.terminal:
+        app = POSSystem(queue=order_queue.OrderQueue(terminal=args.terminal), profile=args.profile)
+        app.run()
+    else:
+        app = POSSystem(pipeline=args.use_pipeline, profile=args.profile)
+        app.run()
+    if metrics.is_enabled() and metrics.METRICS_FILE:
+        print(f"Metrics saved to {metrics.dump()}.")
\ No newline at end of file
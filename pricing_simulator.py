@@ -0,0 +1,299 @@
+# pricing_simulator.py
+"""What-if pricing for the whole menu.
+
+A scenario changes ingredient costs and profit targets, and every menu item
+is recosted with the CostingApp formula:
+
+    Total Prime Cost = sum(Cost/Unit x Needed Quantity) + Other Variable Costs
+    Suggested Selling Price = costing_app.suggested_price(Total Prime Cost, Profit Target (%))
+
+Each ingredient's Cost/Unit is split into its wholesale price and delivery
+fee parts (from Last Whole Sale Price and Delivery Fee), so either can be
+changed. Scenarios are evaluated as matrices (scenarios x ingredient costs
+times the recipe matrix) in chunks of CHUNK_SCENARIOS, which can be spread
+over a process pool for large grids or Monte Carlo runs.
+
+Scenario file, a JSON list:
+    [{"Scenario": "Milk +15%, fees x2, 60% drinks / 45% food",
+      "Ingredient Price Change (%)": {"Milk": 15},     # "*" applies to every ingredient
+      "Delivery Fee Factor": 2,
+      "Margin Rules": [{"Size/Container": "oz$", "Profit Target (%)": 60},
+                       {"Profit Target (%)": 45}]}]
+Margin rules match Menu Item Name and/or Size/Container by regular
+expression; the first matching rule wins and unmatched items keep their
+stored Profit Target.
+
+Usage: python pricing_simulator.py scenarios.json [--detail] [--processes N]
+       python pricing_simulator.py --samples 10000 [--volatility 10] [--fee-volatility 20] [--seed 0] [--processes N]
+"""
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+import costing_app
+import database
+import recipe_index
+
+CHUNK_SCENARIOS = 2000  # Scenarios evaluated per matrix product (bounds memory per chunk)
+
+SUMMARY_COLUMNS = [
+    'Scenario', 'Avg Prime Cost (₱)', 'Avg Suggested Price (₱)', 'Avg Price Change (%)',
+    'Margin at Current Prices (%)', 'Items Below Target',
+]
+DETAIL_COLUMNS = costing_app.MENU_KEYS + [
+    'Current Price (₱)', 'Total Prime Cost (₱)', 'Profit Target (%)', 'Suggested Selling Price (₱)',
+    'Profit Amount (₱)', 'Price Change (%)', 'Margin at Current Price (%)',
+]
+
+class PricingModel:
+    """The menu as arrays: recipe quantities, ingredient costs and each item's current pricing.
+
+    Items and ingredients are in RecipeIndex order; the current price of an
+    item is its stored Suggested Selling Price, which the POS charges.
+    """
+
+    def __init__(self, df_menu, df_inventory):
+        index = recipe_index.RecipeIndex.from_menu(df_menu)
+        self.items = index.items
+        self.ingredients = index.ingredients
+        self.quantities = index.needed  # items x ingredients
+        self.current_prices = index.prices
+
+        if self.items:
+            lines = df_menu[df_menu['Menu Item Name'].notna()]
+            first = lines.drop_duplicates(costing_app.MENU_KEYS).set_index(costing_app.MENU_KEYS)
+            first = first.reindex(pd.MultiIndex.from_tuples(self.items))
+            self.other_costs = first['Other Variable Costs (₱)'].fillna(0).to_numpy(dtype=float)
+            self.profit_targets = first['Profit Target (%)'].to_numpy(dtype=float)
+            stored_costs = lines.groupby('Ingredient Name')['Cost/Unit (₱)'].first().reindex(self.ingredients)
+        else:
+            self.other_costs = self.profit_targets = np.zeros(0)
+            stored_costs = pd.Series(dtype=float)
+
+        # Costs come from the inventory; recipe lines keep their stored Cost/Unit otherwise
+        folded = pd.Series(self.ingredients, dtype=object).astype(str).str.strip().str.casefold()
+        if not df_inventory.empty and 'Ingredient Name' in df_inventory.columns:
+            inventory = df_inventory.set_index(df_inventory['Ingredient Name'].astype(str).str.strip().str.casefold())
+            inventory = inventory[~inventory.index.duplicated()].reindex(folded)
+        else:
+            inventory = pd.DataFrame(index=folded)
+
+        def column(name):
+            return inventory[name].to_numpy(dtype=float) if name in inventory.columns else np.full(len(folded), np.nan)
+
+        costs = column('Cost/Unit')
+        self.unit_costs = np.where(np.isnan(costs), stored_costs.to_numpy(dtype=float), costs)
+        self.unit_costs = np.nan_to_num(self.unit_costs)
+
+        price, fee = np.nan_to_num(column('Last Whole Sale Price (₱)')), np.nan_to_num(column('Delivery Fee (₱)'))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.fee_shares = np.where(price + fee > 0, fee / (price + fee), 0.0)
+        self._folded_ids = {name: j for j, name in enumerate(folded)}
+
+    @classmethod
+    def load(cls):
+        """Builds the model from the stored Menu_Costing and Inventory_Stock sheets."""
+        return cls(database.load_sheet(database.SHEET_MENU, copy=False),
+                   database.load_sheet(database.SHEET_INVENTORY, copy=False))
+
+    # --- Scenario inputs ---
+
+    def scenario_inputs(self, scenarios):
+        """Returns (price factors, fee factors, profit targets) for a list of scenario dicts.
+
+        The factors are scenarios x ingredients multipliers of the wholesale
+        price and delivery fee parts; targets are scenarios x items. Raises
+        ValueError for unknown ingredients or profit targets of 100% or more.
+        """
+        price = np.ones((len(scenarios), len(self.ingredients)))
+        fee = np.ones((len(scenarios), len(self.ingredients)))
+        targets = np.tile(self.profit_targets, (len(scenarios), 1))
+        names = pd.Series([name for name, _ in self.items], dtype=object).astype(str)
+        sizes = pd.Series([size for _, size in self.items], dtype=object).astype(str)
+
+        for s, scenario in enumerate(scenarios):
+            changes = dict(scenario.get('Ingredient Price Change (%)') or {})
+            price[s] = 1 + float(changes.pop('*', 0)) / 100
+            for name, change in changes.items():
+                j = self._folded_ids.get(str(name).strip().casefold())
+                if j is None:
+                    raise ValueError(f"Scenario '{scenario.get('Scenario', s + 1)}': '{name}' is not used by any recipe.")
+                price[s, j] = 1 + float(change) / 100
+            fee[s] = float(scenario.get('Delivery Fee Factor', 1))
+
+            # Apply the rules last to first, so the first matching rule wins
+            for rule in reversed(scenario.get('Margin Rules') or []):
+                target = float(rule['Profit Target (%)'])
+                if target >= 100:
+                    raise ValueError(f"Profit Target (%) must be below 100, got {target}.")
+                matched = np.ones(len(self.items), dtype=bool)
+                if rule.get('Menu Item Name'):
+                    matched &= names.str.contains(rule['Menu Item Name'], flags=re.IGNORECASE, regex=True).to_numpy()
+                if rule.get('Size/Container'):
+                    matched &= sizes.str.contains(rule['Size/Container'], flags=re.IGNORECASE, regex=True).to_numpy()
+                targets[s, matched] = target
+        return np.clip(price, 0, None), np.clip(fee, 0, None), targets
+
+    # --- Evaluation ---
+
+    def evaluate(self, price_factors, fee_factors, targets):
+        """Returns (prime costs, suggested prices), each scenarios x items."""
+        unit_costs = self.unit_costs * ((1 - self.fee_shares) * price_factors + self.fee_shares * fee_factors)
+        prime = unit_costs @ self.quantities.T + self.other_costs
+        return prime, costing_app.suggested_price(prime, targets)
+
+    def summarize(self, prime, suggested, targets):
+        """Returns the whole-menu figures of each scenario (SUMMARY_COLUMNS without 'Scenario')."""
+        current = self.current_prices
+        priced = current > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.where(priced, (suggested / current - 1) * 100, np.nan)
+            margin = np.where(priced, (current - prime) / current * 100, np.nan)
+            menu_margin = (current[priced].sum() - prime[:, priced].sum(axis=1)) / current[priced].sum() * 100
+            return np.column_stack([
+                prime.mean(axis=1) if prime.shape[1] else np.zeros(len(prime)),
+                suggested.mean(axis=1) if suggested.shape[1] else np.zeros(len(prime)),
+                np.nanmean(change, axis=1) if priced.any() else np.full(len(prime), np.nan),
+                menu_margin,
+                _below_target(margin, targets).sum(axis=1),
+            ])
+
+# --- Chunks (run in the worker processes) ---
+
+def _below_target(margin, targets):
+    # Items priced exactly at their target would otherwise count through rounding
+    return margin < targets - 1e-9
+
+def _grid_chunk(model, inputs):
+    price, fee, targets = inputs
+    prime, suggested = model.evaluate(price, fee, targets)
+    return model.summarize(prime, suggested, targets), None
+
+def _sample_chunk(model, spec):
+    """Draws and evaluates one chunk of Monte Carlo samples.
+
+    Returns the per-sample summary and, per item, the summed margin at the
+    current price and the number of samples below target.
+    """
+    seed, size, volatility, fee_volatility = spec
+    rng = np.random.default_rng(seed)
+    shape = (size, len(model.ingredients))
+    price = np.clip(1 + rng.normal(0, volatility / 100, shape), 0, None)
+    fee = np.clip(1 + rng.normal(0, fee_volatility / 100, shape), 0, None) if fee_volatility else np.ones(shape)
+    targets = np.broadcast_to(model.profit_targets, (size, len(model.items)))
+    prime, suggested = model.evaluate(price, fee, targets)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = (model.current_prices - prime) / model.current_prices * 100
+    return model.summarize(prime, suggested, targets), (np.nansum(margin, axis=0), _below_target(margin, targets).sum(axis=0))
+
+def _run_chunks(fn, model, specs, processes=None):
+    """Runs fn(model, spec) for every chunk, in a process pool if processes > 1."""
+    if processes and processes > 1 and len(specs) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return list(pool.map(fn, repeat(model), specs))
+    return [fn(model, spec) for spec in specs]
+
+# --- Simulations ---
+
+def simulate(model, scenarios, processes=None):
+    """Returns the comparison table of a list of scenario dicts, with a 'Current Menu' row first."""
+    scenarios = [{'Scenario': 'Current Menu'}] + list(scenarios)
+    price, fee, targets = model.scenario_inputs(scenarios)
+    specs = [
+        (price[start:start + CHUNK_SCENARIOS], fee[start:start + CHUNK_SCENARIOS], targets[start:start + CHUNK_SCENARIOS])
+        for start in range(0, len(scenarios), CHUNK_SCENARIOS)
+    ]
+    summary = np.vstack([rows for rows, _ in _run_chunks(_grid_chunk, model, specs, processes)])
+    table = pd.DataFrame(summary, columns=SUMMARY_COLUMNS[1:])
+    table.insert(0, 'Scenario', [scenario.get('Scenario', f'Scenario {i}') for i, scenario in enumerate(scenarios)])
+    return table.astype({'Items Below Target': int})
+
+def scenario_detail(model, scenario):
+    """Returns one scenario's prime cost, suggested price and margins for every menu item."""
+    price, fee, targets = model.scenario_inputs([scenario])
+    prime, suggested = model.evaluate(price, fee, targets)
+    current = model.current_prices
+    with np.errstate(divide='ignore', invalid='ignore'):
+        detail = pd.DataFrame({
+            'Menu Item Name': [name for name, _ in model.items],
+            'Size/Container': [size for _, size in model.items],
+            'Current Price (₱)': current,
+            'Total Prime Cost (₱)': prime[0],
+            'Profit Target (%)': targets[0],
+            'Suggested Selling Price (₱)': suggested[0],
+            'Profit Amount (₱)': suggested[0] - prime[0],
+            'Price Change (%)': np.where(current > 0, (suggested[0] / current - 1) * 100, np.nan),
+            'Margin at Current Price (%)': np.where(current > 0, (current - prime[0]) / current * 100, np.nan),
+        })
+    return detail[DETAIL_COLUMNS].round(2)
+
+def monte_carlo(model, samples, volatility=10.0, fee_volatility=0.0, seed=0, processes=None):
+    """Samples random wholesale price (and delivery fee) changes for every ingredient.
+
+    Each ingredient's change is drawn independently from a normal
+    distribution with a standard deviation of `volatility` percent, at the
+    stored profit targets. Returns (per-sample summary, per-item risk): the
+    items are sorted by their chance of falling below their profit target
+    at the current price.
+    """
+    sizes = [min(CHUNK_SCENARIOS, samples - start) for start in range(0, samples, CHUNK_SCENARIOS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    specs = [(chunk_seed, size, volatility, fee_volatility) for chunk_seed, size in zip(seeds, sizes)]
+    results = _run_chunks(_sample_chunk, model, specs, processes)
+
+    summary = pd.DataFrame(np.vstack([rows for rows, _ in results]), columns=SUMMARY_COLUMNS[1:])
+    summary.insert(0, 'Scenario', [f'Sample {i + 1}' for i in range(samples)])
+    margin_sum = sum(totals[0] for _, totals in results)
+    below = sum(totals[1] for _, totals in results)
+    risk = pd.DataFrame({
+        'Menu Item Name': [name for name, _ in model.items],
+        'Size/Container': [size for _, size in model.items],
+        'Profit Target (%)': model.profit_targets,
+        'Mean Margin at Current Price (%)': (margin_sum / samples).round(2),
+        'Chance Below Target (%)': (below / samples * 100).round(2),
+    })
+    risk = risk.sort_values('Chance Below Target (%)', ascending=False, ignore_index=True)
+    return summary.astype({'Items Below Target': int}), risk
+
+def read_scenarios(path):
+    """Reads a JSON list of scenario dicts (see the module docstring)."""
+    with open(path, encoding='utf-8') as f:
+        scenarios = json.load(f)
+    if not isinstance(scenarios, list):
+        raise ValueError(f"{path} must hold a list of scenarios.")
+    return scenarios
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="What-if pricing for the whole menu")
+    parser.add_argument('scenarios', nargs='?', help="JSON file with a list of scenarios")
+    parser.add_argument('--detail', action='store_true', help="also show every menu item under each scenario")
+    parser.add_argument('--samples', type=int, help="run a Monte Carlo of random ingredient price changes instead")
+    parser.add_argument('--volatility', type=float, default=10.0, help="standard deviation of price changes (%%)")
+    parser.add_argument('--fee-volatility', type=float, default=0.0, help="standard deviation of delivery fee changes (%%)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, help="spread the chunks over this many processes")
+    args = parser.parse_args()
+    if not args.scenarios and not args.samples:
+        parser.error("give a scenario file or --samples")
+
+    model = PricingModel.load()
+    if not model.items:
+        print("No menu items to simulate.")
+    elif args.samples:
+        summary, risk = monte_carlo(model, args.samples, args.volatility, args.fee_volatility, args.seed, args.processes)
+        print(f"## 🎲 {args.samples} samples, ingredient prices ±{args.volatility}% (1 s.d.) 🎲")
+        print(summary.drop(columns='Scenario').describe(percentiles=[0.05, 0.5, 0.95]).round(2).to_string())
+        print("\n--- Items most likely to fall below their profit target ---")
+        print(risk.head(15).to_string(index=False))
+    else:
+        scenarios = read_scenarios(args.scenarios)
+        print("## 💹 Pricing Scenarios 💹")
+        print(simulate(model, scenarios, args.processes).round(2).to_string(index=False))
+        if args.detail:
+            for scenario in scenarios:
+                print(f"\n--- {scenario.get('Scenario', 'Scenario')} ---")
+                print(scenario_detail(model, scenario).to_string(index=False))
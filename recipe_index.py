@@ -0,0 +1,203 @@
+# recipe_index.py
+import numpy as np
+import pandas as pd
+import database
+
+class RecipeIndex:
+    """Precomputed menu -> ingredient matrix built from the Menu_Costing sheet.
+
+    Rows are menu item/size variants and columns are ingredients, holding the
+    needed quantity. Availability is then one vector comparison against the
+    stock vector, and the deduction for an order is a matrix-vector product.
+    """
+
+    def __init__(self):
+        self.items = []            # row id -> (menu name, size)
+        self.item_ids = {}         # (menu name, size) -> row id
+        self.ingredients = []      # column id -> ingredient name
+        self.ingredient_ids = {}   # ingredient name -> column id
+        self.prices = np.zeros(0)
+        self.needed = np.zeros((0, 0))
+        self.uses = np.zeros((0, 0), dtype=bool)
+        # Position of each ingredient in its recipe, to report the first short one
+        self.recipe_order = np.zeros((0, 0))
+        self.source = None
+        self._rows_source = None
+        self._ingredient_rows = {}  # case-folded ingredient name -> Menu_Costing row labels
+        self._item_rows = {}        # (menu name, size) -> Menu_Costing row labels
+
+    @classmethod
+    def from_menu(cls, df_menu):
+        """Builds the index from a Menu_Costing DataFrame."""
+        index = cls()
+        index.source = df_menu
+        if df_menu.empty or 'Menu Item Name' not in df_menu.columns:
+            return index
+
+        # Skip the blank separator rows between menu items
+        lines = df_menu[df_menu['Menu Item Name'].notna()]
+        keys = list(zip(lines['Menu Item Name'], lines['Size/Container']))
+        item_codes, index.items = pd.factorize(pd.Series(keys, dtype=object))
+        ingredient_codes, index.ingredients = pd.factorize(lines['Ingredient Name'])
+        index.items = list(index.items)
+        index.ingredients = list(index.ingredients)
+        index.item_ids = {key: i for i, key in enumerate(index.items)}
+        index.ingredient_ids = {name: j for j, name in enumerate(index.ingredients)}
+
+        shape = (len(index.items), len(index.ingredients))
+        valid = ingredient_codes >= 0
+        quantities = lines['Needed Quantity (g/ml)'].fillna(0).to_numpy(dtype=float)
+        index.needed = np.zeros(shape)
+        np.add.at(index.needed, (item_codes[valid], ingredient_codes[valid]), quantities[valid])
+        index.uses = np.zeros(shape, dtype=bool)
+        index.uses[item_codes[valid], ingredient_codes[valid]] = True
+        index.recipe_order = np.full(shape, np.inf)
+        np.minimum.at(index.recipe_order, (item_codes[valid], ingredient_codes[valid]), np.arange(len(lines))[valid])
+
+        first_rows = pd.Series(np.arange(len(lines))).groupby(item_codes).first().to_numpy()
+        index.prices = lines['Suggested Selling Price (₱)'].to_numpy(dtype=float)[first_rows]
+        return index
+
+    # --- Incremental updates ---
+
+    def _ingredient_id(self, name):
+        if name not in self.ingredient_ids:
+            self.ingredient_ids[name] = len(self.ingredients)
+            self.ingredients.append(name)
+            pad = ((0, 0), (0, 1))
+            self.needed = np.pad(self.needed, pad)
+            self.uses = np.pad(self.uses, pad)
+            self.recipe_order = np.pad(self.recipe_order, pad, constant_values=np.inf)
+        return self.ingredient_ids[name]
+
+    def add_recipe(self, menu_name, size, price, lines):
+        """Adds or replaces one menu item/size; `lines` is [(ingredient, qty), ...]."""
+        key = (menu_name, size)
+        columns = [self._ingredient_id(name) for name, _ in lines]
+
+        if key in self.item_ids:
+            row = self.item_ids[key]
+            self.needed[row] = 0
+            self.uses[row] = False
+            self.recipe_order[row] = np.inf
+        else:
+            row = len(self.items)
+            self.items.append(key)
+            self.item_ids[key] = row
+            self.needed = np.vstack([self.needed, np.zeros((1, len(self.ingredients)))])
+            self.uses = np.vstack([self.uses, np.zeros((1, len(self.ingredients)), dtype=bool)])
+            self.recipe_order = np.vstack([self.recipe_order, np.full((1, len(self.ingredients)), np.inf)])
+            self.prices = np.append(self.prices, np.nan)
+
+        for position, (column, (_, qty)) in enumerate(zip(columns, lines)):
+            self.needed[row, column] += qty
+            self.uses[row, column] = True
+            self.recipe_order[row, column] = min(self.recipe_order[row, column], position)
+        self.prices[row] = price
+        return row
+
+    def update_prices(self, prices, df_menu):
+        """Applies {(menu name, size): price} after the menu sheet was updated row by row.
+
+        The rows keep their positions, so the dependency maps stay valid for `df_menu`.
+        """
+        for key, price in prices.items():
+            self.prices[self.item_ids[key]] = price
+        keep_rows = self._rows_source is self.source
+        self.source = df_menu
+        if keep_rows:
+            self._rows_source = df_menu
+
+    # --- Menu sheet dependencies ---
+
+    def _menu_rows(self):
+        """Maps ingredients and menu items to their rows in the source Menu_Costing frame.
+
+        Built once per source frame, so a restock only looks up the rows it affects.
+        """
+        if self._rows_source is not self.source:
+            self._ingredient_rows, self._item_rows = {}, {}
+            df_menu = self.source
+            if df_menu is not None and not df_menu.empty and 'Menu Item Name' in df_menu.columns:
+                lines = df_menu[df_menu['Menu Item Name'].notna()]
+                folded = lines['Ingredient Name'].astype(str).str.strip().str.casefold()
+                self._ingredient_rows = {name: lines.index[rows] for name, rows in folded.groupby(folded).indices.items()}
+                keys = pd.Series(list(zip(lines['Menu Item Name'], lines['Size/Container'])), dtype=object)
+                self._item_rows = {key: lines.index[rows] for key, rows in keys.groupby(keys).indices.items()}
+            self._rows_source = self.source
+        return self._ingredient_rows, self._item_rows
+
+    def dependent_items(self, ingredient_names):
+        """Returns {(menu name, size): Menu_Costing row labels} for the recipes using any of the ingredients."""
+        ingredient_rows, item_rows = self._menu_rows()
+        affected = {}
+        for name in ingredient_names:
+            rows = ingredient_rows.get(str(name).strip().casefold())
+            if rows is None:
+                continue
+            for key in zip(self.source.loc[rows, 'Menu Item Name'], self.source.loc[rows, 'Size/Container']):
+                affected[key] = item_rows[key]
+        return affected
+
+    # --- Queries ---
+
+    def stock_vector(self, df_inventory):
+        """Returns Current Stock aligned to the ingredient columns (NaN if not in inventory)."""
+        if df_inventory.empty or 'Ingredient Name' not in df_inventory.columns:
+            return np.full(len(self.ingredients), np.nan)
+        stock = df_inventory.drop_duplicates(subset=['Ingredient Name']).set_index('Ingredient Name')['Current Stock (g/ml)']
+        return stock.reindex(self.ingredients).to_numpy(dtype=float)
+
+    def availability(self, stock):
+        """Computes, for every menu row, what the stock vector allows.
+
+        Returns (servings, limiting, first_short): the number of servings that
+        can still be made (inf if nothing limits it), the column id of the
+        ingredient that limits it (-1 when nothing does, e.g. a recipe without
+        ingredients), and the column id of the first short ingredient in
+        recipe order (-1 when the item is available).
+        """
+        if not len(self.ingredients):
+            return np.full(len(self.items), np.inf), np.full(len(self.items), -1), np.full(len(self.items), -1)
+
+        missing = np.isnan(stock)
+        short = self.uses & (missing | (stock < self.needed))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.floor(np.where(missing, 0, stock) / self.needed)
+        ratio = np.where(self.uses & (self.needed > 0), np.maximum(ratio, 0), np.inf)
+        ratio = np.where(self.uses & missing, 0, ratio)
+
+        servings = ratio.min(axis=1)
+        limiting = np.where(np.isfinite(ratio).any(axis=1), ratio.argmin(axis=1), -1)
+        first_short = np.where(short, self.recipe_order, np.inf).argmin(axis=1)
+        first_short = np.where(short.any(axis=1), first_short, -1)
+        return servings, limiting, first_short
+
+    def needs_for(self, counts):
+        """Returns {ingredient: qty} for {(menu name, size): servings}."""
+        order_vector = np.zeros(len(self.items))
+        for key, count in counts.items():
+            if key in self.item_ids:
+                order_vector[self.item_ids[key]] += count
+        totals = order_vector @ self.needed
+        return {self.ingredients[j]: float(totals[j]) for j in np.flatnonzero(totals)}
+
+# --- Shared index ---
+# Built once from the cached Menu_Costing frame and rebuilt only when that frame
+# changes; CostingApp extends it in place with add_recipe().
+_shared_index = None
+
+def get_recipe_index(rebuild=True):
+    """Returns the process-wide RecipeIndex, rebuilding it if the menu sheet changed.
+
+    With rebuild=False the current index is returned as is (it is only built
+    if none exists yet), for callers about to update it incrementally.
+    """
+    global _shared_index
+    if _shared_index is not None and not rebuild:
+        return _shared_index
+    df_menu = database.load_sheet(database.SHEET_MENU, copy=False)
+    if _shared_index is None or _shared_index.source is not df_menu:
+        _shared_index = RecipeIndex.from_menu(df_menu)
+    return _shared_index
@@ -0,0 +1,217 @@
+# reconciliation.py
+"""End-of-day stock reconciliation against a physical count.
+
+The POS deducts the recipe quantity of every served item from 'Current
+Stock (g/ml)', so at close the stock in the inventory (the book stock) is
+what should be on the shelves. Comparing it with a physical count gives,
+per ingredient:
+
+    Theoretical Usage = items sold that day x recipe quantities
+    Variance          = Book Stock - Counted Stock   (positive: missing, e.g. waste or over-pouring)
+    Actual Usage      = Theoretical Usage + Variance
+    Variance Cost     = Variance x Cost/Unit
+
+Counts, sales and inventory are aligned on ingredient ids in one pass. The
+result is appended to the Stock_Variance sheet (one row per ingredient per
+day, partitioned by month like the sales) and the counted ingredients' stock
+is set to the count, so the next day only shows that day's variance.
+
+Usage: python reconciliation.py counts.csv [--date YYYY-MM-DD] [--dry-run]
+       python reconciliation.py trend [--months 6]
+"""
+import numpy as np
+import pandas as pd
+import database
+import ingredients
+import recipe_index
+import sales_ledger
+import units
+
+# Columns a count sheet must provide (one row per ingredient and counted place; counts of
+# the same ingredient are added up). An optional 'Unit (g/ml)' column gives the unit counted in.
+COUNT_COLUMNS = ['Ingredient Name', 'Counted Stock (g/ml)']
+VARIANCE_COLUMNS = [
+    'Date', 'Ingredient Name', 'Unit (g/ml)', 'Book Stock (g/ml)', 'Counted Stock (g/ml)',
+    'Theoretical Usage (g/ml)', 'Actual Usage (g/ml)', 'Variance (g/ml)', 'Variance (%)',
+    'Cost/Unit', 'Variance Cost (₱)',
+]
+TREND_COLUMNS = [
+    'Month', 'Ingredient Name', 'Days Counted', 'Theoretical Usage (g/ml)', 'Actual Usage (g/ml)',
+    'Variance (g/ml)', 'Variance (%)', 'Variance Cost (₱)',
+]
+TREND_MONTHS = 6  # Months `trend` looks back by default
+
+def read_count_file(path):
+    """Reads a physical count sheet (.csv or .xlsx). Raises ValueError if a COUNT_COLUMNS column is missing."""
+    counts = pd.read_excel(path) if path.lower().endswith(('.xlsx', '.xls')) else pd.read_csv(path)
+    missing_cols = [col for col in COUNT_COLUMNS if col not in counts.columns]
+    if missing_cols:
+        raise ValueError(f"{path} is missing column(s): {', '.join(missing_cols)}")
+    return counts
+
+def theoretical_usage(items, index):
+    """Returns the quantity of each index.ingredients used by sold items (one row per item, as in Sales_Items)."""
+    if items.empty or not index.items:
+        return np.zeros(len(index.ingredients))
+    keys = pd.MultiIndex.from_arrays([items['Menu Item Name'], items['Size/Container']])
+    rows = pd.Index(index.items).get_indexer(keys)
+    counts = np.bincount(rows[rows >= 0], minlength=len(index.items))
+    return counts @ index.needed
+
+def variance_report(df_inventory, counts, items, index, date):
+    """Reconciles a physical count with the book stock and the day's sales.
+
+    Returns (report, problems): one VARIANCE_COLUMNS row per counted
+    ingredient, largest Variance Cost first, and the count rows that were
+    skipped (not in the inventory, no number, or a unit that cannot be
+    converted to the inventory unit).
+    """
+    table = ingredients.IngredientTable.from_inventory(df_inventory)
+    n = len(table)
+
+    # Count rows -> ingredient ids, in the inventory unit
+    ids = table.ids_for(counts['Ingredient Name'])
+    quantity = pd.to_numeric(counts['Counted Stock (g/ml)'], errors='coerce').to_numpy(dtype=float)
+    stock_units = table.take(table.units, ids, None)
+    factors = np.ones(len(counts))
+    if 'Unit (g/ml)' in counts.columns:
+        given = counts['Unit (g/ml)'].notna().to_numpy()
+        factors = np.where(given, units.conversion_factors(counts['Unit (g/ml)'].where(given, 'g'), stock_units), 1.0)
+    quantity = quantity * factors
+    valid = (ids >= 0) & ~np.isnan(quantity)
+
+    problems = []
+    for name, known, has_number in zip(counts['Ingredient Name'][~valid], (ids >= 0)[~valid],
+                                       ~np.isnan(quantity[~valid])):
+        if not known:
+            problems.append(f"'{name}' is not in the inventory.")
+        elif not has_number:
+            problems.append(f"'{name}' has no count, or its unit cannot be converted to the inventory unit.")
+
+    counted = np.bincount(ids[valid], weights=quantity[valid], minlength=n)
+    is_counted = np.bincount(ids[valid], minlength=n) > 0
+
+    # Recipe ingredients -> the same ids
+    usage = theoretical_usage(items, index)
+    usage_ids = table.ids_for(pd.Series(index.ingredients, dtype=object))
+    theoretical = np.zeros(n)
+    np.add.at(theoretical, usage_ids[usage_ids >= 0], usage[usage_ids >= 0])
+
+    book = table.stock
+    variance = book - counted
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.where(theoretical > 0, variance / theoretical * 100, np.nan)
+
+    report = pd.DataFrame({
+        'Date': pd.Timestamp(date).strftime('%Y-%m-%d'),
+        'Ingredient Name': np.array(table.names, dtype=object),
+        'Unit (g/ml)': table.units,
+        'Book Stock (g/ml)': book,
+        'Counted Stock (g/ml)': counted,
+        'Theoretical Usage (g/ml)': theoretical.round(4),
+        'Actual Usage (g/ml)': (theoretical + variance).round(4),
+        'Variance (g/ml)': variance.round(4),
+        'Variance (%)': percent.round(2),
+        'Cost/Unit': table.cost_per_unit,
+        'Variance Cost (₱)': (variance * table.cost_per_unit).round(2),
+    })[is_counted]
+    return report.sort_values('Variance Cost (₱)', ascending=False, ignore_index=True), problems
+
+def reconcile(counts, date=None, ledger=None, save=True):
+    """Runs the end-of-day reconciliation of `counts` (see read_count_file) for `date` (default today).
+
+    Counts are compared with the current book stock, so run it at close.
+    With save=True the report replaces any earlier one for that date in
+    Stock_Variance and the counted stock becomes the inventory's Current
+    Stock, in one save. Returns (report, problems).
+    """
+    date = pd.Timestamp(date or pd.Timestamp.now()).normalize()
+    next_day = date + pd.Timedelta(days=1)
+    ledger = ledger or sales_ledger.SalesLedger()
+    _, items = ledger.read_sales(include_items=True, start=date, end=next_day)
+    # No register may deduct between reading the book stock and saving the count
+    with database.inventory_lock():
+        df_inventory = database.load_sheet(database.SHEET_INVENTORY)
+        df_inventory['Current Stock (g/ml)'] = df_inventory['Current Stock (g/ml)'].astype(float)
+        table = ingredients.IngredientTable.from_inventory(df_inventory)
+
+        earlier = database.load_sheet_range(database.SHEET_VARIANCE, date, next_day)
+        if not earlier.empty:
+            # A recount: undo the earlier count's stock adjustment so the book stock is the day's again
+            ids = table.ids_for(earlier['Ingredient Name'])
+            known = ids >= 0
+            rows = table.rows[ids[known]]
+            df_inventory.loc[rows, 'Current Stock (g/ml)'] += earlier['Variance (g/ml)'].to_numpy(dtype=float)[known]
+
+        report, problems = variance_report(df_inventory, counts, items, recipe_index.get_recipe_index(), date)
+        if not save or report.empty:
+            return report, problems
+
+        # Book stock becomes the count, so tomorrow's variance starts from what is on the shelves
+        rows = table.rows[table.ids_for(report['Ingredient Name'])]
+        df_inventory.loc[rows, 'Current Stock (g/ml)'] = report['Counted Stock (g/ml)'].to_numpy()
+
+        changes = {database.SHEET_INVENTORY: (df_inventory, 'overwrite')}
+        if earlier.empty:
+            changes[database.SHEET_VARIANCE] = (report, 'append')
+        else:
+            # The recount replaces the day's rows
+            history = database.load_sheet(database.SHEET_VARIANCE)
+            history = history[history['Date'].astype(str).str[:10] != date.strftime('%Y-%m-%d')]
+            changes[database.SHEET_VARIANCE] = (pd.concat([history, report], ignore_index=True), 'overwrite')
+        database.save_dataframes(changes)
+    return report, problems
+
+def waste_trend(start=None, end=None):
+    """Returns the variance per ingredient per month for the reconciliations dated in [start, end).
+
+    Only those months of Stock_Variance are loaded (see database.load_sheet_range).
+    """
+    history = database.load_sheet_range(database.SHEET_VARIANCE, start, end)
+    if history.empty:
+        return pd.DataFrame(columns=TREND_COLUMNS)
+    months = pd.to_datetime(history['Date'].astype(str).str[:10]).dt.strftime('%Y-%m')
+    trend = history.assign(Month=months).groupby(['Month', 'Ingredient Name'], as_index=False).agg(**{
+        'Days Counted': ('Date', 'nunique'),
+        'Theoretical Usage (g/ml)': ('Theoretical Usage (g/ml)', 'sum'),
+        'Actual Usage (g/ml)': ('Actual Usage (g/ml)', 'sum'),
+        'Variance (g/ml)': ('Variance (g/ml)', 'sum'),
+        'Variance Cost (₱)': ('Variance Cost (₱)', 'sum'),
+    })
+    theoretical = trend['Theoretical Usage (g/ml)'].where(trend['Theoretical Usage (g/ml)'] > 0)
+    trend['Variance (%)'] = (trend['Variance (g/ml)'] / theoretical * 100).round(2)
+    trend = trend[TREND_COLUMNS].sort_values(['Month', 'Variance Cost (₱)'], ascending=[True, False], ignore_index=True)
+    return trend
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="End-of-day stock reconciliation and waste trends")
+    parser.add_argument('source', help="physical count sheet (.csv or .xlsx with Ingredient Name, Counted Stock (g/ml)), or 'trend'")
+    parser.add_argument('--date', help="day the count closes (default today)")
+    parser.add_argument('--dry-run', action='store_true', help="show the report without saving it or adjusting the stock")
+    parser.add_argument('--months', type=int, default=TREND_MONTHS, help="months of history for 'trend'")
+    args = parser.parse_args()
+
+    if args.source == 'trend':
+        start = (pd.Timestamp.now().normalize() - pd.DateOffset(months=args.months - 1)).replace(day=1)
+        trend = waste_trend(start)
+        print(f"## 🗑️ Stock Variance by Month since {start:%Y-%m} 🗑️")
+        print(trend.to_string(index=False) if not trend.empty else "No reconciliations recorded yet.")
+    else:
+        try:
+            counts = read_count_file(args.source)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {args.source}: {e}")
+        else:
+            report, problems = reconcile(counts, args.date, save=not args.dry_run)
+            for problem in problems:
+                print(f"  Warning: {problem}")
+            print(f"## 🧮 Stock Reconciliation {pd.Timestamp(args.date or pd.Timestamp.now()):%Y-%m-%d} 🧮")
+            if report.empty:
+                print("Nothing to reconcile.")
+            else:
+                print(report.drop(columns='Date').to_string(index=False))
+                print(f"Total variance cost: {database.CURRENCY}{report['Variance Cost (₱)'].sum():.2f}")
+                if not args.dry_run:
+                    print("✅ Saved to Stock_Variance; counted stock is now the inventory's Current Stock.")
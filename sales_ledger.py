@@ -0,0 +1,213 @@
+# sales_ledger.py
+import json
+import os
+import pandas as pd
+import analytics
+import database
+import file_lock
+import snapshot
+
+JOURNAL_FILE = "coffeeshop_sales.jsonl"
+COMPACT_EVERY = 200  # Fold the journal into storage after this many sales
+
+SALES_COLUMNS = ['SaleID', 'Date', 'Total Sale (₱)', 'Customer/Table', 'Items Count']
+ITEM_COLUMNS = ['SaleID', 'Date', 'Menu Item Name', 'Size/Container', 'Price']
+
+class SalesLedger:
+    """Append-only sales journal with periodic compaction into the storage backend.
+
+    Each sale is one JSON line, flushed and fsync'd before record_sale returns,
+    so logging a sale costs O(1) no matter how much history exists. compact()
+    folds the journal into the Daily_Sales/Sales_Items sheets; read_sales()
+    replays the journal on top of the compacted data. Callables in `listeners`
+    are given every batch of records once it is on disk.
+    """
+
+    def __init__(self, path=None, compact_every=COMPACT_EVERY):
+        self.path = path or JOURNAL_FILE
+        self.compacting_path = self.path + '.compacting'
+        self.compact_every = compact_every
+        # Appending and moving the journal aside, and a whole compaction, each
+        # hold a lock shared with the other terminals (see file_lock.py)
+        self._lock = file_lock.lock_for(self.path + '.lock')
+        self._compact_lock = file_lock.lock_for(self.path + '.compact.lock')
+        self._pending = len(self._read_journal(self.path))
+        self.listeners = []
+
+    # --- Writing ---
+
+    def record_sale(self, sale_id, date, customer, items):
+        """Appends one sale to the journal and returns the journal record.
+
+        `items` is a list of dicts with 'Menu Item Name', 'Size/Container' and 'Price'.
+        """
+        record = self.build_record(sale_id, date, customer, items)
+        self.append_records([record])
+        return record
+
+    @staticmethod
+    def build_record(sale_id, date, customer, items):
+        """Builds the journal record of one sale without writing it."""
+        return {
+            'SaleID': sale_id,
+            'Date': date,
+            'Total Sale (₱)': float(sum(item['Price'] for item in items)),
+            'Customer/Table': customer,
+            'Items Count': len(items),
+            'Items': [
+                {
+                    'Menu Item Name': item['Menu Item Name'],
+                    'Size/Container': item['Size/Container'],
+                    'Price': float(item['Price']),
+                }
+                for item in items
+            ],
+        }
+
+    def append_records(self, records):
+        """Writes journal records with a single flush and fsync."""
+        if not records:
+            return
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+        with self._lock:
+            with open(self.path, 'ab') as journal:
+                journal.write(data)
+                journal.flush()
+                os.fsync(journal.fileno())
+            self._pending += len(records)
+            needs_compaction = self.compact_every and self._pending >= self.compact_every
+        for listener in self.listeners:
+            listener(records)
+        if needs_compaction:
+            self.compact()
+
+    # --- Reading ---
+
+    @staticmethod
+    def _read_journal(path):
+        """Returns the complete records of a journal file.
+
+        A torn last line (crash mid-write) is ignored.
+        """
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path, 'rb') as journal:
+            for line in journal:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+        return records
+
+    def pending_records(self):
+        """Returns the journal records that have not been compacted yet."""
+        with self._lock:
+            return self._read_journal(self.compacting_path) + self._read_journal(self.path)
+
+    @staticmethod
+    def _to_frames(records):
+        sales = pd.DataFrame([{col: record[col] for col in SALES_COLUMNS} for record in records], columns=SALES_COLUMNS)
+        items = pd.DataFrame([
+            {'SaleID': record['SaleID'], 'Date': record['Date'], **item}
+            for record in records for item in record['Items']
+        ], columns=ITEM_COLUMNS)
+        return sales, items
+
+    def read_sales(self, include_items=False, start=None, end=None):
+        """Returns all sales: compacted rows plus the journal replayed on top.
+
+        With include_items=True returns (sales, items) where items has one row
+        per menu item sold. `start`/`end` keep only the sales dated in
+        [start, end), and only that period is loaded from storage.
+        """
+        records = self.pending_records()
+        journal_sales, journal_items = self._to_frames(records)
+
+        sales = self._combine(self._load(database.SHEET_SALES, start, end),
+                              snapshot.filter_dates(journal_sales, 'Date', start, end))
+        if not include_items:
+            return sales
+        items = self._combine(self._load(database.SHEET_SALES_ITEMS, start, end),
+                              snapshot.filter_dates(journal_items, 'Date', start, end))
+        return sales, items
+
+    @staticmethod
+    def _load(sheet_name, start, end):
+        if start is None and end is None:
+            return database.load_sheet(sheet_name)
+        return database.load_sheet_range(sheet_name, start, end)
+
+    @staticmethod
+    def _combine(compacted, journal):
+        if compacted.empty:
+            return journal
+        if journal.empty:
+            return compacted
+        # A sale may be in both if a compaction was interrupted
+        journal = journal[~journal['SaleID'].isin(compacted['SaleID'])]
+        return pd.concat([compacted, journal], ignore_index=True)
+
+    # --- Compaction ---
+
+    @staticmethod
+    def _unsaved(df, sheet_name):
+        """Drops the rows whose SaleID is already stored in the sheet."""
+        stored = database.load_sheet(sheet_name, copy=False)
+        if stored.empty or 'SaleID' not in stored.columns:
+            return df
+        return df[~df['SaleID'].isin(stored['SaleID'])]
+
+    def compact(self):
+        """Folds the journal into the sales sheets and starts a fresh journal.
+
+        The journal is first renamed aside, so new sales can keep being logged.
+        Sales that are already in storage (from an interrupted compaction) are
+        skipped, which makes it safe to re-run after a crash. The new items are
+        also added to the Sales_Rollups sheet in the same save, so the rollups
+        always match the stored sales.
+
+        Only one compaction runs at a time, across threads and processes, so
+        two of them never save the same sales or remove each other's file.
+        """
+        with self._compact_lock:
+            with self._lock:
+                if os.path.exists(self.path) and not os.path.exists(self.compacting_path):
+                    os.replace(self.path, self.compacting_path)
+                    self._pending = 0
+
+            records = self._read_journal(self.compacting_path)
+            if records:
+                sales, items = self._to_frames(records)
+                sales = self._unsaved(sales, database.SHEET_SALES)
+                items = self._unsaved(items, database.SHEET_SALES_ITEMS)
+                changes = {}
+                if not items.empty:
+                    rollups = analytics.merge_rollups(
+                        database.load_sheet(database.SHEET_ROLLUPS, copy=False),
+                        analytics.rollup_items(items),
+                    )
+                    changes[database.SHEET_SALES_ITEMS] = (items, 'append')
+                    changes[database.SHEET_ROLLUPS] = (rollups, 'overwrite')
+                if not sales.empty:
+                    changes[database.SHEET_SALES] = (sales, 'append')
+                if changes:
+                    database.save_dataframes(changes)
+
+            with self._lock:
+                if os.path.exists(self.compacting_path):
+                    os.remove(self.compacting_path)
+            return len(records)
+
+if __name__ == "__main__":
+    import sys
+
+    ledger = SalesLedger()
+    if len(sys.argv) > 1 and sys.argv[1] == 'compact':
+        print(f"✅ Compacted {ledger.compact()} sale(s) into the database.")
+    else:
+        df_sales = ledger.read_sales()
+        print(f"{len(df_sales)} sale(s) recorded, {len(ledger.pending_records())} waiting in the journal.")
+        print("Usage: python sales_ledger.py compact")
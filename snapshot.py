@@ -0,0 +1,294 @@
+# snapshot.py
+"""Columnar snapshot of the workbook, kept next to the xlsx.
+
+Parsing the zipped XML of an xlsx is the slowest way to read it back. Every
+checkpoint therefore also saves each sheet as one .npy file per column, which
+np.load memory-maps, and a manifest that records which workbook (mtime and
+size) the snapshot matches. The Excel backend loads the snapshot when it
+matches and re-parses the xlsx (then rewrites the snapshot) when it does not.
+
+Dated sheets are split into one partition per month of their Date column, so
+a report for one week only maps the partitions that week falls in. Each
+partition keeps the row positions of its rows, and a partition whose content
+did not change is reused instead of written again.
+
+    coffeeshop_database.xlsx.snapshot/
+        manifest.json
+        Daily_Sales-2024-05-1a2b3c4d/   c0.npy, c0.mask.npy, ..., rows.npy
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+import weakref
+import numpy as np
+import pandas as pd
+
+MANIFEST = 'manifest.json'
+VERSION = 1
+_MONTH = re.compile(r'^\d{4}-\d{2}$')
+
+# Frames written by this process, to skip re-hashing sheets that did not change
+_written = {}  # (snapshot dir, sheet name) -> (weakref to the DataFrame, its manifest entry)
+
+# --- Columns ---
+
+def _column_kind(series):
+    """Returns how a column is stored: 'array', 'text' or 'json'."""
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        return 'array'
+    values = series.dropna()
+    if values.map(type).eq(str).all():
+        return 'text'
+    return 'json'
+
+def _save_column(directory, i, series):
+    kind = _column_kind(series)
+    if kind == 'array':
+        np.save(os.path.join(directory, f'c{i}.npy'), series.to_numpy())
+    elif kind == 'text':
+        mask = series.isna().to_numpy()
+        np.save(os.path.join(directory, f'c{i}.npy'), series.fillna('').astype(str).to_numpy(dtype=str))
+        np.save(os.path.join(directory, f'c{i}.mask.npy'), mask)
+    else:
+        values = [
+            None if pd.isna(v) else v.item() if isinstance(v, np.generic) else v if isinstance(v, (str, int, float, bool)) else str(v)
+            for v in series.tolist()
+        ]
+        with open(os.path.join(directory, f'c{i}.json'), 'w', encoding='utf-8') as f:
+            json.dump(values, f, ensure_ascii=False)
+    return kind
+
+def _load_column(directory, i, kind, dtype):
+    if kind == 'array':
+        return pd.Series(np.load(os.path.join(directory, f'c{i}.npy'), mmap_mode='r'), dtype=dtype, copy=False)
+    if kind == 'text':
+        values = np.load(os.path.join(directory, f'c{i}.npy'), mmap_mode='r').astype(object)
+        values[np.load(os.path.join(directory, f'c{i}.mask.npy'))] = np.nan
+        return pd.Series(values, dtype=dtype)
+    with open(os.path.join(directory, f'c{i}.json'), encoding='utf-8') as f:
+        return pd.Series(json.load(f), dtype=object)
+
+def like_excel(df):
+    """Returns `df` as pd.read_excel reads it back from the workbook.
+
+    Trailing blank rows (e.g. the menu's last separator row) are dropped,
+    whole-number float columns without blanks become int64, columns without
+    values float64 and text columns 'str', like the types read_excel infers
+    from the cells. A frame with no rows gets object columns. Returns `df`
+    itself when nothing changes.
+    """
+    blank = df.isna().all(axis=1).to_numpy()
+    if len(blank) and blank[-1]:
+        filled = np.flatnonzero(~blank)
+        df = df.iloc[:filled[-1] + 1 if len(filled) else 0]
+    if not len(df):
+        return df.astype(object) if any(dtype != object for dtype in df.dtypes) else df
+
+    converted = {}
+    for i in range(len(df.columns)):
+        series = df.iloc[:, i]
+        values = series.dropna()
+        if values.empty:
+            dtype = 'float64'
+        elif series.dtype.kind == 'f' or series.dtype == object and values.map(type).isin((int, float)).all():
+            numbers = values.to_numpy(dtype=float)
+            whole = len(values) == len(series) and np.all(numbers % 1 == 0) and np.all(np.abs(numbers) < 2**63)
+            dtype = 'int64' if whole else 'float64'
+        elif series.dtype == object and values.map(type).eq(str).all():
+            dtype = 'str'
+        elif series.dtype.kind == 'M' and series.dt.tz is None:
+            dtype = 'datetime64[us]'
+        else:
+            continue
+        if series.dtype != dtype:
+            converted[i] = series.astype(dtype)
+    if converted:
+        df = df.copy(deep=False)
+        for i, series in converted.items():
+            df.isetitem(i, series)
+    return df
+
+# --- Partitions ---
+
+def partition_keys(dates):
+    """Returns the 'YYYY-MM' partition of every date ('' when it has none)."""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        keys = dates.dt.strftime('%Y-%m')
+    else:
+        keys = dates.astype(str).str[:7]
+    return keys.where(keys.str.match(_MONTH), '').fillna('')
+
+def _range_keys(start, end):
+    """Returns the partitions a [start, end) date range can touch, or None for all of them."""
+    if start is None or end is None:
+        return None
+    months = pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq='M')
+    return {str(month) for month in months} | {''}
+
+def filter_dates(df, column, start=None, end=None):
+    """Returns the rows of `df` whose `column` date is in [start, end), renumbered from 0."""
+    if df.empty or column not in df.columns or (start is None and end is None):
+        return df.reset_index(drop=True)
+    dates = pd.to_datetime(df[column], errors='coerce')
+    keep = pd.Series(True, index=df.index)
+    if start is not None:
+        keep &= dates >= pd.Timestamp(start)
+    if end is not None:
+        keep &= dates < pd.Timestamp(end)
+    return df[keep.to_numpy()].reset_index(drop=True)
+
+def _digest(part):
+    """Fingerprint of a partition's values, row positions, columns and dtypes."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(str(col), str(part[col].dtype)) for col in part.columns]).encode('utf-8'))
+    if len(part) and len(part.columns):
+        digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    else:
+        digest.update(np.asarray(part.index, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+def _write_partition(root, sheet_name, key, part):
+    name = re.sub(r'[^\w-]', '_', f'{sheet_name}-{key}' if key else sheet_name) + '-' + uuid.uuid4().hex[:8]
+    directory = os.path.join(root, name)
+    os.makedirs(directory)
+    kinds = [_save_column(directory, i, part.iloc[:, i]) for i in range(len(part.columns))]
+    np.save(os.path.join(directory, 'rows.npy'), np.asarray(part.index, dtype=np.int64))
+    return name, kinds
+
+# --- Manifest ---
+
+def _read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == VERSION else None
+
+def _is_fresh(manifest, workbook_signature):
+    return manifest is not None and manifest.get('workbook') == list(workbook_signature)
+
+# --- Writing ---
+
+def write(root, frames, workbook_signature, partition_by=None):
+    """Saves {sheet name: DataFrame} as the snapshot of the workbook with `workbook_signature`.
+
+    `partition_by` maps dated sheets to their date column. Sheets are stored
+    as read_excel would read them (see like_excel), so the snapshot and the
+    xlsx load the same frames. Partitions that are unchanged since the last
+    snapshot are reused; the manifest is replaced atomically and unused
+    partitions are removed afterwards.
+    """
+    partition_by = partition_by or {}
+    os.makedirs(root, exist_ok=True)
+    previous = _read_manifest(root) or {'sheets': {}}
+    sheets = {}
+    for sheet_name, df in frames.items():
+        before = previous['sheets'].get(sheet_name)
+        written, entry = _written.get((root, sheet_name), (None, None))
+        if before is not None and before == entry and written() is df:
+            sheets[sheet_name] = before
+            continue
+
+        df = like_excel(df.reset_index(drop=True))
+        columns = [str(col) for col in df.columns]
+        dtypes = [str(df[col].dtype) for col in df.columns]
+        date_column = partition_by.get(sheet_name)
+        if date_column in df.columns and len(df):
+            parts = dict(list(df.groupby(partition_keys(df[date_column]).to_numpy(), sort=True)))
+        else:
+            date_column = None
+            parts = {'': df}
+
+        old_parts = before['partitions'] if before and before['columns'] == columns and before['dtypes'] == dtypes else {}
+        partitions = {}
+        for key, part in parts.items():
+            digest = _digest(part)
+            old = old_parts.get(key)
+            if old and old['digest'] == digest and os.path.isdir(os.path.join(root, old['dir'])):
+                partitions[key] = old
+                continue
+            directory, kinds = _write_partition(root, sheet_name, key, part)
+            partitions[key] = {'dir': directory, 'rows': len(part), 'digest': digest, 'kinds': kinds}
+        sheets[sheet_name] = {
+            'columns': columns,
+            'dtypes': dtypes,
+            'rows': len(df),
+            'partition_by': date_column,
+            'partitions': partitions,
+        }
+        _written[(root, sheet_name)] = (weakref.ref(frames[sheet_name]), sheets[sheet_name])
+
+    manifest = {'version': VERSION, 'workbook': list(workbook_signature), 'sheets': sheets}
+    tmp_path = os.path.join(root, f'{MANIFEST}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, MANIFEST))
+
+    used = {part['dir'] for sheet in sheets.values() for part in sheet['partitions'].values()}
+    for name in os.listdir(root):
+        if name not in used and os.path.isdir(os.path.join(root, name)):
+            # A partition still memory-mapped elsewhere cannot be removed on Windows; retried next time
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+# --- Reading ---
+
+def _load_sheet(root, entry, keys=None):
+    """Builds a sheet from its partitions (only those in `keys`, if given)."""
+    parts = []
+    for key, part in entry['partitions'].items():
+        if keys is not None and key not in keys:
+            continue
+        directory = os.path.join(root, part['dir'])
+        columns = [
+            _load_column(directory, i, kind, dtype)
+            for i, (kind, dtype) in enumerate(zip(part['kinds'], entry['dtypes']))
+        ]
+        rows = np.load(os.path.join(directory, 'rows.npy'))
+        frame = pd.DataFrame(dict(enumerate(columns)), copy=False) if columns else pd.DataFrame(index=range(len(rows)))
+        frame.index = rows
+        parts.append(frame)
+
+    if not parts:
+        return pd.DataFrame(columns=entry['columns']).astype(dict(zip(entry['columns'], entry['dtypes'])))
+    # A single partition is used as is, so its numeric columns stay memory-mapped;
+    # several partitions are copied into one frame
+    df = parts[0] if len(parts) == 1 else pd.concat(parts)
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    df.columns = entry['columns']
+    return df.reset_index(drop=True)
+
+def load(root, workbook_signature):
+    """Returns every sheet of the snapshot, or None if it does not match the workbook."""
+    manifest = _read_manifest(root)
+    if not _is_fresh(manifest, workbook_signature):
+        return None
+    try:
+        return {name: _load_sheet(root, entry) for name, entry in manifest['sheets'].items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def load_range(root, workbook_signature, sheet_name, start=None, end=None):
+    """Returns the rows of a dated sheet in [start, end), mapping only the partitions they fall in.
+
+    Returns None if the snapshot does not match the workbook, and an empty
+    frame if the sheet is not in it.
+    """
+    manifest = _read_manifest(root)
+    if not _is_fresh(manifest, workbook_signature):
+        return None
+    entry = manifest['sheets'].get(sheet_name)
+    if entry is None:
+        return pd.DataFrame()
+    try:
+        df = _load_sheet(root, entry, _range_keys(start, end) if entry['partition_by'] else None)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return filter_dates(df, entry['partition_by'], start, end)
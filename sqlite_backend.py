@@ -0,0 +1,308 @@
+# sqlite_backend.py
+import sqlite3
+import threading
+import pandas as pd
+import database
+import metrics
+import snapshot
+
+# Indexes for the sheets the app looks up by key
+SHEET_INDEXES = {
+    database.SHEET_INVENTORY: [('Ingredient Name',)],
+    database.SHEET_MENU: [('Menu Item Name', 'Size/Container'), ('Ingredient Name',)],
+    database.SHEET_SALES: [('Date',), ('SaleID',)],
+    database.SHEET_SALES_ITEMS: [('Date',), ('SaleID',)],
+    database.SHEET_ROLLUPS: [('Date', 'Hour')],
+    database.SHEET_LOTS: [('Ingredient Name',)],
+    database.SHEET_VARIANCE: [('Date', 'Ingredient Name')],
+}
+
+STOCK_COLUMN = 'Current Stock (g/ml)'
+# Every table has this INTEGER PRIMARY KEY, which orders its rows; unlike a bare
+# rowid it survives VACUUM. It is not part of the frames load_sheet() returns.
+ROW_COLUMN = '_row'
+VARIABLE_LIMIT = 500  # Names bound to one IN (...) list; SQLite caps an SQL statement's variables
+
+def _quote(identifier):
+    """Quotes a sheet or column name for use as an SQL identifier."""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+def _column_type(dtype):
+    """Maps a pandas dtype to an SQLite column affinity."""
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    # Untyped columns keep text and numbers exactly as they were given
+    return ''
+
+def _rows(df):
+    """Converts a DataFrame into plain Python tuples, with NaN as NULL."""
+    values = df.astype(object).where(df.notna(), None)
+    for col in values.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            values[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S').where(df[col].notna(), None)
+    return [
+        tuple(v.item() if hasattr(v, 'item') else v for v in row)
+        for row in values.itertuples(index=False, name=None)
+    ]
+
+def _date_bound(value):
+    """Formats a date bound to compare with the stored 'YYYY-MM-DD HH:MM:SS' text.
+
+    A bound at midnight is written as the bare date, which sorts before every
+    time of that day, so it also works for date-only columns.
+    """
+    value = pd.Timestamp(value)
+    return value.strftime('%Y-%m-%d') if value == value.normalize() else value.strftime('%Y-%m-%d %H:%M:%S')
+
+class SQLiteBackend:
+    """Storage backend that keeps each sheet as an indexed SQLite table.
+
+    Inventory deductions are row-level UPDATEs and appends are INSERTs, so
+    neither depends on how much sales history is stored. Tables written
+    before ROW_COLUMN existed get it, in their rowid order, when opened.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._lock = threading.RLock()
+        # Read cache; cleared on our own writes and when another connection commits
+        self._frames = {}
+        self._data_version = None
+        self._add_row_columns()
+
+    def close(self):
+        self.conn.close()
+
+    def _table_exists(self, sheet_name):
+        row = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (sheet_name,)
+        ).fetchone()
+        return row is not None
+
+    def _columns(self, sheet_name):
+        return [row[1] for row in self.conn.execute(f'PRAGMA table_info({_quote(sheet_name)})')]
+
+    def _add_row_columns(self):
+        """Rebuilds the tables that have no ROW_COLUMN yet, numbering their rows in rowid order."""
+        for sheet_name in self.sheet_names():
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                info = self.conn.execute(f'PRAGMA table_info({_quote(sheet_name)})').fetchall()
+                if any(name == ROW_COLUMN for _, name, *_ in info):
+                    self.conn.execute('COMMIT')
+                    continue
+                column_defs = ''.join(f', {_quote(name)} {col_type}'.rstrip() for _, name, col_type, *_ in info)
+                columns = ''.join(f', {_quote(name)}' for _, name, *_ in info)
+                rebuilt = _quote(f'{sheet_name}__rows')
+                self.conn.execute(f'CREATE TABLE {rebuilt} ({_quote(ROW_COLUMN)} INTEGER PRIMARY KEY{column_defs})')
+                self.conn.execute(
+                    f'INSERT INTO {rebuilt} ({_quote(ROW_COLUMN)}{columns}) '
+                    f'SELECT rowid{columns} FROM {_quote(sheet_name)} ORDER BY rowid'
+                )
+                self.conn.execute(f'DROP TABLE {_quote(sheet_name)}')
+                self.conn.execute(f'ALTER TABLE {rebuilt} RENAME TO {_quote(sheet_name)}')
+                self._create_indexes(sheet_name, [name for _, name, *_ in info])
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def _read(self, sheet_name, where='', params=()):
+        """Reads a table's rows in ROW_COLUMN order, without that column."""
+        with metrics.timer('sqlite.read', self.path) as timed:
+            df = pd.read_sql_query(
+                f'SELECT * FROM {_quote(sheet_name)}{where} ORDER BY {_quote(ROW_COLUMN)}', self.conn, params=params
+            )
+            timed.rows = len(df)
+        return df.drop(columns=ROW_COLUMN)
+
+    def _check_external_writes(self):
+        data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != self._data_version:
+            self._frames.clear()
+            self._data_version = data_version
+
+    def load_sheet(self, sheet_name):
+        """Returns a sheet as a DataFrame (shared, do not modify)."""
+        with self._lock:
+            self._check_external_writes()
+            if sheet_name not in self._frames:
+                if not self._table_exists(sheet_name):
+                    return pd.DataFrame()
+                self._frames[sheet_name] = self._read(sheet_name)
+            return self._frames[sheet_name]
+
+    def load_range(self, sheet_name, start=None, end=None):
+        """Returns the rows of a dated sheet in [start, end), selected through the Date index."""
+        column = database.DATED_SHEETS.get(sheet_name, 'Date')
+        with self._lock:
+            self._check_external_writes()
+            if sheet_name in self._frames:
+                df = self._frames[sheet_name]
+            elif not self._table_exists(sheet_name):
+                return pd.DataFrame()
+            else:
+                conditions, params = [], []
+                if start is not None:
+                    conditions.append(f'{_quote(column)} >= ?')
+                    params.append(_date_bound(start))
+                if end is not None:
+                    conditions.append(f'{_quote(column)} < ?')
+                    params.append(_date_bound(end))
+                where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+                df = self._read(sheet_name, where, params)
+        return snapshot.filter_dates(df, column, start, end)
+
+    def sheet_names(self):
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY rowid"
+            )]
+
+    def _insert(self, df, sheet_name):
+        if df.empty:
+            return
+        columns = ', '.join(_quote(col) for col in df.columns)
+        placeholders = ', '.join('?' for _ in df.columns)
+        self.conn.executemany(
+            f'INSERT INTO {_quote(sheet_name)} ({columns}) VALUES ({placeholders})', _rows(df)
+        )
+
+    def _create_indexes(self, sheet_name, columns):
+        for i, index_columns in enumerate(SHEET_INDEXES.get(sheet_name, [])):
+            if all(col in columns for col in index_columns):
+                self.conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS {_quote(f"idx_{sheet_name}_{i}")} '
+                    f'ON {_quote(sheet_name)} ({", ".join(_quote(col) for col in index_columns)})'
+                )
+
+    def _replace_table(self, df, sheet_name):
+        self.conn.execute(f'DROP TABLE IF EXISTS {_quote(sheet_name)}')
+        if len(df.columns):
+            column_defs = ''.join(
+                f', {_quote(col)} {_column_type(df[col].dtype)}'.rstrip() for col in df.columns
+            )
+            self.conn.execute(f'CREATE TABLE {_quote(sheet_name)} ({_quote(ROW_COLUMN)} INTEGER PRIMARY KEY{column_defs})')
+            self._create_indexes(sheet_name, list(df.columns))
+            self._insert(df, sheet_name)
+
+    def _append_table(self, df, sheet_name):
+        if not self._table_exists(sheet_name):
+            return self._replace_table(df, sheet_name)
+        existing_columns = self._columns(sheet_name)
+        for col in df.columns:
+            if col not in existing_columns:
+                self.conn.execute(
+                    f'ALTER TABLE {_quote(sheet_name)} ADD COLUMN {_quote(col)} {_column_type(df[col].dtype)}'.rstrip()
+                )
+        self._insert(df, sheet_name)
+
+    def save_many(self, changes):
+        """Applies {sheet_name: (df, 'append' or 'overwrite')} in one transaction."""
+        with self._lock, metrics.timer('sqlite.write', self.path) as timed:
+            timed.rows = sum(len(df) for df, _ in changes.values())
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                for sheet_name, (df, mode) in changes.items():
+                    if mode == 'append':
+                        self._append_table(df, sheet_name)
+                    else:
+                        self._replace_table(df, sheet_name)
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            finally:
+                for sheet_name in changes:
+                    self._frames.pop(sheet_name, None)
+        return {sheet_name: df for sheet_name, (df, mode) in changes.items()}
+
+    def save_sheet(self, df, sheet_name):
+        """Replaces a whole table with the DataFrame in one transaction."""
+        self.save_many({sheet_name: (df, 'overwrite')})
+        return df
+
+    def append_rows(self, df, sheet_name):
+        """Inserts new rows, adding any columns the table does not have yet."""
+        self.save_many({sheet_name: (df, 'append')})
+        return df
+
+    def update_rows(self, updates, sheet_name):
+        """Sets the given cells with one UPDATE per row.
+
+        `updates` is indexed by row position in load_sheet() order, which is
+        ROW_COLUMN order; positions are looked up as ROW_COLUMN values, so they
+        stay right after rows were deleted or the file was vacuumed.
+        """
+        assignments = ', '.join(f'{_quote(col)} = ?' for col in updates.columns)
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row_ids = [row_id for row_id, in self.conn.execute(
+                    f'SELECT {_quote(ROW_COLUMN)} FROM {_quote(sheet_name)} ORDER BY {_quote(ROW_COLUMN)}'
+                )]
+                self.conn.executemany(
+                    f'UPDATE {_quote(sheet_name)} SET {assignments} WHERE {_quote(ROW_COLUMN)} = ?',
+                    [row + (row_ids[int(position)],) for row, position in zip(_rows(updates), updates.index)]
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            # Patch the cached frame instead of re-reading the table
+            cached = self._frames.pop(sheet_name, None)
+            if cached is not None:
+                cached = cached.copy()
+                cached.loc[updates.index, updates.columns] = updates
+                self._frames[sheet_name] = cached
+            return cached
+
+    def deduct_stock(self, needs):
+        """Deducts {ingredient: qty} from Current Stock with row-level UPDATEs.
+
+        Like ExcelBackend.deduct_stock, an ingredient on several rows is
+        deducted from its first row only, and (shortfalls, missing) is
+        returned. Names are looked up VARIABLE_LIMIT at a time.
+        """
+        table = _quote(database.SHEET_INVENTORY)
+        with self._lock:
+            if not self._table_exists(database.SHEET_INVENTORY):
+                print("Inventory is empty. Cannot deduct stock.")
+                return {}, list(needs)
+
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                names = list(needs)
+                first_rows = {}  # name -> (ROW_COLUMN value, current stock) of its first row
+                # With a lone MIN(), SQLite takes the other columns from the row holding the minimum
+                for start in range(0, len(names), VARIABLE_LIMIT):
+                    chunk = names[start:start + VARIABLE_LIMIT]
+                    for name, row_id, current in self.conn.execute(
+                        f'SELECT "Ingredient Name", MIN({_quote(ROW_COLUMN)}), {_quote(STOCK_COLUMN)} FROM {table} '
+                        f'WHERE "Ingredient Name" IN ({", ".join("?" * len(chunk))}) GROUP BY "Ingredient Name"', chunk
+                    ):
+                        first_rows[name] = (row_id, current)
+                short_by_name = {name: max(0, needs[name] - (current or 0)) for name, (_, current) in first_rows.items()}
+
+                self.conn.executemany(
+                    f'UPDATE {table} SET {_quote(STOCK_COLUMN)} = MAX(0, COALESCE({_quote(STOCK_COLUMN)}, 0) - ?) '
+                    f'WHERE {_quote(ROW_COLUMN)} = ?',
+                    [(needs[name], row_id) for name, (row_id, _) in first_rows.items()]
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            finally:
+                self._frames.pop(database.SHEET_INVENTORY, None)
+
+        shortfalls = {name: short for name, short in short_by_name.items() if short > 0}
+        missing = [name for name in needs if name not in short_by_name]
+        return shortfalls, missing
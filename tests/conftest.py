@@ -0,0 +1,69 @@
+# conftest.py
+import os
+import sys
+import uuid
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import costing_app
+import database
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    """Points the Excel backend at a new workbook in tmp_path; returns its path.
+
+    The background checkpointer is not started, so a test decides when the
+    log is checkpointed. Files the apps keep in the working directory (the
+    sales journal, the order queue) go to tmp_path as well.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, 'DB_FILE', str(tmp_path / 'coffeeshop_database.xlsx'))
+    monkeypatch.setattr(database, '_backend', database.ExcelBackend())
+    monkeypatch.setattr(database, '_start_checkpointer', lambda: None)
+    database.invalidate_cache()
+    yield database.DB_FILE
+    database.invalidate_cache()
+
+# Ingredient -> (unit, Cost/Unit, Current Stock)
+INVENTORY = {
+    'Espresso Beans': ('g', 0.80, 1000.0),
+    'Milk': ('ml', 0.10, 3000.0),
+    'Water': ('ml', 0.0, 10000.0),
+}
+# (menu item, size) -> [(ingredient, needed quantity), ...]
+RECIPES = {
+    ('Latte', '12oz'): [('Espresso Beans', 18.0), ('Milk', 200.0)],
+    ('Americano', '12oz'): [('Espresso Beans', 18.0), ('Water', 250.0)],
+}
+
+def make_inventory(inventory=INVENTORY):
+    return pd.DataFrame([
+        {'Ingredient Name': name, 'Unit (g/ml)': unit, 'Cost/Unit': cost, 'Current Stock (g/ml)': stock}
+        for name, (unit, cost, stock) in inventory.items()
+    ])
+
+def make_menu(recipes=RECIPES, inventory=INVENTORY):
+    lines = pd.DataFrame([
+        {'Menu Item Name': item, 'Size/Container': size, 'Profit Target (%)': 50.0, 'Other Variable Costs (₱)': 0.0,
+         'Ingredient Name': name, 'Unit (g/ml)': inventory[name][0], 'Cost/Unit (₱)': inventory[name][1],
+         'Needed Quantity (g/ml)': qty, 'MenuIngredientID': str(uuid.uuid4())}
+        for (item, size), lines in recipes.items() for name, qty in lines
+    ])
+    lines = costing_app.cost_menu_lines(lines).reindex(columns=costing_app.MENU_COLUMNS)
+    return costing_app.with_separators(lines)
+
+@pytest.fixture
+def shop(workbook):
+    """A workbook holding the INVENTORY and the menu of RECIPES."""
+    database.save_dataframes({
+        database.SHEET_INVENTORY: (make_inventory(), 'overwrite'),
+        database.SHEET_MENU: (make_menu(), 'overwrite'),
+    })
+    return workbook
+
+def stock():
+    """Returns {ingredient: Current Stock} as stored."""
+    df = database.load_sheet(database.SHEET_INVENTORY)
+    return dict(zip(df['Ingredient Name'], df['Current Stock (g/ml)']))
@@ -0,0 +1,113 @@
+# test_cost_layers.py
+import pandas as pd
+import pytest
+import cost_layers
+import database
+import inventory_manager
+
+def test_lot_queue_consumes_oldest_lots_first():
+    queue = cost_layers.LotQueue()
+    queue.push(100, 0.10)
+    queue.push(100, 0.20)
+    queue.push(100, 0.30)
+    cost, uncovered = queue.consume(150)
+    assert cost == pytest.approx(100 * 0.10 + 50 * 0.20)
+    assert uncovered == 0
+    assert queue.on_hand() == pytest.approx(150)
+    assert queue.value() == pytest.approx(50 * 0.20 + 100 * 0.30)
+
+    cost, uncovered = queue.consume(200)
+    assert cost == pytest.approx(50 * 0.20 + 100 * 0.30)
+    assert uncovered == pytest.approx(50)
+    assert queue.on_hand() == 0
+    assert queue.last_cost() == pytest.approx(0.30)
+
+def test_lot_queue_keeps_its_lots_when_the_arrays_fill_up():
+    queue = cost_layers.LotQueue(capacity=2)
+    for i in range(1, 11):
+        queue.push(10, float(i))
+        if i % 3 == 0:
+            queue.consume(10)
+    # Lots 1, 2 and 3 were used up, oldest first
+    assert queue.tail - queue.head == 7
+    assert queue.on_hand() == pytest.approx(70)
+    assert queue.value() == pytest.approx(10 * sum(range(4, 11)))
+    assert queue.consume(15) == (pytest.approx(10 * 4 + 5 * 5), 0)
+
+def _inventory(rows):
+    return pd.DataFrame(rows, columns=['Ingredient Name', 'Cost/Unit', 'Current Stock (g/ml)'])
+
+def test_load_consumes_what_left_the_stock_oldest_first(workbook):
+    lots = pd.DataFrame([
+        ['Milk', '2024-05-01 08:00:00', 500.0, 0.10],
+        ['Milk', '2024-05-08 08:00:00', 500.0, 0.12],
+    ], columns=cost_layers.LOT_COLUMNS)
+    database.save_dataframes({
+        database.SHEET_INVENTORY: (_inventory([['Milk', 0.12, 700.0], ['Beans', 0.50, 800.0]]), 'overwrite'),
+        database.SHEET_LOTS: (lots, 'overwrite'),
+    })
+
+    layers = cost_layers.CostLayers.load(cost_layers.POLICY_FIFO)
+    valuation = layers.valuation().set_index('Ingredient Name')
+    assert valuation.loc['Milk', 'On Hand (g/ml)'] == pytest.approx(700)
+    assert valuation.loc['Milk', 'FIFO Value (₱)'] == pytest.approx(200 * 0.10 + 500 * 0.12)
+    # Beans has no lots yet: its stock is one opening lot at Cost/Unit
+    assert valuation.loc['Beans', 'FIFO Value (₱)'] == pytest.approx(800 * 0.50)
+    assert layers.consume({'Milk': 300.0}) == {'Milk': pytest.approx(200 * 0.10 + 100 * 0.12)}
+
+def test_received_lots_are_reloaded(workbook):
+    database.save_dataframe(_inventory([['Beans', 0.50, 800.0]]), database.SHEET_INVENTORY, 'overwrite')
+    layers = cost_layers.CostLayers.load(cost_layers.POLICY_FIFO)
+    rows, average = layers.receive('Beans', 200.0, 0.60)
+    assert average == pytest.approx((800 * 0.50 + 200 * 0.60) / 1000)
+    database.save_dataframes({
+        database.SHEET_INVENTORY: (_inventory([['Beans', 0.60, 1000.0]]), 'overwrite'),
+        database.SHEET_LOTS: (pd.DataFrame(rows, columns=cost_layers.LOT_COLUMNS), 'append'),
+    })
+    database.checkpoint()
+    database.invalidate_cache()
+
+    reloaded = cost_layers.CostLayers.load(cost_layers.POLICY_FIFO)
+    pd.testing.assert_frame_equal(reloaded.valuation().drop(columns=['Average Cost/Unit', 'Average Value (₱)']),
+                                  layers.valuation().drop(columns=['Average Cost/Unit', 'Average Value (₱)']))
+    assert reloaded.consume({'Beans': 900.0}) == {'Beans': pytest.approx(800 * 0.50 + 100 * 0.60)}
+
+def _restock(manager, name, qty, price):
+    manager.restock_batch([{'Ingredient Name': name, 'Last Whole Sale Price (₱)': price, 'Bulk Quantity (g/ml)': qty}])
+
+def test_restocks_keep_only_the_open_lots(shop):
+    manager = inventory_manager.InventoryManager()
+    for price in (100.0, 120.0, 140.0, 160.0):
+        _restock(manager, 'Milk', 1000.0, price)
+        # Uses up the opening stock and the lot before the one just received
+        database.deduct_inventory_bulk({'Milk': 1000.0 if price > 100 else 3000.0})
+
+    # The last restock saved the lot it received and the one still open before it
+    lots = database.load_sheet(database.SHEET_LOTS).set_index('Ingredient Name')
+    assert lots.loc['Milk', 'Quantity (g/ml)'].tolist() == pytest.approx([1000.0, 1000.0])
+    assert lots.loc['Milk', 'Unit Cost (₱)'].tolist() == pytest.approx([0.14, 0.16])
+    # Ingredients that were never restocked keep their stock as an opening lot
+    assert lots.loc['Espresso Beans', 'Received'] == cost_layers.OPENING
+
+    _restock(manager, 'Milk', 500.0, 90.0)
+    lots = database.load_sheet(database.SHEET_LOTS).set_index('Ingredient Name')
+    assert len(lots) == 4
+    assert lots.loc['Milk', 'Quantity (g/ml)'].tolist() == pytest.approx([1000.0, 500.0])
+
+    valuation = cost_layers.CostLayers.load(cost_layers.POLICY_FIFO).valuation().set_index('Ingredient Name')
+    assert valuation.loc['Milk', 'FIFO Value (₱)'] == pytest.approx(1000 * 0.16 + 500 * 0.18)
+    assert valuation.loc['Espresso Beans', 'FIFO Value (₱)'] == pytest.approx(1000 * 0.80)
+
+def test_a_restock_that_fails_to_save_leaves_the_shared_layers_alone(shop, monkeypatch):
+    manager = inventory_manager.InventoryManager()
+    _restock(manager, 'Milk', 1000.0, 120.0)
+    before = cost_layers.get_cost_layers().valuation()
+
+    def fail(changes):
+        raise OSError('disk full')
+    monkeypatch.setattr(database, 'save_dataframes', fail)
+    with pytest.raises(OSError):
+        _restock(manager, 'Milk', 1000.0, 150.0)
+
+    pd.testing.assert_frame_equal(cost_layers.get_cost_layers().valuation(), before)
+    assert cost_layers.get_cost_layers().consume({'Milk': 4000.0}) == {'Milk': pytest.approx(3000 * 0.10 + 1000 * 0.12)}
@@ -0,0 +1,74 @@
+# test_database.py
+import sqlite3
+import pandas as pd
+import pytest
+import database
+from sqlite_backend import SQLiteBackend
+
+@pytest.fixture(params=['excel', 'sqlite'])
+def backend(request, workbook, tmp_path, monkeypatch):
+    """The active backend, once for each kind of storage."""
+    if request.param == 'excel':
+        yield database.get_backend()
+        return
+    sqlite = SQLiteBackend(str(tmp_path / 'coffeeshop_database.db'))
+    monkeypatch.setattr(database, '_backend', sqlite)
+    yield sqlite
+    sqlite.close()
+
+@pytest.fixture
+def sqlite_path(workbook, tmp_path):
+    return str(tmp_path / 'coffeeshop_database.db')
+
+def _stock():
+    return database.load_sheet(database.SHEET_INVENTORY)['Current Stock (g/ml)'].tolist()
+
+def test_deduction_takes_a_duplicated_ingredient_from_its_first_row(backend):
+    inventory = pd.DataFrame({
+        'Ingredient Name': ['Milk', 'Beans', 'Milk'],
+        'Current Stock (g/ml)': [100.0, 500.0, 1000.0],
+    })
+    database.save_dataframe(inventory, database.SHEET_INVENTORY, 'overwrite')
+    assert database.deduct_inventory_bulk({'Milk': 150.0, 'Beans': 20.0, 'Sugar': 5.0}) == {'Milk': 50.0, 'Sugar': 5.0}
+    assert _stock() == [0.0, 480.0, 1000.0]
+
+def test_deduction_of_more_ingredients_than_sqlite_binds_at_once(sqlite_path, monkeypatch):
+    backend = SQLiteBackend(sqlite_path)
+    # The default of SQLite builds before 3.32
+    backend.conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    monkeypatch.setattr(database, '_backend', backend)
+    names = [f'Ingredient {i:05d}' for i in range(3000)]
+    database.save_dataframe(pd.DataFrame({'Ingredient Name': names, 'Current Stock (g/ml)': 10.0}),
+                            database.SHEET_INVENTORY, 'overwrite')
+    assert database.deduct_inventory_bulk({name: 1.0 for name in names}) == {}
+    assert set(_stock()) == {9.0}
+    database.get_backend().close()
+
+def test_update_rows_finds_positions_after_a_delete_and_vacuum(sqlite_path, monkeypatch):
+    monkeypatch.setattr(database, '_backend', SQLiteBackend(sqlite_path))
+    inventory = pd.DataFrame({'Ingredient Name': ['Milk', 'Beans', 'Sugar'], 'Current Stock (g/ml)': [1.0, 2.0, 3.0]})
+    database.save_dataframe(inventory, database.SHEET_INVENTORY, 'overwrite')
+    conn = sqlite3.connect(sqlite_path, isolation_level=None)
+    conn.execute(f'DELETE FROM "{database.SHEET_INVENTORY}" WHERE "Ingredient Name" = \'Milk\'')
+    conn.execute('VACUUM')
+    conn.close()
+
+    assert database.load_sheet(database.SHEET_INVENTORY)['Ingredient Name'].tolist() == ['Beans', 'Sugar']
+    database.update_rows(pd.DataFrame({'Current Stock (g/ml)': [30.0]}, index=[1]), database.SHEET_INVENTORY)
+    database.get_backend().close()
+    monkeypatch.setattr(database, '_backend', SQLiteBackend(sqlite_path))
+    assert _stock() == [2.0, 30.0]
+    database.get_backend().close()
+
+def test_tables_without_a_row_column_are_numbered_in_rowid_order(sqlite_path, monkeypatch):
+    conn = sqlite3.connect(sqlite_path, isolation_level=None)
+    conn.execute(f'CREATE TABLE "{database.SHEET_INVENTORY}" ("Ingredient Name", "Current Stock (g/ml)" REAL)')
+    conn.executemany(f'INSERT INTO "{database.SHEET_INVENTORY}" VALUES (?, ?)', [('Milk', 1.0), ('Beans', 2.0)])
+    conn.close()
+
+    monkeypatch.setattr(database, '_backend', SQLiteBackend(sqlite_path))
+    database.update_rows(pd.DataFrame({'Current Stock (g/ml)': [20.0]}, index=[1]), database.SHEET_INVENTORY)
+    df = database.load_sheet(database.SHEET_INVENTORY)
+    assert list(df.columns) == ['Ingredient Name', 'Current Stock (g/ml)']
+    assert df.values.tolist() == [['Milk', 1.0], ['Beans', 20.0]]
+    database.get_backend().close()
@@ -0,0 +1,68 @@
+# test_kitchen_display.py
+import pytest
+import kitchen_display
+
+LATTE = {'Menu Item Name': 'Latte', 'Size/Container': '12oz', 'Price': 120.0}
+CROISSANT = {'Menu Item Name': 'Butter Croissant', 'Size/Container': 'pc', 'Price': 90.0}
+
+@pytest.fixture
+def board():
+    board = kitchen_display.OrderBoard()
+    board.place('A1', 'T1', [LATTE], at=100.0)
+    board.place('A2', 'T2', [LATTE, CROISSANT], at=110.0)
+    return board
+
+def test_orders_are_queued_at_the_stations_of_their_items(board):
+    assert [ticket.order_id for ticket in board.tickets('bar')] == ['A1', 'A2']
+    assert [ticket.order_id for ticket in board.tickets('kitchen')] == ['A2']
+    assert board.orders['A2'].total() == pytest.approx(210.0)
+    assert board.place('A1', 'T1', [LATTE]) is None  # Placing it again changes nothing
+
+def test_changes_return_one_delta_and_repeats_none(board):
+    delta = board.advance('A2', 'PREPARING', at=130.0)
+    assert (delta['Version'], delta['Op'], delta['State'], delta['Stations']) == (3, 'update', 'PREPARING', ['bar', 'kitchen'])
+    assert board.advance('A2', 'PREPARING', at=140.0) is None
+    assert board.advance('A2', 'PENDING', at=140.0) is None
+    assert board.advance('missing', 'READY') is None
+    with pytest.raises(ValueError):
+        board.advance('A2', 'COOKING')
+
+    delta = board.cancel('A1')
+    assert (delta['Op'], delta['State']) == ('remove', 'CANCELLED')
+    assert board.cancel('A1') is None
+    assert board.tickets('bar') == [board.orders['A2']]
+
+def test_serving_records_the_ticket_time_per_state(board):
+    board.advance('A2', 'PREPARING', at=130.0)
+    board.advance('A2', 'READY', at=190.0)
+    delta = board.advance('A2', 'SERVED', at=200.0)
+    assert delta['Op'] == 'remove'
+    assert delta['Ticket Time (s)'] == pytest.approx(90.0)
+    assert 'A2' not in board.orders and board.tickets('kitchen') == []
+
+    stats = board.ticket_stats(now=220.0)
+    assert stats['Served'] == 1 and stats['Open'] == 1
+    assert stats['Oldest Open (s)'] == pytest.approx(120.0)
+    assert stats['Mean in PENDING (s)'] == pytest.approx(20.0)
+    assert stats['Mean in PREPARING (s)'] == pytest.approx(60.0)
+    assert stats['Mean in READY (s)'] == pytest.approx(10.0)
+
+def test_updates_since_returns_the_station_deltas_or_a_reset(board):
+    board.advance('A1', 'READY', at=120.0)
+    board.advance('A2', 'PREPARING', at=130.0)
+    updates = board.updates_since(2, station='kitchen')
+    assert updates['Reset'] is False
+    assert [(delta['OrderID'], delta['State']) for delta in updates['Deltas']] == [('A2', 'PREPARING')]
+    assert board.updates_since(board.version)['Deltas'] == []
+    # A version this board never had (e.g. after a restart) gets the whole board
+    reset = board.updates_since(board.version + 5)
+    assert reset['Reset'] is True
+    assert [ticket['OrderID'] for ticket in reset['Board']['Stations']['bar']] == ['A1', 'A2']
+
+def test_updates_since_resets_once_the_deltas_are_dropped(monkeypatch):
+    monkeypatch.setattr(kitchen_display, 'DELTA_LOG', 3)
+    small = kitchen_display.OrderBoard()
+    for i in range(5):
+        small.place(f'B{i}', 'T1', [LATTE], at=100.0 + i)
+    assert small.updates_since(1)['Reset'] is True
+    assert [delta['OrderID'] for delta in small.updates_since(2)['Deltas']] == ['B2', 'B3', 'B4']
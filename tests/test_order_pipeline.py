@@ -0,0 +1,92 @@
+# test_order_pipeline.py
+import threading
+import pytest
+import order_pipeline
+import database
+import recipe_index
+import sales_ledger
+from conftest import stock
+
+def _within(call, *args, timeout=10):
+    """Runs call(*args); fails the test instead of hanging if it blocks."""
+    caller = threading.Thread(target=call, args=args, daemon=True)
+    caller.start()
+    caller.join(timeout)
+    assert not caller.is_alive(), f"{call.__name__}() did not return"
+
+def _latte(order_id):
+    return [{'Menu Item Name': 'Latte', 'Size/Container': '12oz', 'Price': 120.0, 'OrderID': order_id}]
+
+@pytest.fixture
+def pipeline(shop, tmp_path):
+    ledger = sales_ledger.SalesLedger(str(tmp_path / 'sales.jsonl'))
+    return order_pipeline.OrderPipeline(ledger, flush_size=5, flush_interval=0.05).start()
+
+def test_order_is_recorded_when_working_out_its_needs_fails_once(pipeline, monkeypatch):
+    get_recipe_index = recipe_index.get_recipe_index
+    failures = []
+
+    def fails_once(*args, **kwargs):
+        if not failures:
+            failures.append(True)
+            raise RuntimeError("menu sheet unreadable")
+        return get_recipe_index(*args, **kwargs)
+
+    monkeypatch.setattr(recipe_index, 'get_recipe_index', fails_once)
+    _within(pipeline.submit, 'A1', 'T1', _latte('A1'))
+    _within(pipeline.submit, 'A2', 'T2', _latte('A2'))
+    _within(pipeline.close)
+
+    assert failures
+    assert [record['SaleID'] for record in pipeline.ledger.pending_records()] == ['A1', 'A2']
+    assert stock() == {'Espresso Beans': 1000.0 - 36.0, 'Milk': 3000.0 - 400.0, 'Water': 10000.0}
+    assert pipeline.queued_counts() == {}
+
+def test_sale_is_recorded_when_its_needs_never_work_out(pipeline, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("menu sheet unreadable")
+
+    monkeypatch.setattr(recipe_index, 'get_recipe_index', broken)
+    _within(pipeline.submit, 'A1', 'T1', _latte('A1'))
+    _within(pipeline.close)
+
+    assert [record['SaleID'] for record in pipeline.ledger.pending_records()] == ['A1']
+    assert stock()['Milk'] == 3000.0
+
+def _fails_once(call, message):
+    """Returns (wrapper, calls): wrapper raises on its first call and then calls call."""
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OSError(message)
+        return call(*args, **kwargs)
+    return wrapper, calls
+
+def test_failed_deduction_is_retried_once_with_the_next_batch(pipeline, monkeypatch):
+    deduct, calls = _fails_once(database.deduct_inventory_bulk, "workbook locked")
+    monkeypatch.setattr(database, 'deduct_inventory_bulk', deduct)
+    for order_id in ('A1', 'A2', 'A3'):
+        _within(pipeline.submit, order_id, 'T1', _latte(order_id))
+    _within(pipeline.close)
+
+    assert len(calls) >= 2
+    # The failed needs were deducted once, along with the later orders'
+    assert stock() == {'Espresso Beans': 1000.0 - 3 * 18.0, 'Milk': 3000.0 - 3 * 200.0, 'Water': 10000.0}
+    assert pipeline.stats['deducted'] == 3
+    assert pipeline.queued_counts() == {}
+
+def test_close_drains_every_order_and_retries_the_ledger(pipeline, monkeypatch):
+    append, calls = _fails_once(pipeline.ledger.append_records, "disk full")
+    monkeypatch.setattr(pipeline.ledger, 'append_records', append)
+    order_ids = [f'A{i}' for i in range(12)]
+    for order_id in order_ids:
+        _within(pipeline.submit, order_id, 'T1', _latte(order_id))
+    _within(pipeline.close)
+
+    assert len(calls) >= 2
+    assert [record['SaleID'] for record in pipeline.ledger.pending_records()] == order_ids
+    assert pipeline.stats['recorded'] == 12
+    assert stock()['Milk'] == 3000.0 - 12 * 200.0
+    assert pipeline.queued_counts() == {}
@@ -0,0 +1,66 @@
+# test_order_queue.py
+import threading
+import pytest
+import database
+import order_queue
+import pos_system
+from conftest import make_menu, stock
+
+LATTE = {'Menu Item Name': 'Latte', 'Size/Container': '12oz', 'Price': 120.0}
+
+@pytest.fixture
+def terminals(shop, tmp_path):
+    """Two registers sharing one order queue."""
+    path = str(tmp_path / 'orders.db')
+    first, second = order_queue.OrderQueue(path, 'register-1'), order_queue.OrderQueue(path, 'register-2')
+    yield first, second
+    first.close()
+    second.close()
+
+def test_reservations_are_shared_between_terminals(terminals):
+    first, second = terminals
+    # 3000 ml of milk covers 15 lattes
+    first_order, shortages = first.place_order('T1', [LATTE] * 10)
+    assert first_order and shortages == {}
+    order, shortages = second.place_order('T2', [LATTE] * 6)
+    assert order is None and shortages == {'Milk': pytest.approx(200.0)}
+    second_order, _ = second.place_order('T2', [LATTE] * 5)
+    assert second_order
+    assert first.reserved() == second.reserved() == {'Espresso Beans': pytest.approx(270.0), 'Milk': pytest.approx(3000.0)}
+
+    # Either terminal can serve; the reservation becomes the deduction
+    shortfalls, needs = second.serve_order(first_order)
+    assert shortfalls == {} and needs == {'Espresso Beans': pytest.approx(180.0), 'Milk': pytest.approx(2000.0)}
+    assert first.serve_order(first_order) is None
+    assert stock()['Milk'] == 1000.0
+    assert first.cancel_order(second_order)
+    assert second.reserved() == {}
+    assert [item['OrderID'] for item in first.pending_orders()] == []
+
+def test_concurrent_terminals_never_reserve_more_than_the_stock(terminals):
+    placed = []
+
+    def sell(queue):
+        for _ in range(20):
+            order_id, _ = queue.place_order(queue.terminal, [LATTE])
+            if order_id:
+                placed.append(order_id)
+
+    threads = [threading.Thread(target=sell, args=(queue,)) for queue in terminals]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(placed) == 15
+    assert terminals[0].reserved()['Milk'] == pytest.approx(3000.0)
+
+def test_served_order_costs_what_was_reserved(terminals):
+    pos = pos_system.POSSystem(queue=terminals[0])
+    order_id, _ = pos.submit_order('T1', [LATTE])
+    # The recipe changes while the order waits
+    database.save_dataframe(make_menu({('Latte', '12oz'): [('Espresso Beans', 18.0), ('Milk', 300.0)]}),
+                            database.SHEET_MENU, 'overwrite')
+
+    result = pos.serve(order_id)
+    assert stock()['Milk'] == 2800.0
+    assert result['Cost of Goods'] == pytest.approx(18 * 0.80 + 200 * 0.10)
@@ -0,0 +1,83 @@
+# test_pos_server.py
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+import pos_server
+from conftest import stock
+
+LATTE = {'Menu Item Name': 'Latte', 'Size/Container': '12oz'}
+
+@pytest.fixture
+def service(shop):
+    service = pos_server.POSService()
+    server = pos_server.make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    service.url = f'http://{pos_server.DEFAULT_HOST}:{server.server_address[1]}'
+    yield service
+    server.shutdown()
+    server.server_close()
+
+def _request(service, method, path, body=None):
+    """Returns (status, JSON reply); `body` is sent as is if it is bytes, else as JSON."""
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode('utf-8')
+    request = urllib.request.Request(service.url + path, data=body, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as reply:
+            return reply.status, json.loads(reply.read())
+    except urllib.error.HTTPError as error:
+        with error:
+            return error.code, json.loads(error.read())
+
+def test_order_is_placed_and_served(service):
+    status, order = _request(service, 'POST', '/orders', {'Customer/Table': 'T1', 'Items': [LATTE]})
+    assert status == 201
+    assert order['Total'] == pytest.approx(order['Items'][0]['Price'])
+    status, pending = _request(service, 'GET', '/orders')
+    assert status == 200 and [item['OrderID'] for item in pending] == [order['OrderID']]
+
+    status, _ = _request(service, 'POST', f"/orders/{order['OrderID']}/serve")
+    assert status == 200
+    assert stock() == {'Espresso Beans': 1000.0 - 18.0, 'Milk': 3000.0 - 200.0, 'Water': 10000.0}
+
+@pytest.mark.parametrize('path, body', [
+    ('/orders', b'{"Customer/Table": "T1", "Items": ['),
+    ('/orders', ['not', 'an', 'object']),
+    ('/orders', {'Customer/Table': 'T1', 'Items': 'Latte'}),
+    ('/orders', {'Customer/Table': 'T1', 'Items': ['Latte']}),
+    ('/orders', {'Customer/Table': 'T1', 'Items': [{'Menu Item Name': 'Mocha', 'Size/Container': '12oz'}]}),
+    ('/orders', {'Customer/Table': 'T1'}),
+    ('/inventory/restock', {'Items': 'Milk'}),
+    ('/inventory/restock', [{'Ingredient Name': 'Milk', 'Last Whole Sale Price (₱)': 'cheap'}]),
+])
+def test_bad_requests_get_400_and_change_nothing(service, path, body):
+    status, reply = _request(service, 'POST', path, body)
+    assert status == 400
+    assert reply['error']
+    assert service.pending_orders() == []
+    assert stock() == {'Espresso Beans': 1000.0, 'Milk': 3000.0, 'Water': 10000.0}
+
+def test_unknown_routes_and_orders_get_404(service):
+    assert _request(service, 'GET', '/nothing')[0] == 404
+    assert _request(service, 'POST', '/menu')[0] == 404
+    assert _request(service, 'POST', '/orders/unknown/serve')[0] == 404
+
+def test_order_the_stock_cannot_cover_gets_409(service):
+    status, reply = _request(service, 'POST', '/orders', {'Customer/Table': 'T1', 'Items': [LATTE] * 16})
+    assert status == 409
+    assert reply['OrderID'] is None
+    assert reply['Shortages']['Milk'] == pytest.approx(16 * 200.0 - 3000.0)
+
+def test_service_errors_get_500_and_the_server_keeps_answering(service, monkeypatch):
+    def broken():
+        raise RuntimeError("menu sheet unreadable")
+    monkeypatch.setattr(service, 'menu_availability', broken)
+
+    status, reply = _request(service, 'GET', '/menu')
+    assert status == 500
+    assert reply['error'] == 'RuntimeError: menu sheet unreadable'
+    assert _request(service, 'GET', '/orders') == (200, [])
@@ -0,0 +1,53 @@
+# test_pricing_simulator.py
+import numpy as np
+import pandas as pd
+import pytest
+import costing_app
+import pricing_simulator
+from conftest import make_inventory, make_menu
+
+@pytest.fixture
+def model():
+    return pricing_simulator.PricingModel(make_menu(), make_inventory())
+
+def _prices(detail):
+    return dict(zip(detail['Menu Item Name'], detail['Suggested Selling Price (₱)']))
+
+def test_current_menu_reproduces_the_stored_prices(model):
+    table = pricing_simulator.simulate(model, [])
+    assert table['Scenario'].tolist() == ['Current Menu']
+    assert table.loc[0, 'Avg Price Change (%)'] == pytest.approx(0.0)
+    assert table.loc[0, 'Margin at Current Prices (%)'] == pytest.approx(50.0)
+    assert table.loc[0, 'Items Below Target'] == 0
+
+def test_scenario_recosts_with_the_costing_formula(model):
+    detail = pricing_simulator.scenario_detail(model, {
+        'Ingredient Price Change (%)': {'milk': 50},
+        'Margin Rules': [{'Menu Item Name': '^latte', 'Profit Target (%)': 60}, {'Profit Target (%)': 40}],
+    })
+    latte_prime = 18 * 0.80 + 200 * 0.10 * 1.5
+    assert _prices(detail) == {
+        'Latte': pytest.approx(round(costing_app.suggested_price(latte_prime, 60), 2)),
+        'Americano': pytest.approx(round(costing_app.suggested_price(18 * 0.80, 40), 2)),
+    }
+    # The Latte's stored price no longer covers its 50% target with dearer milk
+    assert pricing_simulator.simulate(model, [{'Ingredient Price Change (%)': {'Milk': 50}}]).loc[1, 'Items Below Target'] == 1
+
+def test_bad_scenarios_raise_value_error(model):
+    with pytest.raises(ValueError):
+        model.scenario_inputs([{'Ingredient Price Change (%)': {'Saffron': 10}}])
+    with pytest.raises(ValueError):
+        model.scenario_inputs([{'Margin Rules': [{'Profit Target (%)': 100}]}])
+
+def test_chunks_give_the_same_results_in_a_process_pool(model, monkeypatch):
+    monkeypatch.setattr(pricing_simulator, 'CHUNK_SCENARIOS', 2)
+    scenarios = [{'Scenario': f'+{change}%', 'Ingredient Price Change (%)': {'*': change}} for change in range(0, 50, 10)]
+    serial = pricing_simulator.simulate(model, scenarios)
+    pooled = pricing_simulator.simulate(model, scenarios, processes=2)
+    pd.testing.assert_frame_equal(pooled, serial)
+    assert np.diff(serial['Avg Suggested Price (₱)'].to_numpy()[1:]).min() > 0
+
+    summary, risk = pricing_simulator.monte_carlo(model, 5, seed=1)
+    pooled_summary, pooled_risk = pricing_simulator.monte_carlo(model, 5, seed=1, processes=2)
+    pd.testing.assert_frame_equal(pooled_summary, summary)
+    pd.testing.assert_frame_equal(pooled_risk, risk)
@@ -0,0 +1,52 @@
+# test_recipe_index.py
+import numpy as np
+import pandas as pd
+import database
+import pos_system
+import recipe_index
+from conftest import make_menu
+
+def _index():
+    index = recipe_index.RecipeIndex.from_menu(make_menu())
+    index.add_recipe('Hot Water', '12oz', 20.0, [])
+    return index
+
+def _stock(index, stock):
+    return np.array([stock.get(name, np.nan) for name in index.ingredients])
+
+def test_needs_for_adds_up_the_recipes():
+    index = _index()
+    needs = index.needs_for({('Latte', '12oz'): 2, ('Americano', '12oz'): 1, ('Mocha', '12oz'): 5})
+    assert needs == {'Espresso Beans': 54.0, 'Milk': 400.0, 'Water': 250.0}
+    assert index.needs_for({}) == {}
+
+def test_availability_counts_servings_and_the_limiting_ingredient():
+    index = _index()
+    servings, limiting, first_short = index.availability(
+        _stock(index, {'Espresso Beans': 100.0, 'Milk': 1000.0, 'Water': 300.0}))
+    latte, americano, water = (index.item_ids[(item, '12oz')] for item in ('Latte', 'Americano', 'Hot Water'))
+
+    assert servings[latte] == 5 and index.ingredients[limiting[latte]] == 'Espresso Beans'
+    assert servings[americano] == 1 and index.ingredients[limiting[americano]] == 'Water'
+    assert first_short[latte] == -1 and first_short[americano] == -1
+    # A recipe without ingredients is never limited
+    assert np.isinf(servings[water]) and limiting[water] == -1 and first_short[water] == -1
+
+def test_availability_reports_the_first_short_ingredient_in_recipe_order():
+    index = _index()
+    # The beans are not in the inventory and there is no milk
+    servings, _, first_short = index.availability(_stock(index, {'Milk': 0.0, 'Water': 1000.0}))
+    latte = index.item_ids[('Latte', '12oz')]
+    assert servings[latte] == 0
+    assert index.ingredients[first_short[latte]] == 'Espresso Beans'
+
+def test_menu_item_without_ingredients_has_no_limiting_ingredient(shop):
+    hot_water = pd.DataFrame([{'Menu Item Name': 'Hot Water', 'Size/Container': '12oz', 'Suggested Selling Price (₱)': 20.0}])
+    database.save_dataframe(pd.concat([make_menu(), hot_water], ignore_index=True), database.SHEET_MENU, 'overwrite')
+
+    menu = {(item['Menu Item Name'], item['Size/Container']): item for item in pos_system.POSSystem().get_available_menu()}
+    assert menu[('Latte', '12oz')]['LimitingIngredient'] == 'Milk'
+    assert menu[('Latte', '12oz')]['ServingsRemaining'] == 15
+    assert menu[('Hot Water', '12oz')]['Available']
+    assert menu[('Hot Water', '12oz')]['ServingsRemaining'] is None
+    assert menu[('Hot Water', '12oz')]['LimitingIngredient'] is None
@@ -0,0 +1,71 @@
+# test_reconciliation.py
+import numpy as np
+import pandas as pd
+import pytest
+import recipe_index
+import reconciliation
+
+@pytest.fixture
+def index():
+    menu = pd.DataFrame([
+        ['Latte', '12oz', 'Espresso Beans', 18.0, 120.0],
+        ['Latte', '12oz', 'Milk', 200.0, 120.0],
+        [np.nan, np.nan, np.nan, np.nan, np.nan],
+        ['Americano', '12oz', 'Espresso Beans', 18.0, 95.0],
+        ['Americano', '12oz', 'Water', 250.0, 95.0],
+    ], columns=['Menu Item Name', 'Size/Container', 'Ingredient Name', 'Needed Quantity (g/ml)',
+                'Suggested Selling Price (₱)'])
+    return recipe_index.RecipeIndex.from_menu(menu)
+
+@pytest.fixture
+def inventory():
+    return pd.DataFrame([
+        ['Espresso Beans', 'g', 0.80, 1000.0],
+        ['Milk', 'ml', 0.10, 3000.0],
+        ['Water', 'ml', 0.0, 10000.0],
+        ['Sugar', 'g', 0.05, 500.0],
+    ], columns=['Ingredient Name', 'Unit (g/ml)', 'Cost/Unit', 'Current Stock (g/ml)'])
+
+def _sold(*names):
+    return pd.DataFrame({'Menu Item Name': list(names), 'Size/Container': '12oz'})
+
+def test_theoretical_usage(index):
+    usage = reconciliation.theoretical_usage(_sold('Latte', 'Latte', 'Americano', 'Mocha'), index)
+    assert dict(zip(index.ingredients, usage)) == {'Espresso Beans': 54.0, 'Milk': 400.0, 'Water': 250.0}
+
+def test_variance_report(index, inventory):
+    counts = pd.DataFrame({
+        'Ingredient Name': ['espresso beans', 'Milk', 'Milk', 'Sugar'],
+        'Counted Stock (g/ml)': [0.95, 2000.0, 950.0, 500.0],
+        'Unit (g/ml)': ['kg', None, 'ml', 'g'],
+    })
+    report, problems = reconciliation.variance_report(inventory, counts, _sold('Latte', 'Latte', 'Americano'),
+                                                      index, '2024-05-06')
+    assert problems == []
+    assert list(report.columns) == reconciliation.VARIANCE_COLUMNS
+    rows = report.set_index('Ingredient Name')
+    # Counts in another unit are converted; counts of the same ingredient add up
+    assert rows.loc['Espresso Beans', 'Counted Stock (g/ml)'] == pytest.approx(950.0)
+    assert rows.loc['Milk', 'Counted Stock (g/ml)'] == pytest.approx(2950.0)
+    assert rows.loc['Espresso Beans', 'Variance (g/ml)'] == pytest.approx(50.0)
+    assert rows.loc['Espresso Beans', 'Actual Usage (g/ml)'] == pytest.approx(54.0 + 50.0)
+    assert rows.loc['Espresso Beans', 'Variance (%)'] == pytest.approx(50.0 / 54.0 * 100, abs=0.01)
+    assert rows.loc['Espresso Beans', 'Variance Cost (₱)'] == pytest.approx(40.0)
+    assert rows.loc['Milk', 'Variance Cost (₱)'] == pytest.approx(5.0)
+    # Nothing sold uses sugar, so it has no variance percentage
+    assert np.isnan(rows.loc['Sugar', 'Variance (%)'])
+    # Water was not counted
+    assert 'Water' not in rows.index
+    assert report['Variance Cost (₱)'].is_monotonic_decreasing
+    assert (report['Date'] == '2024-05-06').all()
+
+def test_variance_report_skips_rows_it_cannot_use(index, inventory):
+    counts = pd.DataFrame({
+        'Ingredient Name': ['Milk', 'Oat Milk', 'Espresso Beans', 'Sugar'],
+        'Counted Stock (g/ml)': [2900.0, 1000.0, 'lots', 0.4],
+        'Unit (g/ml)': ['ml', 'ml', 'g', 'l'],
+    })
+    report, problems = reconciliation.variance_report(inventory, counts, _sold(), index, '2024-05-06')
+    assert report['Ingredient Name'].tolist() == ['Milk']
+    assert len(problems) == 3
+    assert "'Oat Milk' is not in the inventory." in problems
@@ -0,0 +1,60 @@
+# test_snapshot.py
+import pandas as pd
+import pytest
+import database
+import snapshot
+from conftest import make_inventory, make_menu
+
+def _sales():
+    """Sales across three months, with a blank and a bad date and mixed cell types."""
+    dates = ['2024-01-30 09:15:00', '2024-01-31 18:00:00', '2024-02-01 07:30:00', '2024-02-14 12:00:00',
+             '2024-02-29 23:59:59', '2024-03-01 00:00:00', '2024-03-15 10:45:00', None, 'not a date']
+    return pd.DataFrame({
+        'SaleID': [f'S{i}' for i in range(len(dates))],
+        'Date': dates,
+        'Total Sale (₱)': [120.0, 95.5, 120.0, 240.0, 0.0, 75.25, 120.0, 60.0, 30.0],
+        'Customer/Table': ['T1', 'T2', None, 'T1', 'Walk-in', 'T3', 'T1', 'T2', 'T4'],
+        'Items Count': [1, 1, 1, 2, 0, 1, 1, 1, 1],
+    })
+
+@pytest.fixture
+def saved(workbook):
+    database.save_dataframes({
+        database.SHEET_INVENTORY: (make_inventory(), 'overwrite'),
+        database.SHEET_MENU: (make_menu(), 'overwrite'),
+        database.SHEET_SALES: (_sales(), 'overwrite'),
+    })
+    database.checkpoint()
+    database.invalidate_cache()
+    return workbook
+
+def test_snapshot_loads_the_frames_read_excel_does(saved):
+    from_xlsx = pd.read_excel(saved, sheet_name=None)
+    from_snapshot = snapshot.load(database._snapshot_dir(), database._file_signature()[1])
+    assert from_snapshot is not None
+    assert list(from_snapshot) == list(from_xlsx)
+    for name, df in from_xlsx.items():
+        # Copied since the snapshot's columns are memory-mapped arrays
+        pd.testing.assert_frame_equal(from_snapshot[name].copy(), df, obj=name)
+
+@pytest.mark.parametrize('start, end', [
+    ('2024-02-01', '2024-03-01'),
+    ('2024-01-31', '2024-03-02'),
+    ('2024-03-01', None),
+    (None, '2024-02-01'),
+    ('2025-01-01', '2025-02-01'),
+])
+def test_load_range_matches_the_xlsx_rows(saved, monkeypatch, start, end):
+    reads = []
+    load_range = snapshot.load_range
+
+    def spy(*args, **kwargs):
+        df = load_range(*args, **kwargs)
+        reads.append(df is not None)
+        return df
+    monkeypatch.setattr(snapshot, 'load_range', spy)
+
+    df = database.load_sheet_range(database.SHEET_SALES, start, end)
+    assert reads == [True]  # Read from the snapshot partitions, not the xlsx
+    expected = snapshot.filter_dates(pd.read_excel(saved, sheet_name=database.SHEET_SALES), 'Date', start, end)
+    pd.testing.assert_frame_equal(df, expected)
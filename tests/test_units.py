@@ -0,0 +1,31 @@
+# test_units.py
+import numpy as np
+import pytest
+import units
+
+def test_factor_within_a_dimension():
+    assert units.factor('kg', 'g') == 1000.0
+    assert units.factor('g', 'kg') == pytest.approx(0.001)
+    assert units.factor('lb', 'oz') == pytest.approx(16.0)
+    assert units.factor('cup', 'tbsp') == pytest.approx(16.0)
+    assert units.factor('dozen', 'pc') == 12.0
+
+def test_factor_normalizes_spelling():
+    assert units.factor(' KG ', 'Grams') == 1000.0
+    assert units.factor('fl  OZ', 'floz') == 1.0
+
+def test_factor_rejects_other_dimensions_and_unknown_units():
+    with pytest.raises(ValueError):
+        units.factor('g', 'ml')
+    with pytest.raises(ValueError):
+        units.factor('pinch', 'g')
+
+def test_conversion_factors_match_factor():
+    pairs = [('kg', 'g'), ('oz', 'g'), ('l', 'ml'), ('tsp', 'ml'), ('dozen', 'pc'), ('g', 'g')]
+    from_units, to_units = zip(*pairs)
+    expected = [units.factor(a, b) for a, b in pairs]
+    np.testing.assert_allclose(units.conversion_factors(from_units, to_units), expected)
+
+def test_conversion_factors_are_nan_where_factor_raises():
+    factors = units.conversion_factors(['KG ', 'g', 'pinch', None, 'ml'], ['g', 'ml', 'g', 'g', 'L'])
+    np.testing.assert_allclose(factors, [1000.0, np.nan, np.nan, np.nan, 0.001])
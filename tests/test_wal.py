@@ -0,0 +1,120 @@
+# test_wal.py
+import os
+import subprocess
+import sys
+import textwrap
+import pandas as pd
+import database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _inventory(stock):
+    return pd.DataFrame({
+        'Ingredient Name': list(stock),
+        'Current Stock (g/ml)': [float(qty) for qty in stock.values()],
+    })
+
+def _stock():
+    df = database.load_sheet(database.SHEET_INVENTORY)
+    return dict(zip(df['Ingredient Name'], df['Current Stock (g/ml)']))
+
+def _restart():
+    """Forgets what this process cached, like a terminal started after a crash."""
+    database.invalidate_cache()
+
+def test_changes_survive_a_crash_before_the_checkpoint(workbook):
+    database.save_dataframe(_inventory({'Milk': 1000, 'Beans': 500}), database.SHEET_INVENTORY, 'overwrite')
+    database.checkpoint()
+    # A register logs a deduction and dies before any checkpoint (no atexit)
+    script = textwrap.dedent(f"""
+        import os, sys
+        sys.path.insert(0, {ROOT!r})
+        import database
+        database.DB_FILE = {workbook!r}
+        database.set_backend(database.ExcelBackend())
+        database.deduct_inventory_bulk({{'Milk': 250.0}})
+        os._exit(0)
+    """)
+    subprocess.run([sys.executable, '-c', script], check=True)
+
+    assert pd.read_excel(workbook, sheet_name=database.SHEET_INVENTORY)['Current Stock (g/ml)'].tolist() == [1000, 500]
+    _restart()
+    assert _stock() == {'Milk': 750.0, 'Beans': 500.0}
+
+def test_torn_last_record_is_ignored_then_cut_off(workbook):
+    database.save_dataframe(_inventory({'Milk': 1000}), database.SHEET_INVENTORY, 'overwrite')
+    with open(workbook + database.WAL_SUFFIX, 'ab') as log:
+        log.write(b'{"op": "overwrite", "sheet": "Inventory_St')
+    _restart()
+    assert _stock() == {'Milk': 1000.0}
+
+    database.deduct_inventory_bulk({'Milk': 100.0})
+    with open(workbook + database.WAL_SUFFIX, 'rb') as log:
+        assert log.read().endswith(b'\n')
+    _restart()
+    assert _stock() == {'Milk': 900.0}
+
+def test_interrupted_checkpoint_is_recovered(workbook):
+    database.save_dataframe(_inventory({'Milk': 1000, 'Beans': 500}), database.SHEET_INVENTORY, 'overwrite')
+    database.checkpoint()
+    database.deduct_inventory_bulk({'Beans': 50.0})
+    # A checkpoint moves the log aside and crashes before writing the workbook
+    log = database._wal()
+    log.rotate()
+    database.deduct_inventory_bulk({'Milk': 200.0})
+    assert os.path.exists(log.checkpoint_path)
+
+    _restart()
+    assert _stock() == {'Milk': 800.0, 'Beans': 450.0}
+    assert database.checkpoint()
+    assert not log.has_records()
+    _restart()
+    assert _stock() == {'Milk': 800.0, 'Beans': 450.0}
+    assert pd.read_excel(workbook, sheet_name=database.SHEET_INVENTORY)['Current Stock (g/ml)'].tolist() == [800, 450]
+
+def test_replaying_the_log_twice_changes_nothing(workbook):
+    database.save_dataframe(_inventory({'Milk': 1000}), database.SHEET_INVENTORY, 'overwrite')
+    database.save_dataframe(pd.DataFrame({'SaleID': [1, 2], 'Total': [120.0, 95.0]}), database.SHEET_SALES)
+    database.deduct_inventory_bulk({'Milk': 300.0})
+    log = database._wal()
+    records = log.records()
+
+    once, twice = {}, {}
+    for record in records:
+        database.wal.apply(once, record)
+    for record in records + records:
+        database.wal.apply(twice, record)
+    assert once.keys() == twice.keys()
+    for sheet_name in once:
+        pd.testing.assert_frame_equal(once[sheet_name], twice[sheet_name])
+    assert once[database.SHEET_INVENTORY]['Current Stock (g/ml)'].tolist() == [700.0]
+    assert once[database.SHEET_SALES]['SaleID'].tolist() == [1, 2]
+
+def test_export_to_the_workbook_itself_is_a_checkpoint(workbook):
+    database.save_dataframe(_inventory({'Milk': 1000}), database.SHEET_INVENTORY, 'overwrite')
+    database.deduct_inventory_bulk({'Milk': 100.0})
+    copy = workbook.replace('.xlsx', '-copy.xlsx')
+    assert database.export_to_excel(copy) == copy
+    assert database._wal().has_records()
+    assert pd.read_excel(copy, sheet_name=database.SHEET_INVENTORY)['Current Stock (g/ml)'].tolist() == [900]
+
+    assert database.export_to_excel() == workbook
+    assert not database._wal().has_records()
+    _restart()
+    assert _stock() == {'Milk': 900.0}
+    assert pd.read_excel(workbook, sheet_name=database.SHEET_INVENTORY)['Current Stock (g/ml)'].tolist() == [900]
+
+def test_export_from_sqlite_replaces_the_log_of_the_workbook(workbook, tmp_path, monkeypatch):
+    from sqlite_backend import SQLiteBackend
+
+    database.save_dataframe(_inventory({'Milk': 1000}), database.SHEET_INVENTORY, 'overwrite')
+    backend = SQLiteBackend(str(tmp_path / 'coffeeshop_database.db'))
+    backend.save_sheet(_inventory({'Milk': 400, 'Beans': 50}), database.SHEET_INVENTORY)
+    monkeypatch.setattr(database, '_backend', backend)
+    database.export_to_excel()
+    backend.close()
+
+    monkeypatch.setattr(database, '_backend', database.ExcelBackend())
+    assert not database._wal().has_records()
+    _restart()
+    assert _stock() == {'Milk': 400.0, 'Beans': 50.0}
@@ -0,0 +1,79 @@
+# units.py
+"""Units of measure for ingredient quantities.
+
+Every unit belongs to one dimension (mass, volume or count) and converts to
+that dimension's base unit: g, ml or pc. Quantities can only be converted
+within a dimension; grams of milk are never silently read as millilitres.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+# unit -> (base unit, base units per unit)
+UNITS = {
+    'g': ('g', 1.0), 'gram': ('g', 1.0), 'grams': ('g', 1.0),
+    'kg': ('g', 1000.0), 'mg': ('g', 0.001),
+    'oz': ('g', 28.349523125), 'lb': ('g', 453.59237),
+    'ml': ('ml', 1.0), 'l': ('ml', 1000.0), 'cl': ('ml', 10.0),
+    'floz': ('ml', 29.5735295625), 'fl oz': ('ml', 29.5735295625),
+    'tsp': ('ml', 4.92892159375), 'tbsp': ('ml', 14.78676478125), 'cup': ('ml', 236.5882365),
+    'pc': ('pc', 1.0), 'pcs': ('pc', 1.0), 'piece': ('pc', 1.0), 'pieces': ('pc', 1.0),
+    'dozen': ('pc', 12.0),
+}
+BASE_UNITS = ('g', 'ml', 'pc')
+
+_QUANTITY = re.compile(r'^\s*([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)\s*([A-Za-z][A-Za-z ]*)?\s*$')
+
+def normalize_unit(unit):
+    """Returns the canonical spelling of a unit ('KG ' -> 'kg'). Raises ValueError if unknown."""
+    key = ' '.join(str(unit).strip().lower().split())
+    if key not in UNITS:
+        raise ValueError(f"Unknown unit '{unit}' (expected one of: {', '.join(sorted(UNITS))}).")
+    return key
+
+def base_unit(unit):
+    """Returns the base unit (g, ml or pc) a unit converts to."""
+    return UNITS[normalize_unit(unit)][0]
+
+def factor(from_unit, to_unit):
+    """Returns the number to multiply a quantity in `from_unit` by to get `to_unit`.
+
+    Raises ValueError for unknown units or units of different dimensions.
+    """
+    from_base, from_factor = UNITS[normalize_unit(from_unit)]
+    to_base, to_factor = UNITS[normalize_unit(to_unit)]
+    if from_base != to_base:
+        raise ValueError(f"Cannot convert {from_unit} to {to_unit}.")
+    return from_factor / to_factor
+
+def convert(quantity, from_unit, to_unit):
+    """Converts a quantity (number, array or Series) between units of the same dimension.
+
+    A quantity already in `to_unit` is returned as is, even if the unit is not in UNITS.
+    """
+    if from_unit == to_unit:
+        return quantity
+    return quantity * factor(from_unit, to_unit)
+
+def parse_quantity(text, default_unit=None):
+    """Parses '250', '0.25 kg' or '8oz' into (quantity, unit); a bare number is in `default_unit`.
+
+    Raises ValueError if the text is not a number with an optional known unit.
+    """
+    match = _QUANTITY.match(str(text))
+    if not match:
+        raise ValueError(f"'{text}' is not a quantity.")
+    unit = normalize_unit(match.group(2)) if match.group(2) else default_unit
+    return float(match.group(1)), unit
+
+def conversion_factors(from_units, to_units):
+    """Vectorized factor(): the factor of each pair, NaN where a pair cannot be converted."""
+    def lookup(units):
+        keys = pd.Series(units, dtype=object).astype(str).str.strip().str.lower().str.split().str.join(' ')
+        return keys.map(lambda key: UNITS.get(key, (None, np.nan)))
+
+    from_pairs, to_pairs = lookup(from_units), lookup(to_units)
+    from_base, from_factor = from_pairs.str[0].to_numpy(), from_pairs.str[1].to_numpy(dtype=float)
+    to_base, to_factor = to_pairs.str[0].to_numpy(), to_pairs.str[1].to_numpy(dtype=float)
+    same = (from_base == to_base) & pd.notna(from_base)
+    return np.where(same, from_factor / to_factor, np.nan)
@@ -0,0 +1,224 @@
+# wal.py
+"""Write-ahead log for the Excel storage backend.
+
+Rewriting the whole workbook for every order is slow, and a rewrite that is
+interrupted leaves a truncated xlsx. Instead each change is appended to a
+small fsync'd log (one JSON line per change) and the workbook is rewritten
+in the background by a checkpoint, with a temp file and an atomic rename.
+
+Records are physical redo records: a sheet's full contents, rows appended at
+a given position, or cell values set at given row positions. Replaying a
+record that the workbook already contains changes nothing, so the log can be
+replayed after a crash at any point of a checkpoint.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+
+def _plain_rows(df):
+    """Converts a DataFrame into lists of JSON values, with NaN as None."""
+    values = df.astype(object).where(df.notna(), None)
+    for col in values.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            values[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S').where(df[col].notna(), None)
+    return [
+        [v.item() if isinstance(v, np.generic) else v for v in row]
+        for row in values.itertuples(index=False, name=None)
+    ]
+
+def _frame(record):
+    return pd.DataFrame(record['rows'], columns=record['columns'])
+
+# --- Records ---
+
+def overwrite_record(sheet_name, df):
+    """Record that replaces a whole sheet."""
+    return {'op': 'overwrite', 'sheet': sheet_name, 'columns': [str(col) for col in df.columns], 'rows': _plain_rows(df)}
+
+def append_record(sheet_name, df, start):
+    """Record that puts the rows of `df` at row position `start` onwards."""
+    return {'op': 'append', 'sheet': sheet_name, 'start': int(start),
+            'columns': [str(col) for col in df.columns], 'rows': _plain_rows(df)}
+
+def update_record(sheet_name, updates):
+    """Record that sets cells; `updates` is indexed by row position."""
+    return {'op': 'update', 'sheet': sheet_name, 'positions': [int(pos) for pos in updates.index],
+            'columns': [str(col) for col in updates.columns], 'rows': _plain_rows(updates)}
+
+def apply(frames, record):
+    """Applies one record to a {sheet name: DataFrame} dict in place."""
+    sheet_name = record['sheet']
+    df = _frame(record)
+    if record['op'] == 'overwrite':
+        frames[sheet_name] = df
+    elif record['op'] == 'append':
+        existing = frames.get(sheet_name)
+        if existing is not None and not existing.empty:
+            df = pd.concat([existing.iloc[:record['start']], df], ignore_index=True)
+        frames[sheet_name] = df
+    elif record['op'] == 'update':
+        existing = frames.get(sheet_name, pd.DataFrame()).copy()
+        # Rows past the end were removed by a later record, which replay will apply next
+        keep = np.array(record['positions'], dtype=int) < len(existing)
+        positions = np.array(record['positions'], dtype=int)[keep]
+        for col in df.columns:
+            if col not in existing.columns:
+                existing[col] = np.nan
+            values = df[col].to_numpy()[keep]
+            try:
+                existing.loc[positions, col] = values
+            except (TypeError, ValueError):
+                # The new values do not fit the column's dtype (e.g. a number in a text column)
+                existing[col] = existing[col].astype(object)
+                existing.loc[positions, col] = values
+        frames[sheet_name] = existing
+    else:
+        raise ValueError(f"Unknown write-ahead log record '{record['op']}'.")
+
+# --- Log file ---
+
+class WriteAheadLog:
+    """The log of one workbook: `path` plus `path.checkpoint` while a checkpoint runs.
+
+    A checkpoint first moves the live log aside (rotate), writes the workbook,
+    then deletes the moved records (finish). New changes keep going to a
+    fresh live log in the meantime. Writers serialize append, repair and
+    rotate with a lock shared by every process (see database._log_lock);
+    reading needs no lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.checkpoint_path = path + '.checkpoint'
+
+    def append(self, records):
+        """Writes records with a single flush and fsync.
+
+        The caller holds the log's lock. A torn last line left by a crashed
+        writer is cut off first, so the new records start on a line of their own.
+        """
+        if not records:
+            return
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+        if self._torn(self.path):
+            self._truncate(self.path)
+        with open(self.path, 'ab') as log:
+            log.write(data)
+            log.flush()
+            os.fsync(log.fileno())
+
+    @staticmethod
+    def _read(path, with_length=False, offset=0):
+        """Returns the complete records of a log file from byte `offset` on; a torn last line is ignored.
+
+        With with_length=True returns (records, bytes they take up).
+        """
+        records = []
+        length = 0
+        try:
+            with open(path, 'rb') as log:
+                log.seek(offset)
+                for line in log:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break
+                    length += len(line)
+        except FileNotFoundError:
+            # Not written yet, or moved aside / finished by a checkpoint meanwhile
+            pass
+        return (records, length) if with_length else records
+
+    @staticmethod
+    def _torn(path):
+        """Returns True if the file does not end with a complete line."""
+        try:
+            with open(path, 'rb') as log:
+                if log.seek(0, os.SEEK_END) == 0:
+                    return False
+                log.seek(-1, os.SEEK_END)
+                return log.read(1) != b'\n'
+        except OSError:
+            return False
+
+    def _truncate(self, path):
+        """Cuts a log file back to its complete records."""
+        _, length = self._read(path, with_length=True)
+        if length < os.path.getsize(path):
+            with open(path, 'r+b') as log:
+                log.truncate(length)
+                log.flush()
+                os.fsync(log.fileno())
+
+    def repair(self):
+        """Cuts off a torn last line (crash mid-write) so new records stay readable.
+
+        Only call it with the log's lock held: to a reader, a record another
+        process is writing at that moment looks torn too.
+        """
+        for path in (self.checkpoint_path, self.path):
+            if os.path.exists(path):
+                self._truncate(path)
+
+    def records(self):
+        """Returns every record not yet in the workbook, oldest first."""
+        return self._read(self.checkpoint_path) + self._read(self.path)
+
+    def rotating_records(self):
+        return self._read(self.checkpoint_path)
+
+    def read_from(self, offset):
+        """Returns (records, new offset): the complete live records from byte `offset` on."""
+        records, length = self._read(self.path, with_length=True, offset=offset)
+        return records, offset + length
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def signature(self):
+        """Returns (mtime, size) of the live log, or None if it does not exist."""
+        return self._stat(self.path)
+
+    def checkpoint_signature(self):
+        """Returns (mtime, size) of the records moved aside, or None if there are none."""
+        return self._stat(self.checkpoint_path)
+
+    def size(self):
+        signature = self.signature()
+        return signature[1] if signature else 0
+
+    def has_records(self):
+        return self.size() > 0 or os.path.exists(self.checkpoint_path)
+
+    def rotate(self):
+        """Moves the live records aside for a checkpoint.
+
+        Records left aside by an interrupted checkpoint are kept, with the live
+        ones added after them. The caller holds the log's lock.
+        """
+        self.repair()
+        if not os.path.exists(self.path):
+            return
+        if not os.path.exists(self.checkpoint_path):
+            os.replace(self.path, self.checkpoint_path)
+            return
+        with open(self.path, 'rb') as log:
+            data = log.read()
+        with open(self.checkpoint_path, 'ab') as log:
+            log.write(data)
+            log.flush()
+            os.fsync(log.fileno())
+        os.remove(self.path)
+
+    def finish(self):
+        """Drops the records moved aside once the workbook holding them is on disk."""
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
@@ -0,0 +1,218 @@
+# xlsx_writer.py
+"""Bulk xlsx writer used by database.save_dataframe.
+
+openpyxl builds one Cell object and one XML element per value, which makes
+saving large sheets slow even in write-only mode. This writer instead builds
+the XML of a whole column at once with pandas string operations and streams
+the sheet into the zip file in chunks of rows. The files are plain
+SpreadsheetML that Excel, openpyxl and pandas.read_excel all read.
+"""
+import os
+import threading
+import zipfile
+import numpy as np
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+CHUNK_ROWS = 50000  # Rows serialized per chunk when streaming a sheet
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+# Style 0 is the default; style 1 shows date/times (built-in number format 22)
+STYLES_XML = (
+    XML_HEADER +
+    f'<styleSheet xmlns="{MAIN_NS}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+_ILLEGAL_XML_CHARS = r'[\x00-\x08\x0b\x0c\x0e-\x1f]'
+
+def _escape(text):
+    """XML-escapes a single string."""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+def _escape_series(values):
+    """XML-escapes a Series of strings."""
+    return (values.str.replace(_ILLEGAL_XML_CHARS, '', regex=True)
+                  .str.replace('&', '&amp;', regex=False)
+                  .str.replace('<', '&lt;', regex=False)
+                  .str.replace('>', '&gt;', regex=False))
+
+def _value_kind(value):
+    if isinstance(value, (bool, np.bool_)):
+        return 'b'
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return 'n'
+    if isinstance(value, pd.Timestamp):
+        return 'd'
+    return 's'
+
+def _cells(values, refs, kind):
+    """Returns the <c> elements for non-null values of one kind."""
+    if kind == 'n':
+        numbers = pd.to_numeric(values).astype(float)
+        finite = np.isfinite(numbers)
+        values, refs = values[finite], refs[finite]
+        return '<c r="' + refs + '"><v>' + values.astype(str) + '</v></c>'
+    if kind == 'b':
+        return '<c r="' + refs + '" t="b"><v>' + values.astype(bool).astype(int).astype(str) + '</v></c>'
+    if kind == 'd':
+        serials = (pd.to_datetime(values) - EXCEL_EPOCH) / pd.Timedelta(days=1)
+        return '<c r="' + refs + '" s="1"><v>' + serials.astype(str) + '</v></c>'
+    text = _escape_series(values.astype(str))
+    return '<c r="' + refs + '" t="inlineStr"><is><t xml:space="preserve">' + text + '</t></is></c>'
+
+def _column_xml(series, refs):
+    """Builds the XML of every cell in a column ('' for blank cells)."""
+    out = pd.Series('', index=series.index, dtype=object)
+    present = series.notna()
+    if not present.any():
+        return out
+
+    values, refs = series[present], refs[present]
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        groups = [(values, refs, 'b')]
+    elif pd.api.types.is_numeric_dtype(dtype):
+        groups = [(values, refs, 'n')]
+    elif pd.api.types.is_datetime64_any_dtype(dtype):
+        groups = [(values, refs, 'd')]
+    elif pd.api.types.is_string_dtype(dtype) and dtype != object:
+        groups = [(values, refs, 's')]
+    else:
+        # Mixed object column: group the values by type and build each group at once
+        kinds = values.map(_value_kind)
+        groups = [(values[kinds == kind], refs[kinds == kind], kind) for kind in kinds.unique()]
+
+    for group_values, group_refs, kind in groups:
+        cells = _cells(group_values, group_refs, kind)
+        out[cells.index] = cells
+    return out
+
+def column_widths(df):
+    """Returns the column widths for a sheet: longest value or header + 3."""
+    widths = []
+    for col in df.columns:
+        values = df[col].dropna()
+        longest = int(values.astype(str).str.len().max()) if len(values) else 0
+        widths.append(max(len(str(col)), longest) + 3)
+    return widths
+
+def _write_sheet(stream, df):
+    """Streams one DataFrame as a worksheet XML document."""
+    letters = [get_column_letter(c) for c in range(1, len(df.columns) + 1)]
+
+    stream.write((XML_HEADER + f'<worksheet xmlns="{MAIN_NS}">').encode('utf-8'))
+    if len(df.columns):
+        cols = ''.join(
+            f'<col min="{c}" max="{c}" width="{width}" customWidth="1"/>'
+            for c, width in enumerate(column_widths(df), start=1)
+        )
+        stream.write(f'<cols>{cols}</cols>'.encode('utf-8'))
+    stream.write(b'<sheetData>')
+
+    if len(df.columns):
+        header = ''.join(
+            f'<c r="{letter}1" t="inlineStr"><is><t xml:space="preserve">{_escape(str(col))}</t></is></c>'
+            for letter, col in zip(letters, df.columns)
+        )
+        stream.write(f'<row r="1">{header}</row>'.encode('utf-8'))
+
+        for start in range(0, len(df), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            rows = pd.Series(np.arange(start + 2, start + 2 + len(chunk)).astype(str), index=chunk.index)
+            row_xml = '<row r="' + rows + '">'
+            for c, letter in enumerate(letters):
+                row_xml = row_xml + _column_xml(chunk.iloc[:, c], letter + rows)
+            stream.write(('\n'.join(row_xml + '</row>') + '\n').encode('utf-8'))
+
+    stream.write(b'</sheetData></worksheet>')
+
+def _fsync_dir(path):
+    """Flushes a rename in the file's directory to disk (not possible on Windows)."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def write_workbook(frames, path):
+    """Writes every {sheet name: DataFrame} to a new xlsx file at `path`.
+
+    The file is written to a temp file next to it, fsync'd and renamed over `path`, so an
+    interrupted write never leaves a truncated workbook behind.
+    """
+    frames = frames or {'Sheet': pd.DataFrame()}
+    names = list(frames.keys())
+
+    content_types = (
+        XML_HEADER +
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        + ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(names) + 1)
+        ) +
+        '</Types>'
+    )
+    root_rels = (
+        XML_HEADER +
+        f'<Relationships xmlns="{PACKAGE_REL_NS}">'
+        f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    workbook = (
+        XML_HEADER +
+        f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>'
+        + ''.join(
+            f'<sheet name="{_escape(str(name))}" sheetId="{i}" r:id="rId{i}"/>'
+            for i, name in enumerate(names, start=1)
+        ) +
+        '</sheets></workbook>'
+    )
+    workbook_rels = (
+        XML_HEADER +
+        f'<Relationships xmlns="{PACKAGE_REL_NS}">'
+        + ''.join(
+            f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(names) + 1)
+        ) +
+        f'<Relationship Id="rId{len(names) + 1}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    )
+
+    tmp_path = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f, zipfile.ZipFile(f, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        archive.writestr('[Content_Types].xml', content_types)
+        archive.writestr('_rels/.rels', root_rels)
+        archive.writestr('xl/workbook.xml', workbook)
+        archive.writestr('xl/_rels/workbook.xml.rels', workbook_rels)
+        archive.writestr('xl/styles.xml', STYLES_XML)
+        for i, name in enumerate(names, start=1):
+            with archive.open(f'xl/worksheets/sheet{i}.xml', 'w', force_zip64=True) as stream:
+                _write_sheet(stream, frames[name])
+        archive.close()
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)